@@ -0,0 +1,135 @@
+import asyncio
+import hmac
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from fastapi import Header, HTTPException, status
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from techfest.backend.core.metrics import upstream
+from techfest.backend.db import models
+from techfest.backend.db.database import ReadSessionLocal
+
+# Revoked-but-unexpired jtis, held in memory on every node in JWT_MODE=stateless.
+# Nodes with database access sync straight from the tokens table; others poll
+# DENYLIST_URL (GET /auth/denylist on the issuer) with a since-cursor, so each
+# sync only transfers revocations they haven't seen. The endpoint requires
+# DENYLIST_TOKEN as a bearer token; polling nodes send the same value.
+DENYLIST_URL = os.getenv("DENYLIST_URL")
+DENYLIST_TOKEN = os.getenv("DENYLIST_TOKEN")
+DENYLIST_SYNC_SECONDS = float(os.getenv("DENYLIST_SYNC_SECONDS", "5"))
+DENYLIST_PAGE_SIZE = 1000
+
+log = logging.getLogger("techfest.auth.denylist")
+
+
+def _iso(dt: datetime) -> str:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def _iso_dt(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def _parse_cursor(since: str) -> Tuple[datetime, str]:
+    """"<revoked_at iso>|<jti>" -> (revoked_at, jti); a bare timestamp starts before every jti at it."""
+    ts, _, jti = since.partition("|")
+    return datetime.fromisoformat(ts), jti
+
+
+def require_node_token(authorization: Optional[str] = Header(None)) -> None:
+    scheme, _, token = (authorization or "").partition(" ")
+    if not DENYLIST_TOKEN or scheme.lower() != "bearer" or not hmac.compare_digest(token, DENYLIST_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Node token required.")
+
+
+def revoked_since(db: Session, since: Optional[str], limit: int = DENYLIST_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Server side of the sync: unexpired revocations after the (revoked_at, jti)
+    cursor, in that order. Paging on the pair means a burst of revocations
+    sharing one timestamp still advances page by page.
+    """
+    Token = models.Token
+    stmt = (
+        select(Token.jti, Token.expires_at, Token.revoked_at)
+        .where(Token.revoked.is_(True), Token.expires_at > datetime.now(timezone.utc))
+        .order_by(Token.revoked_at, Token.jti)
+        .limit(limit)
+    )
+    if since:
+        ts, jti = _parse_cursor(since)
+        stmt = stmt.where(or_(Token.revoked_at > ts, and_(Token.revoked_at == ts, Token.jti > jti)))
+    rows = db.execute(stmt).all()
+    entries = [{"jti": jti, "exp": int(_iso_dt(exp).timestamp())} for jti, exp, _ in rows]
+    cursor = f"{_iso(rows[-1][2])}|{rows[-1][0]}" if rows else since
+    return {"entries": entries, "cursor": cursor, "complete": len(rows) < limit}
+
+
+class DenyList:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, int] = {}  # jti -> exp (epoch seconds)
+        self.cursor: Optional[str] = None
+        self.last_sync_at: Optional[str] = None
+
+    def add(self, jti: str, exp: int) -> None:
+        with self._lock:
+            self._entries[jti] = exp
+
+    def is_denied(self, jti: str) -> bool:
+        return jti in self._entries  # dict lookup is atomic; no lock on the hot path
+
+    def prune(self) -> None:
+        now = time.time()
+        with self._lock:
+            for jti in [j for j, exp in self._entries.items() if exp <= now]:
+                del self._entries[jti]
+
+    def apply(self, page: Dict[str, Any]) -> None:
+        with self._lock:
+            for e in page.get("entries") or []:
+                self._entries[e["jti"]] = int(e["exp"])
+            self.cursor = page.get("cursor") or self.cursor
+            self.last_sync_at = datetime.now(timezone.utc).isoformat()
+
+    def sync_once(self) -> None:
+        while True:
+            if DENYLIST_URL:
+                with upstream("issuer", "denylist"):
+                    r = httpx.get(DENYLIST_URL, params={"since": self.cursor} if self.cursor else None,
+                                  headers={"Authorization": f"Bearer {DENYLIST_TOKEN}"}, timeout=5.0)
+                r.raise_for_status()
+                page = r.json()
+            else:
+                db = ReadSessionLocal()
+                try:
+                    page = revoked_since(db, self.cursor)
+                finally:
+                    db.close()
+            self.apply(page)
+            if page.get("complete", True):
+                break
+        self.prune()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._entries), "cursor": self.cursor, "last_sync_at": self.last_sync_at}
+
+
+deny_list = DenyList()
+
+
+async def deny_list_sync_loop(interval_seconds: float = DENYLIST_SYNC_SECONDS) -> None:
+    while True:
+        try:
+            await asyncio.to_thread(deny_list.sync_once)
+        except Exception as e:
+            log.warning("Deny list sync failed: %s", e)
+        await asyncio.sleep(interval_seconds)
@@ -1,35 +1,181 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from jose import jwt, JWTError
 import os as os
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from techfest.backend.db.database import get_db
+from techfest.backend.db.database import get_async_db, run_write, arun_write
 from techfest.backend.db import models
-from typing import Optional, Dict, Any
+from techfest.backend.auth.keys import key_set, STATELESS_ALGORITHM
+from techfest.backend.auth.denylist import deny_list
+from typing import Optional, Dict, Any, Tuple
 
 SECRET_KEY = os.getenv("JWT_SECRET", "change-me-in-prod")  # set env var in prod
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# "db": HS256 + tokens-table lookup per request (default).
+# "stateless": RS256 signed by the issuer, verified locally against the published
+# key set, revocation via the synced in-memory deny list; no DB on the request path.
+JWT_MODE = os.getenv("JWT_MODE", "db").lower()
+STATELESS = JWT_MODE == "stateless"
+
+# In-process token status cache (jti -> expires_at/revoked) in front of the tokens table
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "30"))
+# How often a worker reads revocation_epoch to notice revocations made by other workers
+REVOCATION_EPOCH_CHECK_SECONDS = float(os.getenv("REVOCATION_EPOCH_CHECK_SECONDS", "2"))
+
+# last_login is written behind, in one batched UPDATE every LAST_LOGIN_FLUSH_SECONDS
+LAST_LOGIN_FLUSH_SECONDS = float(os.getenv("LAST_LOGIN_FLUSH_SECONDS", "5"))
+
+log = logging.getLogger("techfest.auth")
+
 # OAuth2 bearer (used only to read Authorization header)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
+class TokenStatusCache:
+    """
+    Bounded LRU of jti -> (expires_at, revoked, cached_at).
+    Active entries live TOKEN_CACHE_TTL_SECONDS; revoked ones until the token expires
+    (revocation is permanent). The whole cache is dropped when the shared
+    revocation epoch moves, which is how other workers' revocations propagate.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[datetime, bool, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.epoch: Optional[int] = None
+        self.epoch_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, jti: str) -> Optional[Tuple[datetime, bool]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(jti)
+            if entry is not None:
+                expires_at, revoked, cached_at = entry
+                if revoked or now - cached_at < self.ttl_seconds:
+                    self._entries.move_to_end(jti)
+                    self.hits += 1
+                    return expires_at, revoked
+                del self._entries[jti]
+            self.misses += 1
+            return None
+
+    def put(self, jti: str, expires_at: datetime, revoked: bool) -> None:
+        with self._lock:
+            self._entries[jti] = (expires_at, revoked, time.monotonic())
+            self._entries.move_to_end(jti)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def epoch_due(self) -> bool:
+        return time.monotonic() - self.epoch_checked_at >= REVOCATION_EPOCH_CHECK_SECONDS
+
+    def observe_epoch(self, epoch: int) -> None:
+        with self._lock:
+            if self.epoch is not None and epoch != self.epoch:
+                self._entries.clear()
+            self.epoch = epoch
+            self.epoch_checked_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "epoch": self.epoch}
+
+token_status_cache = TokenStatusCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL_SECONDS)
+
+async def _read_revocation_epoch(db: AsyncSession) -> int:
+    row = await db.get(models.RevocationEpoch, 1)
+    return row.epoch if row else 0
+
+def _bump_revocation_epoch(db: Session) -> None:
+    # atomic increment: concurrent revocations on different workers must each move the epoch
+    result = db.execute(
+        update(models.RevocationEpoch)
+        .where(models.RevocationEpoch.id == 1)
+        .values(epoch=models.RevocationEpoch.epoch + 1, updated_at=datetime.now(timezone.utc))
+    )
+    if result.rowcount == 0:
+        db.add(models.RevocationEpoch(id=1, epoch=1))
+
+class LastLoginBuffer:
+    """
+    Pending last_login timestamps by user id. Logins only record here; flush()
+    writes them all in a single transaction, so login bursts don't queue up on
+    SQLite's writer lock just to bump a timestamp.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self.flushed_total = 0
+
+    def record(self, user_id: str, ts: datetime) -> None:
+        with self._lock:
+            self._pending[user_id] = ts
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        rows = [{"id": uid, "last_login": ts} for uid, ts in batch.items()]
+        try:
+            run_write(lambda db: db.execute(update(models.User), rows))
+        except Exception:
+            with self._lock:  # keep newer timestamps recorded meanwhile
+                for uid, ts in batch.items():
+                    self._pending.setdefault(uid, ts)
+            log.exception("last_login flush failed; will retry")
+            return 0
+        self.flushed_total += len(batch)
+        return len(batch)
+
+last_login_buffer = LastLoginBuffer()
+
+async def last_login_flush_loop(interval_seconds: float = LAST_LOGIN_FLUSH_SECONDS) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        await asyncio.to_thread(last_login_buffer.flush)
+
 def get_or_create_user_by_email(db: Session, email: str) -> models.User:
+    """
+    Does not commit: an existing user's last_login goes through last_login_buffer,
+    a new user is only flushed so it commits together with the caller's token.
+    """
+    now = datetime.now(timezone.utc)
     user = db.query(models.User).filter(models.User.email == email).first()
     if user:
-        user.last_login = datetime.now(timezone.utc)
-        db.commit()
-        db.refresh(user)
+        last_login_buffer.record(user.id, now)
         return user
 
     # Create a new minimal user
-    user = models.User(email=email, last_login=datetime.now(timezone.utc))
+    user = models.User(email=email, last_login=now)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.flush()
     return user
 
 def create_access_token_db(
@@ -38,6 +184,17 @@ def create_access_token_db(
     user_id: Optional[str] = None,
     expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES,
 ) -> str:
+    token = _issue_token(db, subject, user_id, expires_minutes)
+    db.commit()
+    return token
+
+def _issue_token(
+    db: Session,
+    subject: str,
+    user_id: Optional[str] = None,
+    expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES,
+) -> str:
+    """Sign a token and add its row to the session; the caller commits."""
     now = datetime.now(timezone.utc)
     expire = now + timedelta(minutes=expires_minutes)
     jti = uuid.uuid4().hex
@@ -49,7 +206,11 @@ def create_access_token_db(
         "nbf": now,
         "jti": jti,
     }
-    token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    if STATELESS:
+        private_key, kid = key_set.signer()
+        token = jwt.encode(payload, private_key, algorithm=STATELESS_ALGORITHM, headers={"kid": kid})
+    else:
+        token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
     # persist token record
     db_token = models.Token(
@@ -62,11 +223,33 @@ def create_access_token_db(
         revoked_at=None,
     )
     db.add(db_token)
-    db.commit()
     return token
 
+async def login_user(email: str) -> str:
+    """
+    User lookup/creation and token issue as one write (one commit per login,
+    batched with other writes in wal mode).
+    Retries once if a concurrent login created the same user first.
+    """
+    def _login(db: Session) -> str:
+        user = get_or_create_user_by_email(db, email)
+        return _issue_token(db, subject=user.email, user_id=user.id)
+
+    for attempt in range(2):
+        try:
+            return await arun_write(_login)
+        except IntegrityError:
+            if attempt:
+                raise
+    raise RuntimeError("unreachable")
+
 def decode_token(token: str) -> Dict[str, Any]:
     try:
+        if STATELESS:
+            key = key_set.verification_key(jwt.get_unverified_header(token).get("kid"))
+            if key is None:
+                raise JWTError("unknown signing key")
+            return jwt.decode(token, key, algorithms=[STATELESS_ALGORITHM])
         return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         raise HTTPException(
@@ -81,9 +264,9 @@ def _as_aware_utc(dt: datetime) -> datetime:
         return dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(timezone.utc)
 
-def require_active_token(
+async def require_active_token(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     payload = decode_token(token)
     jti = payload.get("jti")
@@ -94,15 +277,40 @@ def require_active_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    db_token = db.get(models.Token, jti)
-    if not db_token or db_token.revoked:
+    if STATELESS:
+        # signature and exp were checked by decode_token; revocation is the deny list
+        if deny_list.is_denied(jti):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token is revoked or invalid.",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return payload
+
+    if token_status_cache.epoch_due():
+        token_status_cache.observe_epoch(await _read_revocation_epoch(db))
+
+    cached = token_status_cache.get(jti)
+    if cached is not None:
+        expires_at_aware, revoked = cached
+    else:
+        db_token = await db.get(models.Token, jti)
+        if not db_token:
+            # unknown jti: not cached, so a token issued by another worker a moment ago still works
+            revoked = True
+            expires_at_aware = datetime.now(timezone.utc)
+        else:
+            revoked = db_token.revoked
+            expires_at_aware = _as_aware_utc(db_token.expires_at)
+            token_status_cache.put(jti, expires_at_aware, revoked)
+
+    if revoked:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token is revoked or invalid.",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    expires_at_aware = _as_aware_utc(db_token.expires_at)
     now_aware = datetime.now(timezone.utc)
     if expires_at_aware <= now_aware:
         raise HTTPException(
@@ -112,13 +320,33 @@ def require_active_token(
         )
     return payload
 
-def revoke_current_token(payload: Dict[str, Any], db: Session) -> None:
+# Comma-separated emails allowed on /admin/* endpoints
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+def require_admin(payload: Dict[str, Any] = Depends(require_active_token)) -> Dict[str, Any]:
+    if (payload.get("sub") or "").lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required.")
+    return payload
+
+async def revoke_current_token(payload: Dict[str, Any]) -> None:
     jti = payload.get("jti")
     if not jti:
         return
-    db_token = db.get(models.Token, jti)
-    if db_token and not db_token.revoked:
+
+    def _revoke(db: Session) -> Optional[models.Token]:
+        db_token = db.get(models.Token, jti)
+        if not db_token or db_token.revoked:
+            return None
         db_token.revoked = True
         db_token.revoked_at = datetime.now(timezone.utc)
         db.add(db_token)
-        db.commit()
\ No newline at end of file
+        _bump_revocation_epoch(db)
+        return db_token
+
+    db_token = await arun_write(_revoke)
+    if db_token:
+        # this worker sees it immediately; others drop their cache on the next epoch check
+        # (db mode) or pick it up on the next deny list sync (stateless mode)
+        expires_at = _as_aware_utc(db_token.expires_at)
+        token_status_cache.put(jti, expires_at, True)
+        deny_list.add(jti, int(expires_at.timestamp()))
\ No newline at end of file
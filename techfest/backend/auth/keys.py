@@ -0,0 +1,130 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from jose import jwk
+
+from techfest.backend.core.metrics import upstream
+
+# Asymmetric signing for JWT_MODE=stateless. The issuing node holds the private
+# key; every node verifies against a key set: its own public key and/or the
+# set published at JWKS_URL (GET /.well-known/jwks.json on the issuer). The
+# remote set is fetched at startup and refreshed by jwks_refresh_loop; requests
+# only read the cache, so a forged kid never costs an HTTP call on the request path.
+STATELESS_ALGORITHM = "RS256"
+JWT_PRIVATE_KEY_PATH = os.getenv("JWT_PRIVATE_KEY_PATH")
+JWT_PUBLIC_KEY_PATH = os.getenv("JWT_PUBLIC_KEY_PATH")
+JWT_KEY_ID = os.getenv("JWT_KEY_ID")
+JWKS_URL = os.getenv("JWKS_URL")
+JWKS_REFRESH_SECONDS = float(os.getenv("JWKS_REFRESH_SECONDS", "300"))
+_JWKS_MIN_REFETCH_SECONDS = 10.0  # earliest re-fetch after an unknown kid; bounds the fetch rate
+
+log = logging.getLogger("techfest.auth.keys")
+
+
+def _read(path: Optional[str]) -> Optional[str]:
+    if not path:
+        return None
+    with open(path, "r") as f:
+        return f.read()
+
+
+def _kid_for(public_jwk: Dict[str, Any]) -> str:
+    # RFC 7638-style thumbprint over the required RSA members
+    canon = '{"e":"%s","kty":"RSA","n":"%s"}' % (public_jwk["e"], public_jwk["n"])
+    digest = hashlib.sha256(canon.encode("ascii")).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")[:16]
+
+
+class KeySet:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._remote_fetched_at = 0.0
+        self._refresh_wanted = False
+        self.signing_key: Optional[str] = None
+        self.signing_kid: Optional[str] = None
+        self._loaded = False
+
+    def _load_local(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        private_pem = _read(JWT_PRIVATE_KEY_PATH)
+        public_pem = _read(JWT_PUBLIC_KEY_PATH)
+        if private_pem:
+            public = jwk.construct(private_pem, STATELESS_ALGORITHM).public_key().to_dict()
+            self.signing_key = private_pem
+        elif public_pem:
+            public = jwk.construct(public_pem, STATELESS_ALGORITHM).to_dict()
+        else:
+            return
+        kid = JWT_KEY_ID or _kid_for(public)
+        public.update(kid=kid, use="sig", alg=STATELESS_ALGORITHM)
+        self._keys[kid] = public
+        if self.signing_key:
+            self.signing_kid = kid
+
+    def signer(self) -> tuple:
+        with self._lock:
+            self._load_local()
+            if not self.signing_key:
+                raise RuntimeError("JWT_MODE=stateless needs JWT_PRIVATE_KEY_PATH on token-issuing nodes")
+            return self.signing_key, self.signing_kid
+
+    def refresh_due(self, interval_seconds: float = JWKS_REFRESH_SECONDS) -> bool:
+        return bool(JWKS_URL) and (
+            self._refresh_wanted or time.monotonic() - self._remote_fetched_at >= interval_seconds)
+
+    def refresh_remote(self) -> None:
+        """Blocking fetch of JWKS_URL; run it off the event loop."""
+        if not JWKS_URL:
+            return
+        self._remote_fetched_at = time.monotonic()
+        self._refresh_wanted = False
+        try:
+            with upstream("issuer", "jwks"):
+                r = httpx.get(JWKS_URL, timeout=5.0)
+            r.raise_for_status()
+            keys = r.json().get("keys") or []
+        except Exception as e:
+            log.warning("JWKS fetch from %s failed: %s", JWKS_URL, e)
+            return
+        with self._lock:
+            for k in keys:
+                if k.get("kid"):
+                    self._keys[k["kid"]] = k
+
+    def verification_key(self, kid: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Cached keys only. An unknown kid (key rotation on the issuer) asks the refresh loop to re-fetch early."""
+        with self._lock:
+            self._load_local()
+            key = self._keys.get(kid) if kid else None
+            if key is None and not kid and len(self._keys) == 1:
+                key = next(iter(self._keys.values()))
+        if key is None and kid:
+            self._refresh_wanted = True
+        return key
+
+    def public_jwks(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            self._load_local()
+            return {"keys": list(self._keys.values())}
+
+
+key_set = KeySet()
+
+
+async def jwks_refresh_loop(interval_seconds: float = JWKS_REFRESH_SECONDS) -> None:
+    # Wakes every _JWKS_MIN_REFETCH_SECONDS so a requested refresh happens soon,
+    # but fetches at most that often however many unknown kids come in.
+    while True:
+        if key_set.refresh_due(interval_seconds):
+            await asyncio.to_thread(key_set.refresh_remote)
+        await asyncio.sleep(_JWKS_MIN_REFETCH_SECONDS)
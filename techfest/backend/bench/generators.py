@@ -0,0 +1,121 @@
+"""
+Synthetic PayPal Transaction Search records, shaped like /v1/reporting/transactions
+`transaction_details` entries. Deterministic for a given seed.
+
+A share of payers are "subscriptions": they pay the same amount for the same
+item on the same day of each month, so the recurring-payment detection in
+notify.py has real matches to find.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import cycle, islice
+from typing import Dict, Iterator, List, Optional
+
+CURRENCIES = ["USD", "USD", "USD", "EUR", "GBP", "JPY", "HUF"]
+STATUSES = ["S", "S", "S", "S", "P", "V", "D"]
+EVENT_CODES = ["T0006", "T0001", "T0007", "T1107", "T0400"]
+ITEMS = ["Pro plan", "Team plan", "Ebook", "Conference ticket", "Hosting", "Support hours",
+         "Domain renewal", "T-shirt", "Gift card", "Workshop seat"]
+FIRST = ["Ana", "Mihai", "Ioana", "Andrei", "Elena", "Radu", "Maria", "Alex", "Sara", "Dan"]
+LAST = ["Popescu", "Ionescu", "Smith", "Garcia", "Muller", "Rossi", "Novak", "Kim"]
+
+
+def _paypal_ts(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S+0000")
+
+
+def _money(value: float, ccy: str) -> Dict[str, str]:
+    if ccy in ("JPY", "HUF"):
+        return {"currency_code": ccy, "value": str(int(round(value * 100)))}
+    return {"currency_code": ccy, "value": f"{value:.2f}"}
+
+
+def synthetic_txn(i: int, rng: random.Random, now: datetime, days: int = 90,
+                  recurring_share: float = 0.1, items_max: int = 3) -> Dict:
+    if rng.random() < recurring_share:
+        # subscription: fixed payer/item/amount, same day-of-month 1..3 months back
+        sub = rng.randrange(200)
+        sub_rng = random.Random(sub)
+        months_back = rng.randint(1, 3)
+        when = (now - timedelta(days=30 * months_back)).replace(hour=sub_rng.randint(0, 23))
+        ccy = sub_rng.choice(CURRENCIES)
+        value = round(sub_rng.uniform(5, 80), 2)
+        given, sur = FIRST[sub % len(FIRST)], LAST[sub % len(LAST)]
+        items = [{"item_name": f"{ITEMS[sub % len(ITEMS)]} subscription", "item_code": f"SUB-{sub}",
+                  "item_quantity": "1", "item_amount": _money(value, ccy)}]
+        email = f"subscriber{sub}@example.com"
+    else:
+        when = now - timedelta(seconds=rng.randrange(days * 86400))
+        ccy = rng.choice(CURRENCIES)
+        n_items = rng.randint(0, items_max)
+        items = []
+        value = 0.0
+        for _ in range(n_items):
+            qty = rng.randint(1, 3)
+            unit = round(rng.uniform(1, 150), 2)
+            value += qty * unit
+            items.append({"item_name": rng.choice(ITEMS), "item_code": f"SKU-{rng.randrange(1000)}",
+                          "item_quantity": str(qty), "item_unit_price": _money(unit, ccy),
+                          "item_amount": _money(qty * unit, ccy)})
+        value = round(value or rng.uniform(1, 500), 2)
+        if rng.random() < 0.3:
+            value = -value  # outgoing payment
+        given, sur = rng.choice(FIRST), rng.choice(LAST)
+        email = f"{given.lower()}.{sur.lower()}{rng.randrange(10000)}@example.com"
+
+    txn_id = f"{i:017X}"[-17:]
+    info = {
+        "paypal_account_id": "SELLERACCOUNT",
+        "transaction_id": txn_id,
+        "transaction_event_code": rng.choice(EVENT_CODES),
+        "transaction_initiation_date": _paypal_ts(when),
+        "transaction_updated_date": _paypal_ts(when + timedelta(minutes=rng.randint(0, 120))),
+        "transaction_amount": _money(value, ccy),
+        "fee_amount": _money(-round(abs(value) * 0.029 + 0.3, 2), ccy),
+        "transaction_status": rng.choice(STATUSES),
+        "transaction_subject": items[0]["item_name"] if items and rng.random() < 0.5 else None,
+        "invoice_id": f"INV2-{rng.randrange(10 ** 8):08d}" if rng.random() < 0.2 else None,
+    }
+    return {
+        "transaction_info": {k: v for k, v in info.items() if v is not None},
+        "payer_info": {
+            "account_id": f"PAYER{rng.randrange(10 ** 6):06d}",
+            "email_address": email,
+            "address_status": "Y",
+            "payer_status": "Y",
+            "payer_name": {"given_name": given, "surname": sur, "alternate_full_name": f"{given} {sur}"},
+            "country_code": rng.choice(["US", "RO", "DE", "GB", "JP"]),
+        },
+        "shipping_info": {},
+        "cart_info": {"item_details": items} if items else {},
+        "store_info": {},
+        "auction_info": {},
+        "incentive_info": {},
+    }
+
+
+def generate_txns(n: int, seed: int = 0, now: Optional[datetime] = None, **kwargs) -> Iterator[Dict]:
+    """n distinct transactions, newest-first order not guaranteed (like the API across windows)."""
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    for i in range(n):
+        yield synthetic_txn(i, rng, now, **kwargs)
+
+
+def txn_pool(size: int = 5000, seed: int = 0, **kwargs) -> List[Dict]:
+    return list(generate_txns(size, seed=seed, **kwargs))
+
+
+def stream_from_pool(pool: List[Dict], n: int, unique_ids: bool = True) -> Iterator[Dict]:
+    """
+    n records cycling over a pre-generated pool, so big runs (1M) measure the
+    code under test rather than the generator. With unique_ids each record gets
+    a fresh transaction_id (one shallow copy), as upserts need.
+    """
+    if not unique_ids:
+        yield from islice(cycle(pool), n)
+        return
+    for i, t in enumerate(islice(cycle(pool), n)):
+        info = dict(t["transaction_info"])
+        info["transaction_id"] = f"B{i:016X}"
+        yield {**t, "transaction_info": info}
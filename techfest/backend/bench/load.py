@@ -0,0 +1,175 @@
+"""
+End-to-end load test against a running app (ideally pointed at the emulator).
+
+    python -m techfest.backend.bench.paypal_emulator --port 8089 &
+    PAYPAL_BASE_URL=http://127.0.0.1:8089 uvicorn techfest.backend.main:app --port 8000 &
+    python -m techfest.backend.bench.load --url http://127.0.0.1:8000 --concurrency 32 --duration 60 --out out/load.json
+
+Setup logs in (POST /login) and, with --seed-paypal-token, runs /callback once so
+the app has a stored PayPal token. Workers then pick endpoints by weight from
+the mix (override with --mix "search=5,aggregates=2") until the duration or
+request count is reached. Reports count, errors, p50/p95/p99 and throughput per
+endpoint plus overall.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# name -> (weight, method, path, params)
+MIX: Dict[str, Tuple[float, str, str, Dict[str, Any]]] = {
+    "me": (2, "GET", "/me", {}),
+    "search": (4, "GET", "/transactions/search", {"q": "plan", "page_size": 20}),
+    "aggregates": (3, "GET", "/aggregates", {"granularity": "monthly"}),
+    "unpaid_invoices": (2, "GET", "/unpaid-invoices", {"page_size": 20}),
+    "recurring": (1, "GET", "/recurring/same-day", {"csv_path": "out/txns_last90d.csv"}),
+}
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    if not spec:
+        return {name: w for name, (w, *_rest) in MIX.items()}
+    weights = {}
+    for part in spec.split(","):
+        name, _, w = part.partition("=")
+        name = name.strip()
+        if name not in MIX:
+            raise ValueError(f"unknown endpoint {name!r}; choose from {', '.join(MIX)}")
+        weights[name] = float(w or 1)
+    return weights
+
+
+async def setup(client: httpx.AsyncClient, email: str, seed_paypal_token: bool) -> Dict[str, str]:
+    res = await client.post("/login", json={"email": email})
+    res.raise_for_status()
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    if seed_paypal_token:
+        res = await client.post("/callback", params={"code": f"bench-{secrets.token_hex(4)}",
+                                                     "state": secrets.token_urlsafe(8)})
+        res.raise_for_status()
+    return headers
+
+
+async def _worker(client: httpx.AsyncClient, headers: Dict[str, str], names: List[str], weights: List[float],
+                  deadline: float, budget: List[int], samples: Dict[str, List[float]], errors: Dict[str, int],
+                  statuses: Dict[str, Dict[int, int]]) -> None:
+    while time.perf_counter() < deadline:
+        if budget[0] <= 0:
+            return
+        budget[0] -= 1
+        name = random.choices(names, weights)[0]
+        _, method, path, params = MIX[name]
+        started = time.perf_counter()
+        try:
+            res = await client.request(method, path, params=params, headers=headers)
+            status = res.status_code
+        except httpx.HTTPError:
+            status = 0
+        samples[name].append(time.perf_counter() - started)
+        statuses[name][status] += 1
+        if status == 0 or status >= 400:
+            errors[name] += 1
+
+
+def _summary(lat: List[float], errs: int, elapsed: float) -> Dict[str, Any]:
+    lat = sorted(lat)
+    ms = lambda v: round(v * 1000, 2) if v is not None else None  # noqa: E731
+    return {
+        "count": len(lat),
+        "errors": errs,
+        "error_rate": round(errs / len(lat), 4) if lat else 0.0,
+        "rps": round(len(lat) / elapsed, 2) if elapsed > 0 else None,
+        "p50_ms": ms(percentile(lat, 0.50)),
+        "p95_ms": ms(percentile(lat, 0.95)),
+        "p99_ms": ms(percentile(lat, 0.99)),
+        "max_ms": ms(lat[-1] if lat else None),
+    }
+
+
+async def run(url: str, concurrency: int, duration: float, requests: Optional[int], mix: Dict[str, float],
+              email: str, seed_paypal_token: bool, timeout: float) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        headers = await setup(client, email, seed_paypal_token)
+        samples: Dict[str, List[float]] = defaultdict(list)
+        errors: Dict[str, int] = defaultdict(int)
+        statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        names, weights = list(mix), list(mix.values())
+        budget = [requests if requests else sys.maxsize]
+        started = time.perf_counter()
+        deadline = started + (duration if duration > 0 else float("inf"))
+        await asyncio.gather(*(
+            _worker(client, headers, names, weights, deadline, budget, samples, errors, statuses)
+            for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name in names:
+        endpoints[name] = _summary(samples[name], errors[name], elapsed)
+        endpoints[name]["statuses"] = {str(k): v for k, v in sorted(statuses[name].items())}
+    everything = [v for name in names for v in samples[name]]
+    return {
+        "meta": {"url": url, "concurrency": concurrency, "elapsed_s": round(elapsed, 3), "mix": mix},
+        "overall": _summary(everything, sum(errors.values()), elapsed),
+        "endpoints": endpoints,
+    }
+
+
+def _print(report: Dict[str, Any]) -> None:
+    print(f"{'endpoint':<18} {'count':>7} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(report["endpoints"].items()) + [("ALL", report["overall"])]
+    for name, r in rows:
+        print(f"{name:<18} {r['count']:>7} {r['errors']:>5} {r['rps'] or 0:>8.1f} "
+              f"{r['p50_ms'] or 0:>9.1f} {r['p95_ms'] or 0:>9.1f} {r['p99_ms'] or 0:>9.1f}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Drive the FastAPI app with a weighted endpoint mix")
+    ap.add_argument("--url", default=os.getenv("LOAD_URL", "http://127.0.0.1:8000"))
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=30, help="seconds (0 = until --requests is reached)")
+    ap.add_argument("--requests", type=int, default=None, help="stop after this many requests")
+    ap.add_argument("--mix", help=f"weights, e.g. search=5,aggregates=2 (endpoints: {', '.join(MIX)})")
+    ap.add_argument("--email", default="loadtest@example.com")
+    ap.add_argument("--seed-paypal-token", action="store_true", help="call /callback once to store a PayPal token")
+    ap.add_argument("--timeout", type=float, default=30)
+    ap.add_argument("--out", help="write the JSON report here")
+    args = ap.parse_args(argv)
+    if args.duration <= 0 and not args.requests:
+        ap.error("set --duration or --requests")
+    try:
+        mix = _parse_mix(args.mix)
+    except ValueError as e:
+        ap.error(str(e))
+
+    report = asyncio.run(run(args.url, args.concurrency, args.duration, args.requests, mix,
+                             args.email, args.seed_paypal_token, args.timeout))
+    _print(report)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nreport written to {args.out}")
+    return 1 if report["overall"]["count"] == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
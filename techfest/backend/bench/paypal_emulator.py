@@ -0,0 +1,245 @@
+"""
+Local stand-in for the PayPal REST endpoints this app calls, for load tests
+without the sandbox's throttling and latency.
+
+    python -m techfest.backend.bench.paypal_emulator --port 8089 --txns 50000 --latency-ms 80
+    PAYPAL_BASE_URL=http://127.0.0.1:8089 uvicorn techfest.backend.main:app
+
+Implemented: POST /v1/oauth2/token (client_credentials, authorization_code,
+refresh_token), GET /v1/reporting/transactions (date window + pagination),
+POST /v2/invoicing/search-invoices, GET/POST /v2/invoicing/invoices,
+GET /v2/invoicing/invoices/{id}, POST /v2/invoicing/invoices/{id}/send.
+
+Latency (mean + jitter), 5xx error rate and 429 rate are injected per request
+and can be changed at runtime via POST /_emulator/config; GET /_emulator/stats
+shows request counts.
+"""
+import argparse
+import asyncio
+import os
+import random
+import secrets
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import Body, FastAPI, Form, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from techfest.backend.bench.generators import generate_txns
+
+CONFIG: Dict[str, Any] = {
+    "latency_ms": float(os.getenv("EMULATOR_LATENCY_MS", "50")),
+    "jitter_ms": float(os.getenv("EMULATOR_JITTER_MS", "20")),
+    "error_rate": float(os.getenv("EMULATOR_ERROR_RATE", "0")),
+    "throttle_rate": float(os.getenv("EMULATOR_THROTTLE_RATE", "0")),
+    "txns": int(os.getenv("EMULATOR_TXNS", "20000")),
+    "invoices": int(os.getenv("EMULATOR_INVOICES", "200")),
+    "seed": int(os.getenv("EMULATOR_SEED", "7")),
+}
+_RUNTIME_KEYS = ("latency_ms", "jitter_ms", "error_rate", "throttle_rate")
+
+app = FastAPI(title="PayPal emulator")
+stats: Counter = Counter()
+
+
+class Dataset:
+    def __init__(self, txns: int, invoices: int, seed: int):
+        now = datetime.now(timezone.utc)
+        rows = list(generate_txns(txns, seed=seed, now=now, days=400))
+        rows.sort(key=lambda t: t["transaction_info"]["transaction_initiation_date"])
+        self.txns = rows
+        self.txn_keys = [t["transaction_info"]["transaction_initiation_date"][:19] for t in rows]
+        rng = random.Random(seed)
+        self.invoices: Dict[str, Dict[str, Any]] = {}
+        for i in range(invoices):
+            self._add_invoice(rng.choice(["UNPAID", "SENT", "DRAFT", "PAID", "PAID"]),
+                              now - timedelta(days=rng.randrange(120)), rng)
+
+    def _add_invoice(self, status: str, when: datetime, rng: random.Random,
+                     body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        inv_id = f"INV2-{secrets.token_hex(2).upper()}-{secrets.token_hex(2).upper()}-{secrets.token_hex(2).upper()}"
+        value = f"{rng.uniform(10, 900):.2f}"
+        detail = dict((body or {}).get("detail") or {})
+        detail.update(
+            invoice_number=detail.get("invoice_number") or str(1000 + len(self.invoices)),
+            invoice_date=when.date().isoformat(),
+            currency_code=detail.get("currency_code") or "USD",
+            metadata={
+                "create_time": when.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "recipient_view_url": None if status == "DRAFT" else f"https://www.sandbox.paypal.com/invoice/p/#{inv_id}",
+                "invoicer_view_url": f"https://www.sandbox.paypal.com/invoice/details/{inv_id}",
+            },
+        )
+        inv = {
+            "id": inv_id,
+            "status": status,
+            "detail": detail,
+            "invoicer": (body or {}).get("invoicer") or {"email_address": "merchant@example.com"},
+            "primary_recipients": (body or {}).get("primary_recipients")
+                                  or [{"billing_info": {"email_address": f"customer{rng.randrange(500)}@example.com"}}],
+            "items": (body or {}).get("items") or [],
+            "amount": {"currency_code": detail["currency_code"], "value": value},
+            "due_amount": {"currency_code": detail["currency_code"], "value": "0.00" if status == "PAID" else value},
+        }
+        self.invoices[inv_id] = inv
+        return inv
+
+    def window(self, start: str, end: str) -> List[Dict[str, Any]]:
+        lo = bisect_left(self.txn_keys, start[:19])
+        hi = bisect_right(self.txn_keys, end[:19])
+        return self.txns[lo:hi]
+
+
+_data: Optional[Dataset] = None
+
+
+def data() -> Dataset:
+    global _data
+    if _data is None:
+        _data = Dataset(CONFIG["txns"], CONFIG["invoices"], CONFIG["seed"])
+    return _data
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    if request.url.path.startswith("/_emulator"):
+        return await call_next(request)
+    stats[f"{request.method} {request.url.path.split('/INV2-')[0]}"] += 1
+    delay = max(0.0, random.gauss(CONFIG["latency_ms"], CONFIG["jitter_ms"])) / 1000
+    if delay:
+        await asyncio.sleep(delay)
+    r = random.random()
+    if r < CONFIG["throttle_rate"]:
+        stats["injected_429"] += 1
+        return JSONResponse({"name": "RATE_LIMIT_REACHED", "message": "Too many requests"},
+                            status_code=429, headers={"Retry-After": "1"})
+    if r < CONFIG["throttle_rate"] + CONFIG["error_rate"]:
+        stats["injected_5xx"] += 1
+        return JSONResponse({"name": "INTERNAL_SERVICE_ERROR", "message": "Injected failure"}, status_code=503)
+    if not request.url.path.startswith("/v1/oauth2") and not request.headers.get("authorization", "").startswith("Bearer "):
+        return JSONResponse({"error": "invalid_token"}, status_code=401)
+    return await call_next(request)
+
+
+@app.post("/v1/oauth2/token")
+async def oauth_token(grant_type: str = Form(...), code: Optional[str] = Form(None),
+                      refresh_token: Optional[str] = Form(None)):
+    if grant_type not in ("client_credentials", "authorization_code", "refresh_token"):
+        raise HTTPException(status_code=400, detail="unsupported_grant_type")
+    body = {
+        "scope": "https://uri.paypal.com/services/invoicing https://uri.paypal.com/services/reporting/search/read",
+        "access_token": f"A21AA{secrets.token_urlsafe(48)}",
+        "token_type": "Bearer",
+        "app_id": "APP-EMULATOR",
+        "expires_in": 32400,
+        "nonce": f"{datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}{secrets.token_hex(8)}",
+    }
+    if grant_type == "authorization_code":
+        body["refresh_token"] = f"R23AA{secrets.token_urlsafe(48)}"
+    return body
+
+
+@app.get("/v1/reporting/transactions")
+async def reporting_transactions(start_date: str, end_date: str, page: int = 1, page_size: int = 100):
+    if page < 1 or not 1 <= page_size <= 500:
+        raise HTTPException(status_code=400, detail="INVALID_REQUEST")
+    rows = data().window(start_date, end_date)
+    total_pages = max(1, -(-len(rows) // page_size))
+    chunk = rows[(page - 1) * page_size: page * page_size]
+    return {
+        "transaction_details": chunk,
+        "account_number": "SELLERACCOUNT",
+        "start_date": start_date,
+        "end_date": end_date,
+        "last_refreshed_datetime": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+0000"),
+        "page": page,
+        "total_items": len(rows),
+        "total_pages": total_pages,
+        "links": [],
+    }
+
+
+def _page(items: List[Dict[str, Any]], page: int, page_size: int) -> Dict[str, Any]:
+    return {
+        "items": items[(page - 1) * page_size: page * page_size],
+        "total_items": len(items),
+        "total_pages": max(1, -(-len(items) // page_size)),
+        "links": [],
+    }
+
+
+@app.post("/v2/invoicing/search-invoices")
+async def search_invoices(page: int = 1, page_size: int = 20, body: Dict[str, Any] = Body(default={})):
+    wanted = set(body.get("status") or [])
+    items = [i for i in data().invoices.values() if not wanted or i["status"] in wanted]
+    return _page(items, page, page_size)
+
+
+@app.get("/v2/invoicing/invoices")
+async def list_invoices(page: int = 1, page_size: int = 20):
+    return _page(list(data().invoices.values()), page, page_size)
+
+
+@app.post("/v2/invoicing/invoices", status_code=201)
+async def create_invoice(body: Dict[str, Any] = Body(...)):
+    inv = data()._add_invoice("DRAFT", datetime.now(timezone.utc), random.Random(), body)
+    return inv
+
+
+@app.get("/v2/invoicing/invoices/{invoice_id}")
+async def show_invoice(invoice_id: str):
+    inv = data().invoices.get(invoice_id)
+    if not inv:
+        raise HTTPException(status_code=404, detail="RESOURCE_NOT_FOUND")
+    return inv
+
+
+@app.post("/v2/invoicing/invoices/{invoice_id}/send")
+async def send_invoice(invoice_id: str):
+    inv = data().invoices.get(invoice_id)
+    if not inv:
+        raise HTTPException(status_code=404, detail="RESOURCE_NOT_FOUND")
+    if inv["status"] == "DRAFT":
+        inv["status"] = "SENT"
+    inv["detail"]["metadata"]["recipient_view_url"] = f"https://www.sandbox.paypal.com/invoice/p/#{invoice_id}"
+    return {"rel": "payer-view", "href": inv["detail"]["metadata"]["recipient_view_url"], "method": "GET"}
+
+
+@app.get("/_emulator/stats")
+async def emulator_stats():
+    return {"config": CONFIG, "requests": dict(stats)}
+
+
+@app.post("/_emulator/config")
+async def emulator_config(update: Dict[str, float] = Body(...)):
+    unknown = set(update) - set(_RUNTIME_KEYS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Only {', '.join(_RUNTIME_KEYS)} can change at runtime")
+    CONFIG.update({k: float(v) for k, v in update.items()})
+    return CONFIG
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    ap = argparse.ArgumentParser(description="Local PayPal API emulator")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--txns", type=int, default=CONFIG["txns"])
+    ap.add_argument("--invoices", type=int, default=CONFIG["invoices"])
+    ap.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"])
+    ap.add_argument("--jitter-ms", type=float, default=CONFIG["jitter_ms"])
+    ap.add_argument("--error-rate", type=float, default=CONFIG["error_rate"])
+    ap.add_argument("--throttle-rate", type=float, default=CONFIG["throttle_rate"])
+    ap.add_argument("--seed", type=int, default=CONFIG["seed"])
+    args = ap.parse_args(argv)
+    CONFIG.update(txns=args.txns, invoices=args.invoices, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                  error_rate=args.error_rate, throttle_rate=args.throttle_rate, seed=args.seed)
+    data()  # build the dataset before accepting traffic
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Micro-benchmarks for the transaction data path.
+
+    python -m techfest.backend.bench.run --sizes 1k,10k,100k --out bench/base.json
+    python -m techfest.backend.bench.run --sizes 1m --only flatten_txn,ingest_to_sqlite
+    python -m techfest.backend.bench.run --compare bench/base.json bench/new.json --threshold 0.1
+
+Each benchmark reports best-of-N wall time, throughput (rows/s) and peak
+Python heap (tracemalloc, measured in a separate run so it doesn't skew timing;
+process-pool workers used by ingest are not included). Compare mode exits 1
+when throughput drops or peak memory grows by more than the threshold.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from techfest.backend.bench.generators import stream_from_pool, txn_pool
+from techfest.backend.paypal_transactions import storage
+from techfest.backend.paypal_transactions.csv_export import _row_from_txn
+from techfest.backend.paypal_transactions.notify import _parse_iso8601_utc, show_recurring_same_day_last_3_months
+
+POOL_SIZE = 5000
+
+
+class Context:
+    """Shared inputs; DB/CSV/snapshot fixtures are built once per size and reused."""
+
+    def __init__(self, workdir: str, workers: Optional[int]):
+        self.workdir = workdir
+        self.workers = workers
+        self.pool = txn_pool(POOL_SIZE, seed=42)
+        self._fixtures: Dict[Tuple[str, int], str] = {}
+
+    def db(self, n: int) -> str:
+        key = ("db", n)
+        if key not in self._fixtures:
+            path = os.path.join(self.workdir, f"txns_{n}.db")
+            storage.ingest_to_sqlite(stream_from_pool(self.pool, n), db_path=path, workers=self.workers)
+            self._fixtures[key] = path
+        return self._fixtures[key]
+
+    def csv(self, n: int) -> str:
+        key = ("csv", n)
+        if key not in self._fixtures:
+            path = os.path.join(self.workdir, f"txns_{n}.csv")
+            storage.export_csv(self.db(n), path)
+            self._fixtures[key] = path
+        return self._fixtures[key]
+
+    def snapshot(self, n: int) -> str:
+        key = ("snapshot", n)
+        if key not in self._fixtures:
+            path = os.path.join(self.workdir, f"txns_{n}.ppxcol")
+            storage.export_snapshot(self.db(n), path)
+            self._fixtures[key] = path
+        return self._fixtures[key]
+
+
+# Each benchmark: prepare(ctx, n) -> run, where run() does the measured work and returns rows processed.
+Bench = Callable[[Context, int], Callable[[], int]]
+
+
+def _flatten_txn(ctx: Context, n: int):
+    def run():
+        for t in stream_from_pool(ctx.pool, n, unique_ids=False):
+            storage._flatten_txn(t)
+        return n
+    return run
+
+
+def _row_from_txn_bench(ctx: Context, n: int):
+    def run():
+        for t in stream_from_pool(ctx.pool, n, unique_ids=False):
+            _row_from_txn(t)
+        return n
+    return run
+
+
+def _parse_iso(ctx: Context, n: int):
+    stamps = [t["transaction_info"]["transaction_initiation_date"] for t in ctx.pool]
+
+    def run():
+        m = len(stamps)
+        for i in range(n):
+            _parse_iso8601_utc(stamps[i % m])
+        return n
+    return run
+
+
+def _ingest(ctx: Context, n: int):
+    path = os.path.join(ctx.workdir, f"ingest_{n}.db")
+
+    def run():
+        return storage.ingest_to_sqlite(stream_from_pool(ctx.pool, n), db_path=path, workers=ctx.workers)
+    return run
+
+
+def _export_csv(ctx: Context, n: int):
+    db = ctx.db(n)
+    out = os.path.join(ctx.workdir, f"export_{n}.csv")
+    return lambda: storage.export_csv(db, out)
+
+
+def _recurring(source: str) -> Bench:
+    def prepare(ctx: Context, n: int):
+        path = ctx.csv(n) if source == "csv" else ctx.snapshot(n)
+
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):  # the detector prints every match
+                show_recurring_same_day_last_3_months(path)
+            return n
+        return run
+    return prepare
+
+
+BENCHMARKS: Dict[str, Bench] = {
+    "flatten_txn": _flatten_txn,
+    "row_from_txn": _row_from_txn_bench,
+    "parse_iso8601_utc": _parse_iso,
+    "ingest_to_sqlite": _ingest,
+    "export_csv": _export_csv,
+    "recurring_same_day_csv": _recurring("csv"),
+    "recurring_same_day_snapshot": _recurring("snapshot"),
+}
+
+
+def _parse_size(s: str) -> int:
+    s = s.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s[:-1] if mult > 1 else s) * mult)
+
+
+def measure(bench: Bench, ctx: Context, n: int, repeat: int, memory: bool) -> Dict[str, Any]:
+    run = bench(ctx, n)
+    times = []
+    rows = 0
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        rows = run()
+        times.append(time.perf_counter() - started)
+    best = min(times)
+    result = {
+        "rows": rows,
+        "seconds": round(best, 6),
+        "seconds_all": [round(t, 6) for t in times],
+        "rows_per_sec": round(rows / best, 1) if best > 0 else None,
+        "peak_kb": None,
+    }
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            result["peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes: List[int], names: List[str], repeat: int, memory: bool,
+              workers: Optional[int]) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="techfest-bench-")
+    results = []
+    try:
+        ctx = Context(workdir, workers)
+        for n in sizes:
+            for name in names:
+                r = measure(BENCHMARKS[name], ctx, n, repeat, memory)
+                r.update(bench=name, size=n)
+                results.append(r)
+                peak = f"{r['peak_kb']:>9} KB" if r["peak_kb"] is not None else ""
+                print(f"{name:<30} {n:>9}  {r['seconds']:>9.3f} s  {r['rows_per_sec'] or 0:>12.0f} rows/s  {peak}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_rev": _git_rev(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "workers": workers,
+        },
+        "results": results,
+    }
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """One row per (bench, size) present in both; regression if slower/heavier beyond threshold."""
+    old = {(r["bench"], r["size"]): r for r in base["results"]}
+    rows = []
+    for r in new["results"]:
+        b = old.get((r["bench"], r["size"]))
+        if not b:
+            continue
+        speed = (r["rows_per_sec"] / b["rows_per_sec"] - 1) if b.get("rows_per_sec") and r.get("rows_per_sec") else None
+        mem = (r["peak_kb"] / b["peak_kb"] - 1) if b.get("peak_kb") and r.get("peak_kb") else None
+        rows.append({
+            "bench": r["bench"], "size": r["size"],
+            "throughput_change": speed, "peak_mem_change": mem,
+            "regression": (speed is not None and speed < -threshold) or (mem is not None and mem > threshold),
+        })
+    return rows
+
+
+def _pct(v: Optional[float]) -> str:
+    return f"{v * 100:+7.1f}%" if v is not None else "      -"
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark the transaction data path")
+    ap.add_argument("--sizes", default="1k,10k,100k", help="comma-separated, e.g. 1k,10k,100k,1m")
+    ap.add_argument("--only", help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory run")
+    ap.add_argument("--workers", type=int, default=None, help="flatten workers for ingest (default: PAYPAL_FLATTEN_WORKERS)")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two result files")
+    ap.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression (default 0.10)")
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        rows = compare(base, new, args.threshold)
+        print(f"{'bench':<30} {'size':>9}  {'throughput':>10}  {'peak mem':>10}")
+        for r in rows:
+            flag = "  REGRESSION" if r["regression"] else ""
+            print(f"{r['bench']:<30} {r['size']:>9}  {_pct(r['throughput_change']):>10}  {_pct(r['peak_mem_change']):>10}{flag}")
+        return 1 if any(r["regression"] for r in rows) else 0
+
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        ap.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    sizes = [_parse_size(s) for s in args.sizes.split(",")]
+
+    report = run_suite(sizes, names, args.repeat, not args.no_memory, args.workers)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Server-side chat history, so clients send only a session id and the new message.
+
+Sessions live in process memory and belong to the user who created them (the
+token subject); other users get "unknown session". Each user keeps at most
+CHAT_MAX_SESSIONS_PER_USER, their own least recently used dropped first, so one
+user can't flush everyone else's history; the process as a whole keeps at most
+CHAT_MAX_SESSIONS. Idle sessions expire after CHAT_SESSION_TTL_S. History is
+append-only between compactions, so each turn's prompt starts with the exact
+bytes of the previous one and provider prompt caching keeps hitting. Once the
+history passes CHAT_HISTORY_MAX_TOKENS, everything before the last
+CHAT_KEEP_MESSAGES messages is folded into a running summary. The cut is made
+at a user message so tool calls stay with their results.
+"""
+import asyncio
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from techfest.backend.core.tool_results import estimate_tokens
+
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+CHAT_MAX_SESSIONS_PER_USER = int(os.getenv("CHAT_MAX_SESSIONS_PER_USER", "5"))
+CHAT_SESSION_TTL_S = float(os.getenv("CHAT_SESSION_TTL_S", "3600"))
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "6000"))
+CHAT_KEEP_MESSAGES = int(os.getenv("CHAT_KEEP_MESSAGES", "8"))
+
+log = logging.getLogger("techfest.chat.sessions")
+
+Summarizer = Callable[[List[Dict[str, Any]], Optional[str]], Awaitable[str]]
+
+
+class ChatSession:
+    def __init__(self, session_id: str, owner: str):
+        self.id = session_id
+        self.owner = owner
+        self.messages: List[Dict[str, Any]] = []
+        self.summary: Optional[str] = None
+        self.last_used = time.monotonic()
+        # One turn (or compaction) at a time per session; history order depends on it
+        self.lock = asyncio.Lock()
+
+
+_lock = threading.Lock()
+_sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+# owner -> their session ids, least recently used first
+_by_owner: Dict[str, "OrderedDict[str, None]"] = {}
+
+
+def _drop(session_id: str) -> None:
+    session = _sessions.pop(session_id)
+    owned = _by_owner[session.owner]
+    del owned[session_id]
+    if not owned:
+        del _by_owner[session.owner]
+
+
+def _expire(now: float) -> None:
+    while _sessions:
+        oldest = next(iter(_sessions.values()))
+        if now - oldest.last_used <= CHAT_SESSION_TTL_S:
+            break
+        _drop(oldest.id)
+
+
+def create(owner: str) -> ChatSession:
+    session = ChatSession(secrets.token_urlsafe(16), owner)
+    with _lock:
+        _expire(session.last_used)
+        owned = _by_owner.setdefault(owner, OrderedDict())
+        while len(owned) >= CHAT_MAX_SESSIONS_PER_USER:
+            _drop(next(iter(owned)))
+            owned = _by_owner.setdefault(owner, OrderedDict())
+        _sessions[session.id] = session
+        owned[session.id] = None
+        while len(_sessions) > CHAT_MAX_SESSIONS:
+            _drop(next(iter(_sessions)))
+    return session
+
+
+def get(session_id: str, owner: str) -> Optional[ChatSession]:
+    """The owner's live session, marked as just used; None if unknown, expired or someone else's."""
+    now = time.monotonic()
+    with _lock:
+        _expire(now)
+        session = _sessions.get(session_id)
+        if session is None or session.owner != owner:
+            return None
+        session.last_used = now
+        _sessions.move_to_end(session_id)
+        _by_owner[owner].move_to_end(session_id)
+        return session
+
+
+def delete(session_id: str, owner: str) -> bool:
+    with _lock:
+        session = _sessions.get(session_id)
+        if session is None or session.owner != owner:
+            return False
+        _drop(session_id)
+        return True
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        return {"sessions": len(_sessions), "users": len(_by_owner), "max_sessions": CHAT_MAX_SESSIONS,
+                "max_sessions_per_user": CHAT_MAX_SESSIONS_PER_USER, "ttl_s": CHAT_SESSION_TTL_S}
+
+
+def history_tokens(session: ChatSession) -> int:
+    text = json.dumps(session.messages, separators=(",", ":"), ensure_ascii=False, default=str)
+    return estimate_tokens(text) + estimate_tokens(session.summary or "")
+
+
+def _split_point(messages: List[Dict[str, Any]], keep: int) -> int:
+    """Index of the first kept message: the earliest user message within the last `keep`."""
+    for i in range(max(len(messages) - keep, 0), len(messages)):
+        if messages[i].get("role") == "user":
+            return i
+    return 0
+
+
+async def compact(session: ChatSession, summarize: Summarizer) -> bool:
+    """Folds old history into the summary once the session is over budget."""
+    async with session.lock:
+        before = history_tokens(session)
+        if before <= CHAT_HISTORY_MAX_TOKENS:
+            return False
+        cut = _split_point(session.messages, CHAT_KEEP_MESSAGES)
+        if cut == 0:
+            return False
+        try:
+            summary = await summarize(session.messages[:cut], session.summary)
+        except Exception:
+            log.exception("Summarizing chat session %s failed; keeping full history", session.id)
+            return False
+        session.summary = summary
+        session.messages = session.messages[cut:]
+        log.info("Chat session %s compacted: ~%d -> ~%d tokens (%d messages summarized)",
+                 session.id, before, history_tokens(session), cut)
+        return True
@@ -0,0 +1,140 @@
+"""
+tracemalloc snapshots and diffs, switched on/off at runtime from /admin/memory/*.
+
+While tracing is off nothing is hooked (tracemalloc isn't started), so there is
+no cost. Once started, allocations are tracked with MEMORY_TRACE_FRAMES frames.
+Snapshots are kept in memory, at most MEMORY_MAX_SNAPSHOTS of them with the
+oldest dropped first, and any two can be diffed by allocation site.
+"""
+import linecache
+import os
+import secrets
+import threading
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "10"))
+MEMORY_MAX_SNAPSHOTS = int(os.getenv("MEMORY_MAX_SNAPSHOTS", "5"))
+GROUP_BY = ("lineno", "filename", "traceback")
+
+_lock = threading.Lock()
+_snapshots: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+# Allocations made by the tooling itself are noise in every diff
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def _rss_kb() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def status() -> Dict[str, Any]:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    return {
+        "tracing": tracing,
+        "frames": tracemalloc.get_traceback_limit() if tracing else None,
+        "traced_current_kb": current // 1024,
+        "traced_peak_kb": peak // 1024,
+        "tracemalloc_overhead_kb": tracemalloc.get_tracemalloc_memory() // 1024 if tracing else 0,
+        "rss_kb": _rss_kb(),
+        "snapshots": [_summary(s) for s in _snapshots.values()],
+    }
+
+
+def start(frames: int = MEMORY_TRACE_FRAMES) -> Dict[str, Any]:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return status()
+
+
+def stop() -> Dict[str, Any]:
+    """Stops tracing and drops stored snapshots (their traces go with it)."""
+    with _lock:
+        _snapshots.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return status()
+
+
+def _summary(entry: Dict[str, Any], with_top: bool = True) -> Dict[str, Any]:
+    skip = ("snapshot",) if with_top else ("snapshot", "top")
+    return {k: v for k, v in entry.items() if k not in skip}
+
+
+def _site(stat_or_diff, group_by: str) -> str:
+    tb = stat_or_diff.traceback
+    if group_by == "traceback":
+        return " <- ".join(f"{f.filename}:{f.lineno}" for f in tb)
+    if group_by == "filename":
+        return tb[0].filename
+    return f"{tb[0].filename}:{tb[0].lineno}"
+
+
+def take_snapshot(label: Optional[str] = None, top: int = 10) -> Dict[str, Any]:
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running; start it first")
+    snap = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+    stats = snap.statistics("lineno")
+    entry = {
+        "id": secrets.token_hex(4),
+        "label": label,
+        "taken_at": datetime.now(timezone.utc).isoformat(),
+        "total_kb": sum(s.size for s in stats) // 1024,
+        "rss_kb": _rss_kb(),
+        "top": [{"site": _site(s, "lineno"), "size_kb": round(s.size / 1024, 1), "count": s.count}
+                for s in stats[:top]],
+        "snapshot": snap,
+    }
+    with _lock:
+        _snapshots[entry["id"]] = entry
+        while len(_snapshots) > MEMORY_MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return _summary(entry)
+
+
+def diff(base_id: str, target_id: Optional[str] = None, group_by: str = "lineno", top: int = 20) -> Dict[str, Any]:
+    """
+    Growth from base to target (a fresh snapshot if target_id is None), largest
+    size increase first.
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+    with _lock:
+        base = _snapshots.get(base_id)
+        target = _snapshots.get(target_id) if target_id else None
+    if base is None or (target_id and target is None):
+        raise KeyError(target_id if base is not None else base_id)
+    if target is None:
+        target = _snapshots[take_snapshot(label="diff-target")["id"]]
+
+    diffs = target["snapshot"].compare_to(base["snapshot"], group_by)
+    grown = sorted((d for d in diffs if d.size_diff > 0), key=lambda d: d.size_diff, reverse=True)
+    growth: List[Dict[str, Any]] = [
+        {
+            "site": _site(d, group_by),
+            "size_diff_kb": round(d.size_diff / 1024, 1),
+            "count_diff": d.count_diff,
+            "size_kb": round(d.size / 1024, 1),
+        }
+        for d in grown[:top]
+    ]
+    return {
+        "base": _summary(base, with_top=False),
+        "target": _summary(target, with_top=False),
+        "group_by": group_by,
+        "total_diff_kb": round(sum(d.size_diff for d in diffs) / 1024, 1),
+        "top_growth": growth,
+    }
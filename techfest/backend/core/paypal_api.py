@@ -1,10 +1,15 @@
 
+import asyncio
+
 import requests
 import time
 import dotenv
 import os
 
 from techfest.backend.paypal_transactions.auth import fetch_paypal_token
+from techfest.backend.core.metrics import upstream
+from techfest.backend.paypal_transactions.config import paypal_base_url
+from techfest.backend.core.http_client import get_http_client
 
 
 class Invoice:
@@ -20,7 +25,7 @@ class PayPalAPI:
     def __init__(self):
         dotenv.load_dotenv()
 
-        self.base_url = "https://api-m.sandbox.paypal.com"
+        self.base_url = paypal_base_url()
 
         self.client_id = os.getenv("PAYPAL_CLIENT_ID")
         self.client_secret = os.getenv("PAYPAL_CLIENT_SECRET")
@@ -61,18 +66,25 @@ class PayPalAPI:
             self.authenticate()
         return self.access_token
 
+    async def aget_token(self):
+        # Only a refresh reads the DB, so the thread hop is rare
+        if not self.access_token or not self.access_token_expires_in or time.time() >= self.access_token_expires_in:
+            return await asyncio.to_thread(self.get_token)
+        return self.access_token
+
     def get_invoices(self):
         """
         Fetch a list of invoices from PayPal API
         """
         access_token = self.get_token()
-        invoices_response = requests.get(
-            f"{self.base_url}/v2/invoicing/invoices",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {access_token}"
-            }
-        )
+        with upstream("paypal", "list_invoices"):
+            invoices_response = requests.get(
+                f"{self.base_url}/v2/invoicing/invoices",
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {access_token}"
+                }
+            )
 
         if invoices_response.status_code != 200:
             raise Exception("Failed to fetch invoices from PayPal API")
@@ -84,27 +96,83 @@ class PayPalAPI:
         Create a new invoice in PayPal API
         """
         access_token = self.get_token()
-        create_response = requests.post(
-            f"{self.base_url}/v2/invoicing/invoices",
-            json=invoice_data,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {access_token}",
-                "Prefer": "return=representation"
-            }
-        )
+        with upstream("paypal", "create_invoice"):
+            create_response = requests.post(
+                f"{self.base_url}/v2/invoicing/invoices",
+                json=invoice_data,
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {access_token}",
+                    "Prefer": "return=representation"
+                }
+            )
 
         if create_response.status_code != 201:
             raise Exception(f"Failed to create invoice draft in PayPal API: {create_response.text}")
 
-        send_response = requests.post(
-            f"{self.base_url}/v2/invoicing/invoices/{create_response.json().get('id')}/send",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {access_token}"
-            },
-            json={}
-        )
+        with upstream("paypal", "send_invoice"):
+            send_response = requests.post(
+                f"{self.base_url}/v2/invoicing/invoices/{create_response.json().get('id')}/send",
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {access_token}"
+                },
+                json={}
+            )
+
+        if send_response.status_code != 200:
+            raise Exception(f"Failed to send invoice in PayPal API: {send_response.text}")
+
+        return create_response.json()
+
+    async def aget_invoices(self):
+        """
+        get_invoices on the shared async HTTP client
+        """
+        access_token = await self.aget_token()
+        with upstream("paypal", "list_invoices"):
+            invoices_response = await get_http_client().get(
+                f"{self.base_url}/v2/invoicing/invoices",
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {access_token}"
+                }
+            )
+
+        if invoices_response.status_code != 200:
+            raise Exception("Failed to fetch invoices from PayPal API")
+
+        return invoices_response.json().get("items", [])
+
+    async def acreate_invoice(self, invoice_data):
+        """
+        create_invoice on the shared async HTTP client
+        """
+        access_token = await self.aget_token()
+        client = get_http_client()
+        with upstream("paypal", "create_invoice"):
+            create_response = await client.post(
+                f"{self.base_url}/v2/invoicing/invoices",
+                json=invoice_data,
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {access_token}",
+                    "Prefer": "return=representation"
+                }
+            )
+
+        if create_response.status_code != 201:
+            raise Exception(f"Failed to create invoice draft in PayPal API: {create_response.text}")
+
+        with upstream("paypal", "send_invoice"):
+            send_response = await client.post(
+                f"{self.base_url}/v2/invoicing/invoices/{create_response.json().get('id')}/send",
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {access_token}"
+                },
+                json={}
+            )
 
         if send_response.status_code != 200:
             raise Exception(f"Failed to send invoice in PayPal API: {send_response.text}")
@@ -1,8 +1,36 @@
 import os
 import json
+import logging
+import time
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
 import openai
 
+from techfest.backend.paypal_transactions.storage import search_transactions
+from techfest.backend.paypal_transactions.partitions import search_history
+from techfest.backend.core.metrics import upstream
+from techfest.backend.core.tracing import span
+from techfest.backend.core.tool_results import format_tool_result
+
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MAX_ITERATIONS = 4
+TOOL_TIMEOUT_S = float(os.getenv("CHAT_TOOL_TIMEOUT_S", "20"))
+TOOL_WORKERS = int(os.getenv("CHAT_TOOL_WORKERS", "8"))
+
+log = logging.getLogger("techfest.chat")
+
+_tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="chat-tool")
+
+
+def _search_transactions_tool(tool_input):
+    args = json.loads(tool_input or "{}")
+    page_size = 10
+    page = max(int(args.get("page") or 1), 1)
+    search = search_history if args.get("scope") == "history" else search_transactions
+    total, items = search(args.get("query", ""), limit=page_size, offset=(page - 1) * page_size)
+    return {"total": total, "page": page, "page_size": page_size, "items": items}
 
 
 class PayPalService:
@@ -14,6 +42,9 @@ class PayPalService:
         self.openai_client = openai.Client(
             api_key=self.openai_api_key
         )
+        self.async_openai_client = openai.AsyncOpenAI(
+            api_key=self.openai_api_key
+        )
 
         self.paypal_api = paypal_api
 
@@ -22,22 +53,16 @@ class PayPalService:
         Handle user message and decide what actions to take
         """
 
-        messages = [
-            {
-                'role': 'user',
-                'content': self.__config['prompts']['system_prompt']
-            },
-            *messages
-        ]
+        messages = self.__with_system_prompt(messages)
 
-        MAX_ITERATIONS = 4
         for _ in range(MAX_ITERATIONS):
 
-            response = self.openai_client.chat.completions.create(
-                model="gpt-5-nano",
-                messages=messages,
-                tools=self.__config['prompts']['tools']
-            )
+            with upstream("openai", "chat"):
+                response = self.openai_client.chat.completions.create(
+                    model="gpt-5-nano",
+                    messages=messages,
+                    tools=self.__config['prompts']['tools']
+                )
 
             # print(f'\n\nResponse: {response}\n\n')
             # print(f'Choices: {response.choices}\n\n')
@@ -48,40 +73,241 @@ class PayPalService:
             response_message = response.choices[0].message
 
             if hasattr(response_message, 'tool_calls') and response_message.tool_calls:
-                tool_call = response_message.tool_calls[0]
-                tool_name = tool_call.function.name
-                tool_input = tool_call.function.arguments
+                tool_calls = [
+                    {'id': tc.id, 'name': tc.function.name, 'arguments': tc.function.arguments}
+                    for tc in response_message.tool_calls
+                ]
+                content = response_message.content if hasattr(response_message, 'content') else None
+                messages.append(self.__assistant_message(content, tool_calls))
 
-                # print(f"Calling tool: {tool_name}")
-                # print(f"Arguments: {tool_input}")
+                for tool_call, (tool_response, _) in zip(tool_calls, self.__run_tools(tool_calls)):
+                    messages.append({
+                        'role': 'tool',
+                        'content': format_tool_result(tool_call['name'], tool_response),
+                        'tool_call_id': tool_call['id']
+                    })
+                    print(f"Tool response: {tool_response}")
+
+            else:
+                return response_message.content
+
+    async def acall_model(self, messages=[]):
+        """
+        call_model on the async OpenAI client and async PayPal calls, so a chat
+        in flight holds a coroutine rather than a threadpool thread.
+        """
+
+        return await self.__arun_loop(self.__with_system_prompt(messages))
+
+    async def achat_turn(self, history, message, summary=None):
+        """
+        One turn of a server-side session: returns (reply, new_messages), where
+        new_messages (user message, tool rounds, final reply) extend history.
+        The prompt is system prompt, summary, history, new message, in that order,
+        so consecutive turns share their prefix.
+        """
+
+        messages = self.__with_system_prompt(history, summary)
+        start = len(messages)
+        messages.append({'role': 'user', 'content': message})
+        reply = await self.__arun_loop(messages)
+        messages.append({'role': 'assistant', 'content': reply or ''})
+        return reply, messages[start:]
+
+    async def asummarize(self, messages, previous_summary=None):
+        """
+        Condenses messages (and the previous summary) into a short summary for
+        chat_sessions.compact.
+        """
+
+        transcript = "\n".join(
+            f"{m['role']}: {m.get('content') or ', '.join(tc['function']['name'] for tc in m.get('tool_calls') or [])}"
+            for m in messages
+        )
+        if previous_summary:
+            transcript = f"Previous summary:\n{previous_summary}\n\nConversation:\n{transcript}"
+        with upstream("openai", "summarize"):
+            response = await self.async_openai_client.chat.completions.create(
+                model="gpt-5-nano",
+                messages=[
+                    {'role': 'system', 'content': self.__config['prompts']['summary_prompt']},
+                    {'role': 'user', 'content': transcript}
+                ]
+            )
+        if not response.choices or not response.choices[0].message.content:
+            raise Exception("No summary from AI model")
+        return response.choices[0].message.content
+
+    async def __arun_loop(self, messages):
+        """Completion/tool rounds until the model answers; appends every round to messages."""
+
+        for _ in range(MAX_ITERATIONS):
+
+            with upstream("openai", "chat"):
+                response = await self.async_openai_client.chat.completions.create(
+                    model="gpt-5-nano",
+                    messages=messages,
+                    tools=self.__config['prompts']['tools']
+                )
+
+            if not response.choices:
+                raise Exception("No response from AI model")
 
+            response_message = response.choices[0].message
+
+            if not response_message.tool_calls:
+                return response_message.content
+
+            tool_calls = [
+                {'id': tc.id, 'name': tc.function.name, 'arguments': tc.function.arguments}
+                for tc in response_message.tool_calls
+            ]
+            messages.append(self.__assistant_message(response_message.content, tool_calls))
+
+            for tool_call, (tool_response, _) in zip(tool_calls, await self.__arun_tools(tool_calls)):
                 messages.append({
-                    'role': 'assistant',
-                    'content': response_message.content if hasattr(response_message, 'content') else None,
-                    'tool_calls': [
-                        {
-                            'id': tool_call.id,
-                            'type': 'function',
-                            'function': {
-                                'name': tool_name,
-                                'arguments': tool_input
-                            }
-                        }
-                    ]
+                    'role': 'tool',
+                    'content': format_tool_result(tool_call['name'], tool_response),
+                    'tool_call_id': tool_call['id']
                 })
 
-                tool_response = self.__call_tool(tool_name, tool_input)
+    async def stream_model(self, messages=[]):
+        """
+        Same loop as acall_model, but yields (event, data) pairs as they happen:
+        "token" per content delta, "tool_start"/"tool_end" around each tool call,
+        and finally "done" with the full reply.
+        """
+
+        messages = self.__with_system_prompt(messages)
 
+        for _ in range(MAX_ITERATIONS):
+
+            # Only opening the stream is timed; the consumer's pace must not count as upstream latency
+            with upstream("openai", "chat_stream"):
+                stream = await self.async_openai_client.chat.completions.create(
+                    model="gpt-5-nano",
+                    messages=messages,
+                    tools=self.__config['prompts']['tools'],
+                    stream=True
+                )
+
+            content = []
+            tool_calls = {}  # index -> {"id", "name", "arguments"}, assembled from deltas
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content.append(delta.content)
+                    yield "token", {"content": delta.content}
+                for tc in delta.tool_calls or []:
+                    call = tool_calls.setdefault(tc.index, {"id": None, "name": "", "arguments": ""})
+                    if tc.id:
+                        call["id"] = tc.id
+                    if tc.function and tc.function.name:
+                        call["name"] += tc.function.name
+                    if tc.function and tc.function.arguments:
+                        call["arguments"] += tc.function.arguments
+
+            if not tool_calls:
+                yield "done", {"reply": "".join(content)}
+                return
+
+            tool_calls = [tool_calls[i] for i in sorted(tool_calls)]
+            messages.append(self.__assistant_message("".join(content) or None, tool_calls))
+
+            for tool_call in tool_calls:
+                yield "tool_start", {"name": tool_call["name"], "id": tool_call["id"]}
+            for tool_call, (tool_response, ms) in zip(tool_calls, await self.__arun_tools(tool_calls)):
+                yield "tool_end", {"name": tool_call["name"], "id": tool_call["id"], "ms": ms}
                 messages.append({
                     'role': 'tool',
-                    'content': str(tool_response),
-                    'tool_call_id': tool_call.id
+                    'content': format_tool_result(tool_call['name'], tool_response),
+                    'tool_call_id': tool_call["id"]
                 })
 
-                print(f"Tool response: {tool_response}")
+        log.warning("Chat stream stopped after %d iterations without a final reply", MAX_ITERATIONS)
+        yield "done", {"reply": None}
 
-            else:
-                return response_message.content
+    @staticmethod
+    def __assistant_message(content, tool_calls):
+        return {
+            'role': 'assistant',
+            'content': content,
+            'tool_calls': [
+                {
+                    'id': tc['id'],
+                    'type': 'function',
+                    'function': {
+                        'name': tc['name'],
+                        'arguments': tc['arguments']
+                    }
+                }
+                for tc in tool_calls
+            ]
+        }
+
+    def __run_tools(self, tool_calls):
+        """
+        Runs all tool calls of one model turn concurrently and returns
+        (result, ms) in call order. A tool that fails or exceeds TOOL_TIMEOUT_S
+        gets an error string as its result, so the model can still answer.
+        Tools that time out keep running in the pool until they finish.
+        """
+
+        def run(tool_call):
+            started = time.perf_counter()
+            with span(f"tool.{tool_call['name']}"):
+                result = self.__call_tool(tool_call['name'], tool_call['arguments'])
+            return result, round((time.perf_counter() - started) * 1000, 1)
+
+        # copy_context keeps each tool's span under the request's trace
+        futures = [_tool_pool.submit(contextvars.copy_context().run, run, tc) for tc in tool_calls]
+        deadline = time.monotonic() + TOOL_TIMEOUT_S
+        results = []
+        for tool_call, future in zip(tool_calls, futures):
+            try:
+                results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FutureTimeout:
+                future.cancel()
+                log.warning("Tool %s timed out after %gs", tool_call['name'], TOOL_TIMEOUT_S)
+                results.append((f"Tool {tool_call['name']} timed out after {TOOL_TIMEOUT_S:g}s",
+                                TOOL_TIMEOUT_S * 1000))
+            except Exception as e:
+                log.exception("Tool %s failed", tool_call['name'])
+                results.append((f"Tool {tool_call['name']} failed: {e}", None))
+        return results
+
+    async def __arun_tools(self, tool_calls):
+        """Async counterpart of __run_tools; timed-out tools are cancelled."""
+
+        async def run(tool_call):
+            started = time.perf_counter()
+            try:
+                with span(f"tool.{tool_call['name']}"):
+                    result = await asyncio.wait_for(
+                        self.__acall_tool(tool_call['name'], tool_call['arguments']), TOOL_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                log.warning("Tool %s timed out after %gs", tool_call['name'], TOOL_TIMEOUT_S)
+                result = f"Tool {tool_call['name']} timed out after {TOOL_TIMEOUT_S:g}s"
+            except Exception as e:
+                log.exception("Tool %s failed", tool_call['name'])
+                result = f"Tool {tool_call['name']} failed: {e}"
+            return result, round((time.perf_counter() - started) * 1000, 1)
+
+        return await asyncio.gather(*(run(tc) for tc in tool_calls))
+
+    def __with_system_prompt(self, messages, summary=None):
+        # Fixed text first, so every request shares the longest possible prefix
+        prefix = [
+            {
+                'role': 'system',
+                'content': self.__config['prompts']['system_prompt']
+            }
+        ]
+        if summary:
+            prefix.append({'role': 'system', 'content': f"Summary of the earlier conversation:\n{summary}"})
+        return [*prefix, *messages]
 
     def __call_tool(self, tool_name, tool_input):
         match tool_name:
@@ -90,6 +316,21 @@ class PayPalService:
             case "create_invoice":
                 invoice_data = json.loads(tool_input)
                 return self.paypal_api.create_invoice(invoice_data)
+            case "search_transactions":
+                return _search_transactions_tool(tool_input)
+            case _:
+                return f"Unknown tool: {tool_name}"
+
+    async def __acall_tool(self, tool_name, tool_input):
+        match tool_name:
+            case "get_invoices":
+                return await self.paypal_api.aget_invoices()
+            case "create_invoice":
+                invoice_data = json.loads(tool_input)
+                return await self.paypal_api.acreate_invoice(invoice_data)
+            case "search_transactions":
+                # sqlite FTS query; short, but still blocking
+                return await asyncio.to_thread(_search_transactions_tool, tool_input)
             case _:
                 return f"Unknown tool: {tool_name}"
 
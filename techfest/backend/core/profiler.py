@@ -0,0 +1,192 @@
+"""
+Opt-in sampling profiler for single requests.
+
+A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>` or is picked
+by PROFILE_SAMPLE_RATE. While it runs, a sampler thread reads every other
+thread's stack (sys._current_frames) each PROFILE_INTERVAL_MS. Idle threads are
+skipped. The samples are written as folded stacks (`a;b;c <count>`), which
+flamegraph.pl, speedscope and inferno read directly.
+
+Async code shares the event-loop thread with concurrent requests, so samples
+taken while other requests are in flight can include their stacks as well;
+each profile records how many requests overlapped it. Only PROFILE_MAX_ACTIVE
+profiles run at once, and when nothing is configured the middleware does
+nothing but pass the request through.
+"""
+import asyncio
+import logging
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from techfest.backend.core import tracing
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "out/profiles")
+PROFILE_MAX_ACTIVE = int(os.getenv("PROFILE_MAX_ACTIVE", "1"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))  # recent profiles listed / kept on disk
+PROFILE_MAX_DEPTH = 128
+
+log = logging.getLogger("techfest.profiler")
+
+# Top frames that mean "this thread is parked, not working"
+_IDLE_FUNCS = {"wait", "select", "poll", "epoll", "_worker", "get", "accept", "sleep", "_wait_for_tstate_lock"}
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "thread.py", "base_events.py", "_thread.py")
+
+recent_profiles: Deque[Dict[str, Any]] = deque(maxlen=PROFILE_KEEP)
+_active_lock = threading.Lock()
+_active = 0
+_in_flight = 0
+
+
+def enabled() -> bool:
+    return bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return code.co_name in _IDLE_FUNCS and code.co_filename.endswith(_IDLE_FILES)
+
+
+class Sampler:
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000.0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> "Sampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me or _is_idle(frame):
+                    continue
+                parts: List[str] = []
+                f = frame
+                while f is not None and len(parts) < PROFILE_MAX_DEPTH:
+                    parts.append(_frame_label(f.f_code))
+                    f = f.f_back
+                parts.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(parts))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _prune_dir() -> None:
+    try:
+        files = sorted(
+            (os.path.join(PROFILE_DIR, n) for n in os.listdir(PROFILE_DIR) if n.endswith(".folded")),
+            key=os.path.getmtime,
+        )
+        for path in files[:-PROFILE_KEEP]:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def _save(meta: Dict[str, Any], sampler: Sampler) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    route = meta["route"].strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+    path = os.path.join(PROFILE_DIR, f"{meta['started_at'][:19].replace(':', '')}_{route}_{meta['id']}.folded")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(sampler.folded())
+    meta["file"] = path
+    recent_profiles.appendleft(meta)
+    _prune_dir()
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    return next((p for p in recent_profiles if p["id"] == profile_id), None)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    def _wanted(self, scope) -> bool:
+        if PROFILE_TOKEN:
+            for k, v in scope.get("headers") or []:
+                if k == b"x-profile":
+                    return secrets.compare_digest(v.decode("latin-1"), PROFILE_TOKEN)
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        global _active, _in_flight
+        if scope["type"] != "http" or not enabled():
+            return await self.app(scope, receive, send)
+
+        _in_flight += 1  # event-loop thread only; no lock needed
+        try:
+            if not self._wanted(scope):
+                return await self.app(scope, receive, send)
+            with _active_lock:
+                if _active >= PROFILE_MAX_ACTIVE:
+                    return await self.app(scope, receive, send)
+                _active += 1
+            await self._profile(scope, receive, send)
+        finally:
+            _in_flight -= 1
+
+    async def _profile(self, scope, receive, send):
+        global _active
+        meta: Dict[str, Any] = {
+            "id": secrets.token_hex(6),
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "trace_id": tracing.current_trace_id(),
+            "max_concurrent_requests": _in_flight,
+        }
+        status = [500]
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers") or []) + [(b"x-profile-id", meta["id"].encode())]
+            meta["max_concurrent_requests"] = max(meta["max_concurrent_requests"], _in_flight)
+            await send(message)
+
+        sampler = Sampler().start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            sampler.stop()
+            with _active_lock:
+                _active -= 1
+            route = scope.get("route")
+            meta.update(
+                route=getattr(route, "path", scope.get("path") or ""),
+                status=status[0],
+                duration_ms=round((time.perf_counter() - started) * 1000, 1),
+                samples=sampler.samples,
+                interval_ms=PROFILE_INTERVAL_MS,
+            )
+            try:
+                await asyncio.to_thread(_save, meta, sampler)
+            except OSError as e:
+                log.warning("Could not write profile: %s", e)
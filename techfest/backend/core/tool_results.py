@@ -0,0 +1,139 @@
+"""
+Turns raw tool results into the compact text that goes back to the model.
+
+Each tool has a projection that keeps only the fields the model needs (no links,
+no metadata, no nulls). The projected result is serialized as compact JSON and
+capped at TOOL_RESULT_TOKENS. If it is over the cap, list items are dropped
+from the end and a `truncated` note tells the model how many are missing and
+how to page for more. Token counts are estimated at ~4 characters per token,
+which is close enough for budgeting.
+"""
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+TOOL_RESULT_TOKENS = int(os.getenv("CHAT_TOOL_RESULT_TOKENS", "1500"))
+CHARS_PER_TOKEN = 4
+
+log = logging.getLogger("techfest.chat.tools")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _prune(value: Any) -> Any:
+    """Drops None/empty values and HATEOAS `links` at any depth."""
+    if isinstance(value, dict):
+        out = {k: _prune(v) for k, v in value.items() if k != "links"}
+        return {k: v for k, v in out.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_prune(v) for v in value]
+    return value
+
+
+def _invoice(inv: Dict[str, Any]) -> Dict[str, Any]:
+    detail = inv.get("detail") or {}
+    amount = inv.get("amount") or {}
+    due = inv.get("due_amount") or {}
+    recipients = inv.get("primary_recipients") or []
+    return {
+        "id": inv.get("id"),
+        "number": detail.get("invoice_number"),
+        "status": inv.get("status"),
+        "date": detail.get("invoice_date"),
+        "due_date": (detail.get("payment_term") or {}).get("due_date"),
+        "amount": amount.get("value"),
+        "due": due.get("value") if due.get("value") != amount.get("value") else None,
+        "currency": amount.get("currency_code") or detail.get("currency_code"),
+        "recipient": ((recipients[0] if recipients else {}).get("billing_info") or {}).get("email_address"),
+        "pay_url": (detail.get("metadata") or {}).get("recipient_view_url"),
+    }
+
+
+def _invoices(result: Any) -> Any:
+    if isinstance(result, list):
+        return {"count": len(result), "items": [_invoice(i) for i in result]}
+    return result
+
+
+def _created_invoice(result: Any) -> Any:
+    return _invoice(result) if isinstance(result, dict) else result
+
+
+def _transactions(result: Any) -> Any:
+    if not isinstance(result, dict):
+        return result
+    page, page_size, total = result.get("page") or 1, result.get("page_size"), result.get("total") or 0
+    out = {
+        "total": total,
+        "page": page,
+        "items": [
+            {
+                "id": t.get("transaction_id"),
+                "time": t.get("initiation_time"),
+                "status": t.get("status"),
+                "amount": t.get("amount_value"),
+                "currency": t.get("amount_currency"),
+                "from": t.get("sender_name") or t.get("payer_email"),
+                "invoice_id": t.get("invoice_id"),
+                "description": t.get("description") or t.get("item_names"),
+            }
+            for t in result.get("items") or []
+        ],
+    }
+    if page_size and page * page_size < total:
+        out["next_page"] = page + 1
+    return out
+
+
+PROJECTIONS: Dict[str, Callable[[Any], Any]] = {
+    "get_invoices": _invoices,
+    "create_invoice": _created_invoice,
+    "search_transactions": _transactions,
+}
+
+# What to tell the model when a tool's list had to be cut
+_PAGING_HINTS: Dict[str, str] = {
+    "search_transactions": "use a narrower query to see the omitted matches; next_page continues after this page",
+    "get_invoices": "ask the user to narrow down which invoices they need",
+}
+
+
+def _fit(payload: Dict[str, Any], tool_name: str, budget_chars: int) -> Dict[str, Any]:
+    items: List[Any] = payload["items"]
+    note = {"shown": 0, "omitted": len(items), "hint": _PAGING_HINTS.get(tool_name, "")}
+    used = len(_dumps({**payload, "items": [], "truncated": note}))
+    kept = []
+    for item in items:
+        size = len(_dumps(item)) + 1
+        if used + size > budget_chars:
+            break
+        kept.append(item)
+        used += size
+    note.update(shown=len(kept), omitted=len(items) - len(kept))
+    return {**payload, "items": kept, "truncated": note}
+
+
+def format_tool_result(tool_name: str, result: Any, budget_tokens: Optional[int] = None) -> str:
+    budget_chars = (budget_tokens or TOOL_RESULT_TOKENS) * CHARS_PER_TOKEN
+    if isinstance(result, str):
+        text = result
+    else:
+        payload = _prune(PROJECTIONS.get(tool_name, lambda r: r)(result))
+        text = _dumps(payload)
+        if len(text) > budget_chars and isinstance(payload, dict) and isinstance(payload.get("items"), list):
+            text = _dumps(_fit(payload, tool_name, budget_chars))
+    if len(text) > budget_chars:
+        cut = len(text) - budget_chars
+        text = f"{text[:budget_chars]}…[truncated {cut} chars]"
+
+    if log.isEnabledFor(logging.INFO):
+        log.info("Tool %s result: ~%d tokens raw, ~%d sent", tool_name,
+                 estimate_tokens(str(result)), estimate_tokens(text))
+    return text
@@ -0,0 +1,371 @@
+"""
+Lightweight request tracing.
+
+One root span per HTTP request (TracingMiddleware) and child spans for upstream
+calls (metrics.upstream), chat tool executions and DB queries. The current span
+lives in a contextvar, so it follows awaits and asyncio.to_thread / FastAPI's
+threadpool. Finished traces are handed to a background writer thread that
+appends them to a JSONL file (TRACE_FILE), one span per line; no collector needed.
+Off by default; when enabled, TRACE_SAMPLE_RATE of new traces are recorded and
+requests carrying a traceparent follow its sampled flag.
+
+Critical-path breakdown from that file:
+
+    python -m techfest.backend.core.tracing --route /chat
+    python -m techfest.backend.core.tracing --trace <trace_id>
+"""
+import argparse
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterator, List, Optional
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "0") == "1"
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_FILE = os.getenv("TRACE_FILE", "out/traces/spans.jsonl")
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(50 * 1024 * 1024)))  # then rotated to .1
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "2000"))  # per trace; runaway loops get truncated
+TRACE_QUEUE_MAX = int(os.getenv("TRACE_QUEUE_MAX", "1000"))  # finished traces waiting to be written
+
+log = logging.getLogger("techfest.tracing")
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "attributes",
+                 "start", "_t0", "duration_ms", "status", "error")
+
+    def __init__(self, trace: "_Trace", name: str, parent_id: Optional[str], kind: str, attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "kind": self.kind, "start": self.start, "duration_ms": self.duration_ms,
+            "status": self.status, "error": self.error, "attributes": self.attributes,
+        }
+
+
+class _Trace:
+    """Spans of one trace, written out together when the root span ends."""
+    __slots__ = ("trace_id", "spans", "dropped", "_lock")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            if len(self.spans) < TRACE_MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("techfest_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current.get()
+    return span.trace.trace_id if span else None
+
+
+class _Exporter:
+    """
+    Single writer thread for TRACE_FILE, so request threads and the event loop
+    never serialize spans or touch the disk. Traces arriving while the queue is
+    full are dropped and counted.
+    """
+
+    def __init__(self, max_queued: int = TRACE_QUEUE_MAX):
+        self._queue: "queue.Queue[_Trace]" = queue.Queue(maxsize=max_queued)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def submit(self, trace: _Trace) -> None:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: List[_Trace]) -> None:
+        lines = [json.dumps(s.to_dict(), default=str)
+                 for trace in batch for s in trace.spans if s.duration_ms is not None]
+        if not lines:
+            return
+        try:
+            os.makedirs(os.path.dirname(TRACE_FILE) or ".", exist_ok=True)
+            if os.path.exists(TRACE_FILE) and os.path.getsize(TRACE_FILE) > TRACE_MAX_BYTES:
+                os.replace(TRACE_FILE, TRACE_FILE + ".1")
+            with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            log.warning("Trace export failed: %s", e)
+
+
+_exporter = _Exporter()
+
+
+@contextmanager
+def start_trace(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+                sampled: Optional[bool] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Root span; `sampled` is the caller's decision (e.g. from traceparent), else TRACE_SAMPLE_RATE applies."""
+    if sampled is None:
+        sampled = random.random() < TRACE_SAMPLE_RATE
+    if not TRACING_ENABLED or not sampled:
+        yield None
+        return
+    trace = _Trace(trace_id or secrets.token_hex(16))
+    root = Span(trace, name, parent_id, "server", attributes)
+    trace.add(root)
+    token = _current.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.status, root.error = "error", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        root.duration_ms = (time.perf_counter() - root._t0) * 1000
+        _current.reset(token)
+        if trace.dropped:
+            root.attributes["dropped_spans"] = trace.dropped
+        _exporter.submit(trace)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes: Any) -> Iterator[Optional[Span]]:
+    """Child of the current span; a no-op outside a sampled trace."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    s = Span(parent.trace, name, parent.span_id, kind, attributes)
+    parent.trace.add(s)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.status, s.error = "error", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.duration_ms = (time.perf_counter() - s._t0) * 1000
+        _current.reset(token)
+
+
+def traced(name: str, kind: str = "internal"):
+    """Decorator form of span() for plain functions."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def instrument_engine(sync_engine, system: str = "sqlite") -> None:
+    """DB query spans for a SQLAlchemy (sync) engine; for AsyncEngine pass .sync_engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        cm = span("db.query", kind="client", system=system, statement=statement[:200])
+        cm.__enter__()
+        conn.info.setdefault("_trace_spans", []).append(cm)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_trace_spans")
+        if stack:
+            stack.pop().__exit__(None, None, None)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(ctx):
+        stack = ctx.connection.info.get("_trace_spans") if ctx.connection is not None else None
+        if stack:
+            e = ctx.original_exception
+            stack.pop().__exit__(type(e), e, None)
+
+
+def _parse_traceparent(value: Optional[str]):
+    # W3C: 00-<32 hex trace id>-<16 hex parent id>-<flags>; flag bit 0 = sampled
+    parts = (value or "").split("-")
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16 and len(parts[3]) == 2:
+        try:
+            return parts[1], parts[2], bool(int(parts[3], 16) & 1)
+        except ValueError:
+            pass
+    return None, None, None
+
+
+class TracingMiddleware:
+    """
+    Root span per HTTP request, named after the matched route template. Honours
+    an incoming W3C traceparent (ids and sampled flag) and returns the trace id
+    as X-Trace-Id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        trace_id, parent_id, sampled = _parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+
+        with start_trace("http", trace_id=trace_id, parent_id=parent_id, sampled=sampled,
+                         method=scope.get("method"), path=scope.get("path")) as root:
+            if root is None:
+                return await self.app(scope, receive, send)
+
+            async def _send(message):
+                if message["type"] == "http.response.start":
+                    root.set(status=message["status"])
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"x-trace-id", root.trace.trace_id.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, _send)
+            finally:
+                route = scope.get("route")
+                root.name = f"{scope.get('method')} {getattr(route, 'path', 'unmatched')}"
+
+
+# --- critical-path analysis (CLI) ---
+
+def load_traces(path: str = TRACE_FILE) -> Dict[str, List[Dict[str, Any]]]:
+    traces: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for p in (path + ".1", path):
+        if not os.path.exists(p):
+            continue
+        with open(p, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    s = json.loads(line)
+                    traces[s["trace_id"]].append(s)
+    return traces
+
+
+def critical_path(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Walk back from the end of the root span: at each level take the child that
+    finishes last, then the latest-finishing child that ended before it started,
+    and so on. Returns the path segments with the self time each contributes.
+    """
+    by_parent: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+    ids = {s["span_id"] for s in spans}
+    for s in spans:
+        by_parent[s["parent_id"] if s["parent_id"] in ids else None].append(s)
+    roots = by_parent.get(None) or []
+    if not roots:
+        return []
+
+    def end(s):
+        return s["start"] + s["duration_ms"] / 1000
+
+    def walk(s, depth) -> List[Dict[str, Any]]:
+        chosen, cursor = [], end(s)
+        for child in sorted(by_parent.get(s["span_id"], []), key=end, reverse=True):
+            if end(child) <= cursor + 1e-6:
+                chosen.append(child)
+                cursor = child["start"]
+        covered = sum(min(end(c), end(s)) - max(c["start"], s["start"]) for c in chosen) * 1000
+        out = [{"name": s["name"], "depth": depth, "duration_ms": s["duration_ms"],
+                "self_ms": max(s["duration_ms"] - covered, 0.0), "status": s["status"]}]
+        for c in reversed(chosen):
+            out.extend(walk(c, depth + 1))
+        return out
+
+    return walk(max(roots, key=lambda r: r["duration_ms"]), 0)
+
+
+def _main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Critical-path breakdown of recorded traces")
+    ap.add_argument("--file", default=TRACE_FILE)
+    ap.add_argument("--trace", help="show the critical path of one trace id")
+    ap.add_argument("--route", help="aggregate traces whose root name ends with this route, e.g. /chat")
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args(argv)
+
+    traces = load_traces(args.file)
+    if args.trace:
+        path = critical_path(traces.get(args.trace, []))
+        if not path:
+            print("trace not found")
+            return 1
+        for seg in path:
+            print(f"{'  ' * seg['depth']}{seg['name']:<50} {seg['duration_ms']:9.1f} ms  self {seg['self_ms']:8.1f} ms"
+                  + ("  [error]" if seg["status"] == "error" else ""))
+        return 0
+
+    # aggregate: where critical-path time goes, by span name
+    totals: Dict[str, float] = defaultdict(float)
+    wall, n = 0.0, 0
+    for spans in traces.values():
+        path = critical_path(spans)
+        if not path or (args.route and not path[0]["name"].endswith(" " + args.route)):
+            continue
+        n += 1
+        wall += path[0]["duration_ms"]
+        for seg in path:
+            totals[seg["name"]] += seg["self_ms"]
+    if not n:
+        print("no matching traces")
+        return 1
+    print(f"{n} traces, mean {wall / n:.1f} ms")
+    for name, ms in sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {name:<50} {ms / n:9.1f} ms/trace  {100 * ms / wall:5.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from .database import ReadSessionLocal, engine, run_write
+from . import models
+
+# Expired tokens are kept for a grace period (audit/debugging), then deleted in
+# small batches so each delete transaction holds SQLite's writer lock only briefly.
+TOKEN_PURGE_GRACE = timedelta(hours=float(os.getenv("TOKEN_PURGE_GRACE_HOURS", "24")))
+TOKEN_PURGE_BATCH_SIZE = int(os.getenv("TOKEN_PURGE_BATCH_SIZE", "500"))
+TOKEN_PURGE_INTERVAL_SECONDS = float(os.getenv("TOKEN_PURGE_INTERVAL_SECONDS", "600"))
+_BATCH_PAUSE_SECONDS = 0.05  # let queued writers (logins) in between batches
+
+log = logging.getLogger("techfest.db.maintenance")
+
+maintenance_stats: Dict[str, Any] = {
+    "runs": 0,
+    "last_run_at": None,
+    "last_run_seconds": None,
+    "last_error": None,
+    "tokens_rows": None,
+    "tokens_purged_last_run": 0,
+    "tokens_purged_total": 0,
+    "paypal_tokens_rows": None,
+    "paypal_tokens_pruned_last_run": 0,
+    "paypal_tokens_pruned_total": 0,
+}
+
+
+def ensure_indexes() -> None:
+    """create_all() only indexes new tables; add indexes declared later to existing ones."""
+    for table in (models.Token.__table__, models.PayPalToken.__table__):
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def _delete_batches(select_ids, delete_ids) -> int:
+    """Each batch is its own write (run_write), with a pause in between."""
+    def _batch(db: Session) -> int:
+        ids = db.execute(select_ids.limit(TOKEN_PURGE_BATCH_SIZE)).scalars().all()
+        if ids:
+            db.execute(delete_ids(ids))
+        return len(ids)
+
+    deleted = 0
+    while True:
+        n = run_write(_batch)
+        deleted += n
+        if n < TOKEN_PURGE_BATCH_SIZE:
+            return deleted
+        time.sleep(_BATCH_PAUSE_SECONDS)
+
+
+def purge_expired_tokens(now: Optional[datetime] = None) -> int:
+    """Delete tokens whose expires_at + grace has passed (revoked or not). Returns rows deleted."""
+    cutoff = (now or datetime.now(timezone.utc)) - TOKEN_PURGE_GRACE
+    return _delete_batches(
+        select(models.Token.jti).where(models.Token.expires_at < cutoff),
+        lambda jtis: delete(models.Token).where(models.Token.jti.in_(jtis)),
+    )
+
+
+def prune_paypal_tokens(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Delete PayPal tokens that expired more than the grace period ago and are
+    superseded by a newer row. The newest row is always kept, since
+    fetch_paypal_token(allow_expired_fallback=True) may still want it.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - TOKEN_PURGE_GRACE
+    newest_id = db.execute(
+        select(models.PayPalToken.id)
+        .order_by(models.PayPalToken.expires_at.desc(), models.PayPalToken.created_at.desc())
+        .limit(1)
+    ).scalar()
+    if newest_id is None:
+        return 0
+    return _delete_batches(
+        select(models.PayPalToken.id)
+        .where(models.PayPalToken.expires_at < cutoff, models.PayPalToken.id != newest_id),
+        lambda ids: delete(models.PayPalToken).where(models.PayPalToken.id.in_(ids)),
+    )
+
+
+def run_token_maintenance() -> Dict[str, Any]:
+    started = time.perf_counter()
+    db = ReadSessionLocal()
+    try:
+        purged = purge_expired_tokens()
+        pruned = prune_paypal_tokens(db)
+        maintenance_stats.update(
+            tokens_rows=db.execute(select(func.count()).select_from(models.Token)).scalar(),
+            paypal_tokens_rows=db.execute(select(func.count()).select_from(models.PayPalToken)).scalar(),
+            tokens_purged_last_run=purged,
+            paypal_tokens_pruned_last_run=pruned,
+            last_error=None,
+        )
+        maintenance_stats["tokens_purged_total"] += purged
+        maintenance_stats["paypal_tokens_pruned_total"] += pruned
+        if purged or pruned:
+            log.info("Purged %d expired tokens, pruned %d superseded PayPal tokens", purged, pruned)
+    except Exception as e:
+        maintenance_stats["last_error"] = str(e)
+        log.exception("Token maintenance failed")
+    finally:
+        db.close()
+        maintenance_stats["runs"] += 1
+        maintenance_stats["last_run_at"] = datetime.now(timezone.utc).isoformat()
+        maintenance_stats["last_run_seconds"] = round(time.perf_counter() - started, 4)
+    return dict(maintenance_stats)
+
+
+async def token_maintenance_loop(interval_seconds: float = TOKEN_PURGE_INTERVAL_SECONDS) -> None:
+    """Runs forever (cancel the task to stop); the sync DB work happens off the event loop."""
+    while True:
+        await asyncio.to_thread(run_token_maintenance)
+        await asyncio.sleep(interval_seconds)
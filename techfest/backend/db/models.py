@@ -36,7 +36,7 @@ class Token(Base):
     )
 
     issued_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
-    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True, nullable=False)
     revoked: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     revoked_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
 
@@ -51,7 +51,7 @@ class PayPalToken(Base):
     access_token: Mapped[str] = mapped_column(Text, nullable=False)  # tokens can be long → Text
     token_type: Mapped[Optional[str]] = mapped_column(String(32), default="Bearer")
     expires_in: Mapped[int] = mapped_column(Integer, nullable=False)
-    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True, nullable=False)
 
     # You said you don't *use* refresh tokens on the client; we still store it server-side if present.
     refresh_token: Mapped[Optional[str]] = mapped_column(Text)
@@ -62,3 +62,14 @@ class PayPalToken(Base):
     auth_code: Mapped[Optional[str]] = mapped_column(String(1024))
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now_utc, nullable=False)
+
+class RevocationEpoch(Base):
+    """
+    Single-row counter bumped on every token revocation. Workers poll it to know
+    when their in-process token status cache has gone stale.
+    """
+    __tablename__ = "revocation_epoch"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)  # always 1
+    epoch: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=now_utc, nullable=False)
@@ -1,4 +1,4 @@
-from datetime import timedelta
+from datetime import timedelta, datetime, timezone
 
 import dotenv
 
@@ -6,9 +6,10 @@ from techfest.backend.db.models import now_utc, PayPalToken
 
 dotenv.load_dotenv()
 
+from functools import lru_cache
 from typing import List, Dict
 
-from fastapi import FastAPI, Request, Response, HTTPException, Body, Query
+from fastapi import FastAPI, Request, Response, HTTPException, Body, Query, BackgroundTasks
 import secrets
 import httpx
 # For securely signing/verifying state values
@@ -16,22 +17,36 @@ from itsdangerous import URLSafeSerializer
 from fastapi import UploadFile, File, HTTPException, FastAPI, Depends, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 import tempfile, os
+import json
 from pydantic import BaseModel, EmailStr
-from fastapi.responses import FileResponse
-
-from techfest.backend.core.paypal_api import PayPalAPI
-from techfest.backend.core.paypal_service import PayPalService
-from techfest.backend.paypal_transactions.csv_export import ensure_csv
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+
+from techfest.backend.core.http_client import get_http_client, open_http_client, close_http_client
+from techfest.backend.core import metrics
+from techfest.backend.core.tracing import TracingMiddleware
+from techfest.backend.core import profiler
+from techfest.backend.core import memory
+from techfest.backend.core import chat_sessions
+from techfest.backend.paypal_transactions.csv_export import ensure_csv, ensure_snapshot
 from techfest.backend.paypal_transactions.invoicing import _list_unpaid_invoices
 from techfest.backend.paypal_transactions.recurring_api import RecurringResponse
+from techfest.backend.paypal_transactions.search_api import TransactionSearchResponse
+from techfest.backend.paypal_transactions.aggregates_api import AggregatesResponse
+from techfest.backend.paypal_transactions.snapshot import is_snapshot_path
 from techfest.backend.paypal_transactions.unpaid_invoices_api import UnpaidInvoicesResponse, _map_invoice_with_link
 from techfest.backend.text_speech.speech_to_text import transcribe_wav_file, WAV_TYPES, ALLOWED, save_upload_to_tmp, \
     ffmpeg_to_wav, CONTENT_SUFFIX
 from techfest.backend.text_speech.text_to_speech import text_to_mp3
 from techfest.backend.db import models
-from techfest.backend.db.database import engine, get_db
-from sqlalchemy.orm import Session
+from techfest.backend.db.database import engine, async_engine, get_async_db, arun_write, db_metrics
+from techfest.backend.db.maintenance import ensure_indexes, token_maintenance_loop, maintenance_stats
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from techfest.backend.paypal_transactions.transactions import save_transactions
+from techfest.backend.paypal_transactions.storage import search_transactions, query_rollups, DB_PATH_DEFAULT
+from techfest.backend.paypal_transactions.partitions import query_rollups_range, search_history
+from techfest.backend.paypal_transactions.money import from_minor
+from techfest.backend.paypal_transactions.config import paypal_base_url
 from techfest.backend.paypal_transactions.auth import fetch_paypal_token, fetch_paypal_token_for_issuer
 from techfest.backend.paypal_transactions.notify import notify_same_day_last_month
 from techfest.backend.paypal_transactions.notify import show_recurring_same_day_last_3_months
@@ -43,13 +58,55 @@ from techfest.backend.auth.jwt_auth import (
     create_access_token_db,
     revoke_current_token,
     get_or_create_user_by_email,
+    login_user,
+    require_admin,
+    last_login_buffer,
+    last_login_flush_loop,
+    token_status_cache,
+    STATELESS,
 )
+from techfest.backend.auth.keys import JWKS_URL, jwks_refresh_loop, key_set
+from techfest.backend.auth.denylist import deny_list, deny_list_sync_loop, revoked_since, require_node_token
+import asyncio
+from contextlib import asynccontextmanager
 
 #run command for testing: uvicorn techfest.backend.main:app --reload
 
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
+def init_db() -> None:
+    models.Base.metadata.create_all(bind=engine)
+    ensure_indexes()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema setup runs here rather than at import, so importing the app stays cheap
+    await asyncio.to_thread(init_db)
+    # Pooled keep-alive client shared by the PayPal OAuth endpoints
+    await open_http_client()
+    # Background compaction of tokens / paypal_tokens
+    maintenance_task = asyncio.create_task(token_maintenance_loop())
+    last_login_task = asyncio.create_task(last_login_flush_loop())
+    deny_list_task = asyncio.create_task(deny_list_sync_loop()) if STATELESS else None
+    jwks_task = None
+    if STATELESS and JWKS_URL:
+        # verify-only nodes need the issuer's keys before the first request
+        await asyncio.to_thread(key_set.refresh_remote)
+        jwks_task = asyncio.create_task(jwks_refresh_loop())
+    try:
+        yield
+    finally:
+        maintenance_task.cancel()
+        last_login_task.cancel()
+        if deny_list_task:
+            deny_list_task.cancel()
+        if jwks_task:
+            jwks_task.cancel()
+        last_login_buffer.flush()  # don't lose buffered last_login updates on shutdown
+        await async_engine.dispose()
+        await close_http_client()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(profiler.ProfilingMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -58,12 +115,21 @@ app.add_middleware(
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
 )
+# Added last, so it is outermost: the root span covers CORS and the other middlewares
+app.add_middleware(TracingMiddleware)
 
 protected = APIRouter(dependencies=[Depends(require_active_token)])
 app.include_router(protected)
 
-paypal_api = PayPalAPI()
-paypal_service = PayPalService(paypal_api)
+@lru_cache(maxsize=1)
+def get_paypal_service():
+    """
+    Built on the first /chat: reads config.json and imports openai, which
+    workers that never chat shouldn't pay for at startup.
+    """
+    from techfest.backend.core.paypal_api import PayPalAPI
+    from techfest.backend.core.paypal_service import PayPalService
+    return PayPalService(PayPalAPI())
 
 class LoginRequest(BaseModel):
     email: EmailStr
@@ -76,7 +142,7 @@ class TokenResponse(BaseModel):
 client_id = os.getenv("CLIENT_ID", "AUwDbh92cYpOxREvA3aeugMEfJdMH5U-HwMvLi0z-ABQQ0puDUd1ijGzFsh6s7ugl2zisrqI4tZGYRAT")
 client_secret = os.getenv("CLIENT_SECRET","EL9UjcK_RLn94hX6HaDKhGfLXPh4L-_RAU-kUtVJZdlQGRbT2re1iiTTjFccDKczOjUZjLyAKUckTERG")
 pp_env = os.getenv("PP_ENV", "sandbox")  # "sandbox" or "live"
-paypal_base = os.getenv("PAYPAL_BASE", "https://api-m.sandbox.paypal.com")
+paypal_base = paypal_base_url()  # PAYPAL_BASE_URL, else by PAYPAL_ENV (sandbox by default)
 return_url = os.getenv("RETURN_URL", "http://localhost:8000/callback")
 
 # --- PayPal OAuth2 token endpoint and state signer ---
@@ -94,7 +160,7 @@ async def get_state():
 
 # --- OAuth callback endpoint: handles PayPal redirect after user login ---
 @app.post("/callback")
-async def paypal_callback(request: Request, db: Session = Depends(get_db)):
+async def paypal_callback(request: Request, client: httpx.AsyncClient = Depends(get_http_client)):
     print("Received callback with query params:", request.query_params)
     params = dict(request.query_params)  # Extract query parameters from PayPal
     error = params.get("error")
@@ -121,7 +187,7 @@ async def paypal_callback(request: Request, db: Session = Depends(get_db)):
 
     # Exchange authorization code for tokens (server-to-server)
     basic_auth = httpx.BasicAuth(client_id, client_secret)
-    async with httpx.AsyncClient(timeout=15.0) as client:
+    with metrics.upstream("paypal", "oauth_authorization_code"):
         token_res = await client.post(
             f"{paypal_base}/v1/oauth2/token",
             auth=basic_auth,
@@ -156,9 +222,8 @@ async def paypal_callback(request: Request, db: Session = Depends(get_db)):
         # user_id=...  # Optional: set if you know who initiated (via signed state)
     )
 
-    db.add(ppt)
-    db.commit()
-    db.refresh(ppt)
+    # Persist via the writer (batched with other writes in wal mode; never blocks the event loop)
+    await arun_write(lambda db: db.add(ppt))
 
     # Return ONLY what you want the frontend to have (no refresh token)
     return {
@@ -172,9 +237,12 @@ async def paypal_callback(request: Request, db: Session = Depends(get_db)):
 
 # --- Endpoint to exchange refresh token for access token ---
 @app.post("/api/refresh_token")
-async def exchange_refresh_token(refresh_token: str = Body(..., embed=True)):
+async def exchange_refresh_token(
+        refresh_token: str = Body(..., embed=True),
+        client: httpx.AsyncClient = Depends(get_http_client),
+):
     basic_auth = httpx.BasicAuth(client_id, client_secret)
-    async with httpx.AsyncClient(timeout=15.0) as client:
+    with metrics.upstream("paypal", "oauth_refresh_token"):
         token_res = await client.post(
             f"{paypal_base}/v1/oauth2/token",
             auth=basic_auth,
@@ -203,25 +271,42 @@ async def exchange_refresh_token(refresh_token: str = Body(..., embed=True)):
 
 
 @app.post("/login", response_model=TokenResponse)
-def login(req: LoginRequest, db: Session = Depends(get_db)):
+async def login(req: LoginRequest):
     """
     Accepts an already verified email from a third-party identity provider.
     Stores only the email, issues an API access token, and persists token status in DB.
     """
-    user = get_or_create_user_by_email(db, req.email)
-    jwt_token = create_access_token_db(db, subject=user.email, user_id=user.id)
+    jwt_token = await login_user(req.email)
     return TokenResponse(access_token=jwt_token)
 
+@app.get("/.well-known/jwks.json")
+def jwks():
+    """
+    Public keys for verifying stateless-mode access tokens (empty in db mode).
+    """
+    return key_set.public_jwks()
+
+@app.get("/auth/denylist", dependencies=[Depends(require_node_token)])
+async def denylist(since: str | None = Query(None), db: AsyncSession = Depends(get_async_db)):
+    """
+    Revoked, not yet expired token ids since the given cursor; polled by other nodes
+    with DENYLIST_TOKEN as their bearer token.
+    """
+    try:
+        return await db.run_sync(revoked_since, since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.post("/logout")
-def logout(payload: dict = Depends(require_active_token), db: Session = Depends(get_db)):
-    revoke_current_token(payload, db)
+async def logout(payload: dict = Depends(require_active_token)):
+    await revoke_current_token(payload)
     return {"status": "logged_out"}
 
 # Optional: protected demo route
 @app.get("/me")
-def me(payload: dict = Depends(require_active_token), db: Session = Depends(get_db)):
+async def me(payload: dict = Depends(require_active_token), db: AsyncSession = Depends(get_async_db)):
     email = payload.get("sub")
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = (await db.execute(select(models.User).where(models.User.email == email))).scalars().first()
     return {"user": {"email": email}}
 
 @app.post("/stt")
@@ -337,6 +422,12 @@ def notify_unpaid_invoices(payload: dict = Depends(require_active_token)):
     return resp
 
 
+def _ensure_source(path: str, days: int, refresh: bool) -> str:
+    if is_snapshot_path(path):
+        return ensure_snapshot(snapshot_path=path, days=days, refresh=refresh)
+    return ensure_csv(csv_path=path, days=days, refresh=refresh)
+
+
 @app.get("/recurring/same-day", response_model=RecurringResponse)
 def get_recurring_same_day(
         csv_path: str = Query("/techfest/backend/out/txns_last90d.csv"),
@@ -346,9 +437,10 @@ def get_recurring_same_day(
 ):
     """
     Ensures the CSV exists (or regenerates it when refresh=true), then returns recurring payments.
+    A path ending in .ppxcol is served from the columnar snapshot instead of CSV.
     """
     try:
-        path = ensure_csv(csv_path=csv_path, days=days, refresh=refresh)
+        path = _ensure_source(csv_path, days, refresh)
         items: List[Dict] = show_recurring_same_day_last_3_months(path)
         return RecurringResponse(count=len(items), items=items)
     except FileNotFoundError:
@@ -368,7 +460,7 @@ def notify_recurring_same_day(
     Convenience action: regenerates CSV if requested, prints a short summary, returns JSON.
     """
     try:
-        path = ensure_csv(csv_path=csv_path, days=days, refresh=refresh)
+        path = _ensure_source(csv_path, days, refresh)
         items: List[Dict] = show_recurring_same_day_last_3_months(path)
         if not items:
             print("No recurring payment.")
@@ -383,9 +475,261 @@ def notify_recurring_same_day(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to compute recurring payments: {e}")
 
+@app.get("/transactions/search", response_model=TransactionSearchResponse)
+def search_transactions_endpoint(
+        q: str = Query(..., min_length=1, max_length=200),
+        page: int = Query(1, ge=1),
+        page_size: int = Query(20, ge=1, le=100),
+        source: str = Query("recent", pattern="^(recent|history)$"),
+        since: datetime | None = Query(None, description="Inclusive, e.g. 2024-01-01 (UTC)"),
+        until: datetime | None = Query(None, description="Exclusive, e.g. 2024-07-01 (UTC)"),
+        payload: dict = Depends(require_active_token)
+):
+    """
+    Full-text search (description, item names, sender, payer email), best match first.
+    source=recent searches only the last-90-days DB, source=history the monthly
+    partitions (only the months within since/until).
+    """
+    if since and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if until and until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    try:
+        offset = (page - 1) * page_size
+        if source == "history":
+            total, items = search_history(q, limit=page_size, offset=offset, since=since, until=until)
+        else:
+            total, items = search_transactions(q, db_path=DB_PATH_DEFAULT, limit=page_size, offset=offset,
+                                               since=since, until=until)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {e}")
+    next_page = page + 1 if page * page_size < total else None
+    return TransactionSearchResponse(query=q, total=total, page=page, page_size=page_size,
+                                     next_page=next_page, items=items)
+
+@app.get("/aggregates", response_model=AggregatesResponse)
+def get_aggregates(
+        granularity: str = Query("monthly", pattern="^(daily|monthly)$"),
+        source: str = Query("recent", pattern="^(recent|history)$"),
+        start: str | None = Query(None, description="Inclusive period, e.g. 2025-01 or 2025-01-15"),
+        end: str | None = Query(None, description="Inclusive period, e.g. 2025-09 or 2025-09-30"),
+        group_by: List[str] = Query(["payer", "currency", "status"]),
+        payer: str | None = Query(None),
+        currency: str | None = Query(None),
+        status: str | None = Query(None),
+        payload: dict = Depends(require_active_token)
+):
+    """
+    Income/spend/fee totals per day or month, read from the rollup tables.
+    Rows are always split by currency, whatever group_by says.
+    source=recent uses the last-90-days DB, source=history the monthly partitions.
+    """
+    unknown = set(group_by) - {"payer", "currency", "status"}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported group_by: {', '.join(sorted(unknown))}")
+    filters = dict(granularity=granularity, group_by=group_by, payer=payer, currency=currency, status=status)
+    try:
+        if source == "history":
+            now = datetime.now(timezone.utc)
+            # month-floored bounds pick the partitions; with no `end`, "now" is
+            # also the period filter, so the current month is not cut at day 1
+            start_dt = datetime.fromisoformat((start or f"{now.year - 3}-01")[:7] + "-01").replace(tzinfo=timezone.utc)
+            end_dt = datetime.fromisoformat(end[:7] + "-01").replace(tzinfo=timezone.utc) if end else now
+            items = query_rollups_range(start_dt, end_dt, start=start, end=end, **filters)
+        else:
+            items = query_rollups(DB_PATH_DEFAULT, start=start, end=end, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid period: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load aggregates: {e}")
+    for it in items:
+        for k in ("income", "spend", "fee"):
+            it[k] = from_minor(it[f"{k}_minor"], it["currency"])
+    return AggregatesResponse(granularity=granularity, source=source, count=len(items), items=items)
+
+@app.get("/admin/maintenance/tokens")
+def token_maintenance_metrics(payload: dict = Depends(require_admin)):
+    """
+    Size of the tokens/paypal_tokens tables and rows removed by the purge job.
+    """
+    return maintenance_stats
+
+@app.get("/admin/db/metrics")
+def database_metrics(payload: dict = Depends(require_admin)):
+    """
+    Engine mode, reader/writer pool usage and writer queue counters.
+    """
+    return db_metrics()
+
+def _app_metrics():
+    cache = token_status_cache.stats()
+    lookups = cache["hits"] + cache["misses"]
+    yield ("techfest_cache_hits_total", "counter", "Cache hits.", [({"cache": "token_status"}, cache["hits"])])
+    yield ("techfest_cache_misses_total", "counter", "Cache misses.", [({"cache": "token_status"}, cache["misses"])])
+    yield ("techfest_cache_hit_ratio", "gauge", "Hits / lookups since start.",
+           [({"cache": "token_status"}, cache["hits"] / lookups if lookups else 0.0)])
+    yield ("techfest_cache_entries", "gauge", "Entries currently cached.", [
+        ({"cache": "token_status"}, cache["size"]),
+        ({"cache": "deny_list"}, deny_list.stats()["size"]),
+    ])
+    yield ("techfest_last_login_pending", "gauge", "Buffered last_login updates not yet flushed.",
+           [({}, last_login_buffer.pending())])
+    queue = db_metrics()["write_queue"]
+    yield ("techfest_db_write_queue_depth", "gauge", "Writes waiting for the writer thread (wal mode).",
+           [({}, queue["depth"])])
+    yield ("techfest_db_writes_total", "counter", "Writes run through the writer queue by outcome.", [
+        ({"outcome": "committed"}, queue["committed_ops"]),
+        ({"outcome": "failed"}, queue["failed_ops"]),
+    ])
+    yield ("techfest_chat_sessions", "gauge", "Live server-side chat sessions.",
+           [({}, chat_sessions.stats()["sessions"])])
+
+metrics.register_collector(_app_metrics)
+
+# If set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics(request: Request):
+    """
+    Prometheus text exposition: route latency, upstream timings, cache and queue gauges.
+    """
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/profiles")
+def list_profiles(payload: dict = Depends(require_admin)):
+    """
+    Recent request profiles (newest first). Enable with PROFILE_TOKEN + X-Profile header or PROFILE_SAMPLE_RATE.
+    """
+    return {"enabled": profiler.enabled(), "count": len(profiler.recent_profiles),
+            "items": list(profiler.recent_profiles)}
+
+@app.get("/admin/profiles/{profile_id}")
+def download_profile(profile_id: str, payload: dict = Depends(require_admin)):
+    """
+    Folded-stack file for flamegraph.pl / speedscope.
+    """
+    meta = profiler.get_profile(profile_id)
+    if not meta or not os.path.exists(meta.get("file") or ""):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(meta["file"], media_type="text/plain",
+                        filename=os.path.basename(meta["file"]))
+
+@app.get("/admin/memory")
+def memory_status(payload: dict = Depends(require_admin)):
+    """
+    tracemalloc state, traced/RSS memory and stored snapshots.
+    """
+    return memory.status()
+
+@app.post("/admin/memory/start")
+def memory_start(frames: int = Query(memory.MEMORY_TRACE_FRAMES, ge=1, le=100),
+                 payload: dict = Depends(require_admin)):
+    return memory.start(frames)
+
+@app.post("/admin/memory/stop")
+def memory_stop(payload: dict = Depends(require_admin)):
+    return memory.stop()
+
+@app.post("/admin/memory/snapshots")
+def memory_snapshot(label: str | None = Query(None), top: int = Query(10, ge=1, le=100),
+                    payload: dict = Depends(require_admin)):
+    """
+    Take a snapshot; returns its id and largest allocation sites.
+    """
+    try:
+        return memory.take_snapshot(label, top=top)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/admin/memory/diff")
+def memory_diff(
+        base: str = Query(...),
+        target: str | None = Query(None, description="Snapshot id; omitted = take one now"),
+        group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+        top: int = Query(20, ge=1, le=200),
+        payload: dict = Depends(require_admin)
+):
+    """
+    Allocation growth between two snapshots, by allocation site.
+    """
+    try:
+        return memory.diff(base, target, group_by=group_by, top=top)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot {e}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 @app.post('/chat')
-def chat(messages: List[Dict] = Body(...)):
+async def chat(messages: List[Dict] = Body(...), payload: dict = Depends(require_active_token)):
 
     print(f"Received messages: {messages}")
-    res = paypal_service.call_model(messages)
-    return {"reply": res}
\ No newline at end of file
+    res = await get_paypal_service().acall_model(messages)
+    return {"reply": res}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post('/chat/stream')
+async def chat_stream(messages: List[Dict] = Body(...), payload: dict = Depends(require_active_token)):
+    """
+    /chat as server-sent events: `token` per content delta, `tool_start`/`tool_end`
+    around tool calls, then `done` with the full reply (or `error`).
+    """
+    service = get_paypal_service()
+
+    async def events():
+        try:
+            async for event, data in service.stream_model(messages):
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"detail": f"Chat failed: {e}"})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+class ChatTurnRequest(BaseModel):
+    session_id: str | None = None
+    message: str
+
+
+@app.post('/chat/session')
+async def chat_session_turn(req: ChatTurnRequest, background: BackgroundTasks,
+                            payload: dict = Depends(require_active_token)):
+    """
+    Chat with history kept server-side: omit session_id to start a session,
+    then send only the new message with the returned id. Sessions are private
+    to the user who started them.
+    """
+    owner = payload["sub"]
+    if req.session_id:
+        session = chat_sessions.get(req.session_id, owner)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired chat session")
+    else:
+        session = chat_sessions.create(owner)
+
+    service = get_paypal_service()
+    async with session.lock:
+        try:
+            reply, new_messages = await service.achat_turn(session.messages, req.message, session.summary)
+        except Exception as e:
+            if not req.session_id:
+                chat_sessions.delete(session.id, owner)  # don't keep an empty session around
+            raise HTTPException(status_code=502, detail=f"Chat failed: {e}")
+        session.messages.extend(new_messages)
+    # Summarizing after the response keeps it off this turn's latency; the next turn waits on the lock
+    background.add_task(chat_sessions.compact, session, service.asummarize)
+    return {"session_id": session.id, "reply": reply}
+
+
+@app.delete('/chat/session/{session_id}')
+async def chat_session_delete(session_id: str, payload: dict = Depends(require_active_token)):
+    if not chat_sessions.delete(session_id, payload["sub"]):
+        raise HTTPException(status_code=404, detail="Unknown or expired chat session")
+    return {"deleted": session_id}
\ No newline at end of file
@@ -0,0 +1,25 @@
+from __future__ import annotations
+from typing import Optional, List
+from pydantic import BaseModel
+
+
+class AggregateRow(BaseModel):
+    period: str
+    payer: Optional[str] = None
+    currency: str
+    status: Optional[str] = None
+    txn_count: int
+    # integer minor units, plus the same amounts as decimal strings in `currency`
+    income_minor: int
+    spend_minor: int
+    fee_minor: int
+    income: str
+    spend: str
+    fee: str
+
+
+class AggregatesResponse(BaseModel):
+    granularity: str
+    source: str
+    count: int
+    items: List[AggregateRow]
@@ -11,8 +11,9 @@ from sqlalchemy import desc
 from .config import require_env, paypal_base_url
 from sqlalchemy.orm import Session
 
-from ..db.database import SessionLocal, get_db
+from ..db.database import ReadSessionLocal, get_read_db
 from ..db.models import now_utc, PayPalToken
+from ..core.metrics import upstream
 
 client_id = os.getenv("CLIENT_ID", "AUwDbh92cYpOxREvA3aeugMEfJdMH5U-HwMvLi0z-ABQQ0puDUd1ijGzFsh6s7ugl2zisrqI4tZGYRAT")
 
@@ -54,7 +55,7 @@ class NoValidPayPalToken(Exception):
     """Raised when no valid (non-expired) PayPal access token is found."""
 
 def fetch_paypal_token(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     *,
     leeway_seconds: int = 60,
     allow_expired_fallback: bool = False,
@@ -71,7 +72,7 @@ def fetch_paypal_token(
     """
     owns_session = db is None
     if owns_session:
-        db = SessionLocal()
+        db = ReadSessionLocal()
 
     try:
         now_with_leeway = now_utc() + timedelta(seconds=leeway_seconds)
@@ -132,13 +133,13 @@ def fetch_paypal_token_for_issuer() -> str:
         "Content-Type": "application/x-www-form-urlencoded",
         "Accept": "application/json",
     }
-    with httpx.Client(timeout=20.0) as client:
+    with httpx.Client(timeout=20.0) as client, upstream("paypal", "oauth_client_credentials"):
         r = client.post(f"{base_url}/v1/oauth2/token",
                         headers=headers,
                         data={"grant_type": "client_credentials"})
         r.raise_for_status()
-        data = r.json()
-        token = data.get("access_token")
-        if not token:
-            raise RuntimeError("No access_token in OAuth response for issuer business.")
-        return token
\ No newline at end of file
+    data = r.json()
+    token = data.get("access_token")
+    if not token:
+        raise RuntimeError("No access_token in OAuth response for issuer business.")
+    return token
\ No newline at end of file
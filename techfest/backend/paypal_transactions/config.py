@@ -11,6 +11,10 @@ def require_env(name: str) -> str:
     return val
 
 def paypal_base_url() -> str:
+    # Explicit override, e.g. the local emulator (python -m techfest.backend.bench.paypal_emulator)
+    override = os.getenv("PAYPAL_BASE_URL")
+    if override:
+        return override.rstrip("/")
     env = os.getenv("PAYPAL_ENV", "sandbox").lower()
     if env not in ("sandbox", "live"):
         env = "sandbox"
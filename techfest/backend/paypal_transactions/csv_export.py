@@ -4,6 +4,9 @@ from datetime import datetime, timedelta, timezone
 from typing import Tuple, Iterable, Dict
 
 from techfest.backend.paypal_transactions.auth import fetch_paypal_token
+from techfest.backend.paypal_transactions.money import to_minor
+from techfest.backend.paypal_transactions.snapshot import write_snapshot, INT64, STR
+from techfest.backend.paypal_transactions.storage import _epoch_seconds
 from techfest.backend.paypal_transactions.transactions import fetch_transactions
 
 FIELDS = [
@@ -16,9 +19,15 @@ FIELDS = [
     "sender_name",
     "payer_email",
     "amount_value",
+    "amount_minor",
     "amount_currency",
 ]
 
+# Snapshot sink: same fields, typed (amount only as integer minor units), plus the
+# timestamp pre-parsed to epoch seconds
+SNAPSHOT_FIELDS = [(f, INT64 if f == "amount_minor" else STR) for f in FIELDS if f != "amount_value"] \
+                  + [("initiation_ts", INT64)]
+
 
 def _row_from_txn(txn: Dict) -> Dict:
     info = (txn.get("transaction_info") or {})
@@ -50,6 +59,9 @@ def _row_from_txn(txn: Dict) -> Dict:
             or payer.get("payer_name")
     )
 
+    value = amount.get("value") if isinstance(amount, dict) else None
+    currency = amount.get("currency_code") if isinstance(amount, dict) else None
+
     return {
         "transaction_id": info.get("transaction_id"),
         "transaction_initiation_date": info.get("transaction_initiation_date"),
@@ -59,21 +71,18 @@ def _row_from_txn(txn: Dict) -> Dict:
         "invoice_id": invoice_id,
         "sender_name": sender_name,
         "payer_email": payer.get("email_address") or payer.get("payer_email"),
-        "amount_value": (amount.get("value") if isinstance(amount, dict) else None),
-        "amount_currency": (amount.get("currency_code") if isinstance(amount, dict) else None),
+        "amount_value": value,
+        "amount_minor": to_minor(value, currency),
+        "amount_currency": currency,
     }
 
 
-def export_transactions_csv(days: int = 90, csv_path: str = "out/txns_last90d.csv") -> Tuple[int, str]:
-    """
-    Fetch last `days` of balance-affecting transactions and write them to CSV.
-    Returns (rows_written, csv_path).
-    """
+def _fetch_last_days(days: int) -> Iterable[Dict]:
     token = fetch_paypal_token()
     end_dt = datetime.now(timezone.utc)
     start_dt = end_dt - timedelta(days=days)
 
-    tx_iter: Iterable[Dict] = fetch_transactions(
+    return fetch_transactions(
         start_dt=start_dt,
         end_dt=end_dt,
         access_token=token,
@@ -81,7 +90,13 @@ def export_transactions_csv(days: int = 90, csv_path: str = "out/txns_last90d.cs
         balance_affecting_only=True,
     )
 
-    rows = [_row_from_txn(txn) for txn in tx_iter]
+
+def export_transactions_csv(days: int = 90, csv_path: str = "out/txns_last90d.csv") -> Tuple[int, str]:
+    """
+    Fetch last `days` of balance-affecting transactions and write them to CSV.
+    Returns (rows_written, csv_path).
+    """
+    rows = [_row_from_txn(txn) for txn in _fetch_last_days(days)]
 
     os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
     with open(csv_path, "w", newline="", encoding="utf-8") as f:
@@ -99,4 +114,28 @@ def ensure_csv(csv_path: str = "out/txns_last90d.csv", days: int = 90, refresh:
     """
     if refresh or not os.path.exists(csv_path):
         export_transactions_csv(days=days, csv_path=csv_path)
-    return csv_path
\ No newline at end of file
+    return csv_path
+
+
+def export_transactions_snapshot(days: int = 90, snapshot_path: str = "out/txns_last90d.ppxcol") -> Tuple[int, str]:
+    """
+    Same data as export_transactions_csv, written as a columnar snapshot.
+    Returns (rows_written, snapshot_path).
+    """
+    def _rows():
+        for txn in _fetch_last_days(days):
+            row = _row_from_txn(txn)
+            row["initiation_ts"] = _epoch_seconds(row["transaction_initiation_date"])
+            yield row
+
+    n = write_snapshot(snapshot_path, SNAPSHOT_FIELDS, _rows())
+    return n, snapshot_path
+
+
+def ensure_snapshot(snapshot_path: str = "out/txns_last90d.ppxcol", days: int = 90, refresh: bool = False) -> str:
+    """
+    Snapshot counterpart of ensure_csv.
+    """
+    if refresh or not os.path.exists(snapshot_path):
+        export_transactions_snapshot(days=days, snapshot_path=snapshot_path)
+    return snapshot_path
@@ -4,6 +4,7 @@ import requests
 from datetime import datetime, timezone
 
 from techfest.backend.paypal_transactions import config  # absolute module import
+from techfest.backend.core.metrics import upstream
 
 # ----------------- headers -----------------
 def _headers(token: str) -> Dict[str, str]:
@@ -19,7 +20,8 @@ def _list_unpaid_invoices(token: str, page: int = 1, page_size: int = 50) -> dic
     url = f"{base_url}/v2/invoicing/search-invoices"
     params = {"page": page, "page_size": page_size, "total_required": True}
     body = {"status": ["UNPAID", "SENT"]}
-    r = requests.post(url, headers=_headers(token), params=params, json=body, timeout=40)
+    with upstream("paypal", "search_invoices"):
+        r = requests.post(url, headers=_headers(token), params=params, json=body, timeout=40)
     r.raise_for_status()
     return r.json()
 
@@ -52,8 +54,9 @@ def _pick_latest_invoice_id(items: List[dict]) -> Optional[str]:
 # ----------------- show/send invoice -----------------
 def show_invoice(token: str, invoice_id: str):
     base_url = config.paypal_base_url()
-    resp = requests.get(f"{base_url}/v2/invoicing/invoices/{invoice_id}",
-                        headers=_headers(token), timeout=40)
+    with upstream("paypal", "show_invoice"):
+        resp = requests.get(f"{base_url}/v2/invoicing/invoices/{invoice_id}",
+                            headers=_headers(token), timeout=40)
     resp.raise_for_status()
     data = resp.json()
     meta = (data.get("detail") or {}).get("metadata") or {}
@@ -61,9 +64,10 @@ def show_invoice(token: str, invoice_id: str):
 
 def send_invoice(token: str, invoice_id: str, share_link_only: bool = True):
     base_url = config.paypal_base_url()
-    r = requests.post(f"{base_url}/v2/invoicing/invoices/{invoice_id}/send",
-                      headers=_headers(token),
-                      json={"send_to_recipient": not share_link_only}, timeout=40)
+    with upstream("paypal", "send_invoice"):
+        r = requests.post(f"{base_url}/v2/invoicing/invoices/{invoice_id}/send",
+                          headers=_headers(token),
+                          json={"send_to_recipient": not share_link_only}, timeout=40)
     r.raise_for_status()
 
 # ----------------- PUBLIC: build pay link for a known invoice -----------------
@@ -0,0 +1,48 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Optional
+
+# Number of minor-unit digits per currency (ISO 4217 / PayPal). Anything not
+# listed uses DEFAULT_EXPONENT. PayPal only accepts whole units for HUF/JPY/TWD.
+CURRENCY_EXPONENTS = {
+    "HUF": 0,
+    "JPY": 0,
+    "TWD": 0,
+    "KRW": 0,
+    "CLP": 0,
+    "ISK": 0,
+    "VND": 0,
+    "BHD": 3,
+    "JOD": 3,
+    "KWD": 3,
+    "OMR": 3,
+    "TND": 3,
+}
+DEFAULT_EXPONENT = 2
+
+
+def exponent(currency: Optional[str]) -> int:
+    return CURRENCY_EXPONENTS.get((currency or "").upper(), DEFAULT_EXPONENT)
+
+
+def to_minor(value, currency: Optional[str]) -> Optional[int]:
+    """
+    "12.34" USD -> 1234, "500" JPY -> 500. Parses via Decimal so no float
+    rounding creeps in; returns None for missing/unparseable values.
+    """
+    if value is None or value == "":
+        return None
+    try:
+        d = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+    if not d.is_finite():
+        return None
+    return int(d.scaleb(exponent(currency)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor(minor: Optional[int], currency: Optional[str]) -> Optional[str]:
+    """1234 USD -> "12.34"; exact decimal string, the inverse of to_minor."""
+    if minor is None:
+        return None
+    exp = exponent(currency)
+    return str(Decimal(int(minor)).scaleb(-exp).quantize(Decimal(1).scaleb(-exp)))
@@ -2,8 +2,10 @@
 import csv
 import os
 from datetime import datetime, timedelta, timezone, date
-from typing import Dict, Optional, Tuple, List
+from typing import Callable, Dict, Optional, Tuple, List
 from techfest.backend.paypal_transactions.auth import fetch_paypal_token_for_issuer
+from techfest.backend.paypal_transactions.money import from_minor
+from techfest.backend.paypal_transactions.snapshot import is_snapshot_path, open_snapshot
 from techfest.backend.paypal_transactions.invoicing import _list_unpaid_invoices, build_pay_link_for_invoice, \
     _pick_latest_invoice_id
 
@@ -14,6 +16,8 @@ def _norm(s: str) -> str:
 def _parse_iso8601_utc(s: str) -> Optional[datetime]:
     if not s:
         return None
+    if isinstance(s, int):  # snapshot timestamps are already epoch seconds
+        return datetime.fromtimestamp(s, tz=timezone.utc)
     try:
         s2 = s.replace("Z", "+00:00")
         d = datetime.fromisoformat(s2)
@@ -35,6 +39,51 @@ def _pick(cols_map: Dict[str, str], candidates) -> Optional[str]:
             return cols_map[c]
     return None
 
+def _open_table(path: str) -> Tuple[List[str], Callable[[List[Optional[str]]], List[Dict]]]:
+    """
+    Returns (column_names, load_rows). load_rows(cols) reads the rows; for a
+    columnar snapshot only `cols` are touched, for CSV the whole file is read.
+    """
+    if is_snapshot_path(path):
+        snap = open_snapshot(path)
+
+        def load_snapshot(cols: List[Optional[str]]) -> List[Dict]:
+            # Opened once for header and rows; closed as soon as the rows are read
+            try:
+                return list(snap.rows([c for c in cols if c]))
+            finally:
+                snap.close()
+        return snap.columns, load_snapshot
+
+    with open(path, newline="", encoding="utf-8") as f:
+        names = next(csv.reader(f), [])
+
+    def load_csv(cols: List[Optional[str]]) -> List[Dict]:
+        with open(path, newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    return names, load_csv
+
+_TIME_CANDIDATES = ["initiation_ts","initiation_time","time","transaction_time","transaction_initiation_date"]
+
+def _minor(v) -> Optional[int]:
+    """Minor-unit column value: int from snapshots, numeric text from CSV."""
+    if v is None or v == "":
+        return None
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+def _amount(row: Dict, minor_col: Optional[str], val_col: Optional[str], ccy_col: Optional[str]
+            ) -> Tuple[Optional[int], Optional[str]]:
+    """(amount_minor, exact display string); falls back to the raw value column for legacy CSVs."""
+    ccy = row.get(ccy_col) if ccy_col else None
+    minor = _minor(row.get(minor_col)) if minor_col else None
+    if minor is not None:
+        return minor, from_minor(minor, ccy)
+    val = row.get(val_col) if val_col else None
+    return None, (str(val) if val is not None else None)
+
 def _last_month_same_day_or_prev_friday(today_utc: datetime) -> date:
     """Same day last month; if weekend, roll back to previous Friday (stays in last month)."""
     y = today_utc.year
@@ -71,19 +120,20 @@ def notify_same_day_last_month(csv_path: str) -> Tuple[str, Optional[Dict]]:
     if not os.path.exists(csv_path):
         return ("No recurring payment (CSV not found).", None)
 
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-        if not rows:
-            return ("No recurring payment (CSV empty).", None)
-        cols_map = _columns_map(reader.fieldnames)
+    header, load_rows = _open_table(csv_path)
+    cols_map = _columns_map(header)
 
-    time_col = _pick(cols_map, ["initiation_time","time","transaction_time","transaction_initiation_date"])
+    time_col = _pick(cols_map, _TIME_CANDIDATES)
     desc_col = _pick(cols_map, ["description","item_names","transaction_subject","note","memo"])
     payer_col= _pick(cols_map, ["sender_name","payer_email","payer_name","payer"])
     val_col  = _pick(cols_map, ["amount_value","amount","transaction_amount_value","value"])
+    minor_col= _pick(cols_map, ["amount_minor"])
     ccy_col  = _pick(cols_map, ["amount_currency","currency","transaction_amount_currency","currency_code"])
 
+    rows = load_rows([time_col, desc_col, payer_col, val_col, minor_col, ccy_col])
+    if not rows:
+        return ("No recurring payment (CSV empty).", None)
+
     if not time_col:
         return ("No recurring payment (no timestamp column).", None)
 
@@ -105,7 +155,7 @@ def notify_same_day_last_month(csv_path: str) -> Tuple[str, Optional[Dict]]:
 
     desc = row.get(desc_col) if desc_col else None
     payer = row.get(payer_col) if payer_col else None
-    val = row.get(val_col) if val_col else None
+    _, val = _amount(row, minor_col, val_col, ccy_col)
     ccy = row.get(ccy_col) if ccy_col else None
 
     parts = [f"You paid an invoice on {target_date.isoformat()}"]
@@ -170,22 +220,24 @@ def show_recurring_same_day_last_3_months(csv_path: str) -> List[Dict]:
         print("No recurring payment (CSV not found).")
         return []
 
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-        if not rows:
-            print("No recurring payment (CSV empty).")
-            return []
-        cols_map = _columns_map(reader.fieldnames)
+    header, load_rows = _open_table(csv_path)
+    cols_map = _columns_map(header)
 
     # Column guesses (robust to different headers)
-    time_col = _pick(cols_map, ["initiation_time","time","transaction_time","transaction_initiation_date"])
+    time_col = _pick(cols_map, _TIME_CANDIDATES)
     desc_col = _pick(cols_map, ["description","item_names","transaction_subject","note","memo"])
     inv_col  = _pick(cols_map, ["invoice_id","cart_invoice_id","paypal_invoice_id"])
     payer_col= _pick(cols_map, ["sender_name","payer_email","payer_name","payer"])
     val_col  = _pick(cols_map, ["amount_value","amount","transaction_amount_value","value"])
+    minor_col= _pick(cols_map, ["amount_minor"])
     ccy_col  = _pick(cols_map, ["amount_currency","currency","transaction_amount_currency","currency_code"])
 
+    # Snapshots load only these columns; CSV still reads every row in full
+    rows = load_rows([time_col, desc_col, inv_col, payer_col, val_col, minor_col, ccy_col])
+    if not rows:
+        print("No recurring payment (CSV empty).")
+        return []
+
     if not time_col:
         print("No recurring payment (no timestamp column).")
         return []
@@ -236,10 +288,11 @@ def show_recurring_same_day_last_3_months(csv_path: str) -> List[Dict]:
         has1, has2, has3 = bool(rows1), bool(rows2), bool(rows3)
         label = _classify(has1, has2, has3)
 
-        desc = _sample(rows1 or rows2 or rows3, desc_col) or "(no description)"
-        payer = _sample(rows1 or rows2 or rows3, payer_col)
-        val = _sample(rows1 or rows2 or rows3, val_col)
-        ccy = _sample(rows1 or rows2 or rows3, ccy_col)
+        sample_rows = rows1 or rows2 or rows3
+        desc = _sample(sample_rows, desc_col) or "(no description)"
+        payer = _sample(sample_rows, payer_col)
+        minor, val = _amount(sample_rows[0], minor_col, val_col, ccy_col)
+        ccy = _sample(sample_rows, ccy_col)
 
         dates_str = f"[dates: {targets[1].isoformat() if has1 else '—'}, {targets[2].isoformat() if has2 else '—'}, {targets[3].isoformat() if has3 else '—'}]"
         parts = [label, f"— {desc}"]
@@ -255,6 +308,7 @@ def show_recurring_same_day_last_3_months(csv_path: str) -> List[Dict]:
             "description": desc if desc != "(no description)" else None,
             "payer": payer,
             "amount": val,
+            "amount_minor": minor,
             "currency": ccy,
             "dates": {
                 "last_month": targets[1].isoformat() if has1 else None,
@@ -0,0 +1,411 @@
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import stat
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .storage import SCHEMA_SQL, FTS_SQL, ROLLUP_SQL, flatten_txns, upsert_txn, query_rollups_conn, \
+    search_conn, _fts_query
+from ..core.tracing import traced
+
+# Month-partitioned history: one SQLite file per calendar month (UTC) of
+# initiation_time, e.g. out/txn_partitions/txn_2025_09.db. Closed months are
+# vacuumed once, marked sealed and made read-only; retention drops whole files.
+PARTITION_ROOT_DEFAULT = os.getenv("PAYPAL_PARTITION_ROOT", "out/txn_partitions")
+RETENTION_MONTHS_DEFAULT = 36  # PAYPAL_RETENTION_MONTHS, read by apply_retention
+SEAL_GRACE_DAYS = 7  # late refunds/status updates still land in last month for a week
+# Stored in PRAGMA user_version. Bump whenever the partition tables, indexes or triggers
+# change; older partitions are rebuilt from their raw_json by migrate().
+PARTITION_SCHEMA_VERSION = 4  # 2: full-text index, 3: rollup tables, 4: integer minor units
+
+log = logging.getLogger("paypalx.partitions")
+
+META_SQL = """
+CREATE TABLE IF NOT EXISTS partition_meta(
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+INDEX_SQL = "CREATE INDEX IF NOT EXISTS ix_transactions_initiation_time ON transactions(initiation_time);"
+
+
+class PartitionSchemaError(RuntimeError):
+    """A partition was written by an older schema and has to be rebuilt first."""
+
+
+def _month_key(initiation_time: Optional[str]) -> Optional[str]:
+    # PayPal timestamps are ISO-8601 ("2025-09-14T10:00:00+0000"); the month is the first 7 chars
+    if not initiation_time or len(initiation_time) < 7 or initiation_time[4] != "-":
+        return None
+    return f"{initiation_time[:4]}_{initiation_time[5:7]}"
+
+
+def _partition_path(root: str, month: str) -> str:
+    return os.path.join(root, f"txn_{month}.db")
+
+
+def _month_start(month: str) -> datetime:
+    y, m = month.split("_")
+    return datetime(int(y), int(m), 1, tzinfo=timezone.utc)
+
+
+def _next_month(d: datetime) -> datetime:
+    return d.replace(year=d.year + 1, month=1) if d.month == 12 else d.replace(month=d.month + 1)
+
+
+def _months_between(start: datetime, end: datetime) -> List[str]:
+    cur = start.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    out = []
+    while cur <= end:
+        out.append(f"{cur.year:04d}_{cur.month:02d}")
+        cur = _next_month(cur)
+    return out
+
+
+def _partition_months(root: str) -> List[str]:
+    """Month keys of the partition files, sorted; from file names only, nothing is opened."""
+    if not os.path.isdir(root):
+        return []
+    return [name[4:-3] for name in sorted(os.listdir(root)) if name.startswith("txn_") and name.endswith(".db")]
+
+
+def list_partitions(root: str = PARTITION_ROOT_DEFAULT) -> List[Tuple[str, str, bool]]:
+    """Returns [(month, path, sealed)] sorted by month."""
+    return [(month, _partition_path(root, month), is_sealed(_partition_path(root, month)))
+            for month in _partition_months(root)]
+
+
+def _connect_ro(path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{Path(path).resolve()}?mode=ro", uri=True)
+
+
+def is_sealed(path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    conn = _connect_ro(path)
+    try:
+        row = conn.execute("SELECT value FROM partition_meta WHERE key='sealed'").fetchone()
+        return bool(row and row[0] == "1")
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.close()
+
+
+def _schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _check_schema(conn: sqlite3.Connection, path: str) -> None:
+    version = _schema_version(conn)
+    if version != PARTITION_SCHEMA_VERSION:
+        raise PartitionSchemaError(
+            f"Partition {path} has schema version {version}, expected {PARTITION_SCHEMA_VERSION}; "
+            f"rebuild it with partitions.migrate() (also run by maintain())"
+        )
+
+
+def _create_schema(conn: sqlite3.Connection, month: str) -> None:
+    conn.execute(SCHEMA_SQL)
+    conn.executescript(FTS_SQL)
+    conn.executescript(ROLLUP_SQL)
+    conn.execute(INDEX_SQL)
+    conn.execute(META_SQL)
+    conn.execute("INSERT OR IGNORE INTO partition_meta(key, value) VALUES('month', ?)", (month,))
+    conn.execute(f"PRAGMA user_version = {PARTITION_SCHEMA_VERSION}")
+
+
+def _open_partition(root: str, month: str) -> sqlite3.Connection:
+    path = _partition_path(root, month)
+    Path(root).mkdir(parents=True, exist_ok=True)
+    if os.path.exists(path):
+        conn = _connect_ro(path)
+        try:
+            outdated = _schema_version(conn) != PARTITION_SCHEMA_VERSION
+        finally:
+            conn.close()
+        if outdated:
+            rebuild_partition(path)
+    conn = sqlite3.connect(path)
+    _create_schema(conn, month)
+    return conn
+
+
+def rebuild_partition(path: str) -> int:
+    """
+    Re-create a partition at the current schema by re-flattening each row's
+    raw_json. The sealed flag and read-only mode are carried over. Returns the
+    number of rows copied.
+    """
+    month = Path(path).stem[len("txn_"):]
+    tmp_path = f"{path}.rebuild"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    old = _connect_ro(path)
+    new = sqlite3.connect(tmp_path)
+    try:
+        columns = {r[1] for r in old.execute("PRAGMA table_info(transactions)")}
+        if "raw_json" not in columns:
+            raise PartitionSchemaError(f"Partition {path} has no raw_json column and can't be rebuilt; "
+                                       f"delete it and re-archive the month")
+        _create_schema(new, month)
+        try:
+            meta = old.execute("SELECT key, value FROM partition_meta").fetchall()
+        except sqlite3.Error:
+            meta = []
+        new.executemany("INSERT OR REPLACE INTO partition_meta(key, value) VALUES(?, ?)", meta)
+        raws = (json.loads(r[0]) for r in old.execute("SELECT raw_json FROM transactions WHERE raw_json IS NOT NULL"))
+        cur = new.cursor()
+        copied = 0
+        for batch in flatten_txns(raws, workers=1):
+            for row in batch:
+                upsert_txn(cur, row)
+            copied += len(batch)
+        new.commit()
+        sealed = dict(meta).get("sealed") == "1"
+    finally:
+        new.close()
+        old.close()
+    os.replace(tmp_path, path)
+    if sealed:
+        os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    log.info("Rebuilt partition %s at schema version %d (%d rows)", path, PARTITION_SCHEMA_VERSION, copied)
+    return copied
+
+
+def migrate(root: str = PARTITION_ROOT_DEFAULT) -> List[str]:
+    """Rebuild every partition whose schema version is not the current one."""
+    rebuilt = []
+    for month, path, _ in list_partitions(root):
+        conn = _connect_ro(path)
+        try:
+            outdated = _schema_version(conn) != PARTITION_SCHEMA_VERSION
+        finally:
+            conn.close()
+        if outdated:
+            rebuild_partition(path)
+            rebuilt.append(month)
+    return rebuilt
+
+
+def ingest_rows(rows: Iterable[Dict], root: str = PARTITION_ROOT_DEFAULT) -> Dict[str, int]:
+    """
+    Upsert already-flattened rows into their month partition.
+    Rows for sealed months or without a timestamp are skipped.
+    Returns {month: rows_written}.
+    """
+    conns: Dict[str, sqlite3.Connection] = {}
+    sealed = {m for m, _, s in list_partitions(root) if s}
+    written: Dict[str, int] = {}
+    skipped = 0
+    try:
+        for row in rows:
+            month = _month_key(row.get("initiation_time"))
+            if not row.get("transaction_id") or not month or month in sealed:
+                skipped += 1
+                continue
+            conn = conns.get(month)
+            if conn is None:
+                conn = conns[month] = _open_partition(root, month)
+            upsert_txn(conn.cursor(), row)
+            written[month] = written.get(month, 0) + 1
+        for conn in conns.values():
+            conn.commit()
+    finally:
+        for conn in conns.values():
+            conn.close()
+    if skipped:
+        log.info("Skipped %d rows (sealed month or missing id/time)", skipped)
+    return written
+
+
+def ingest_partitioned(txns: Iterable[Dict], root: str = PARTITION_ROOT_DEFAULT,
+                       workers: Optional[int] = None) -> Dict[str, int]:
+    """Flatten raw PayPal transactions and route them to month partitions."""
+    return ingest_rows((row for batch in flatten_txns(txns, workers=workers) for row in batch), root)
+
+
+def archive_from_db(db_path: str, root: str = PARTITION_ROOT_DEFAULT) -> Dict[str, int]:
+    """Copy the rows of a single-file transactions DB (e.g. the 90-day one) into the partitions."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return ingest_rows((dict(r) for r in conn.execute("SELECT * FROM transactions")), root)
+    finally:
+        conn.close()
+
+
+def seal_partition(path: str) -> None:
+    """Vacuum once, flag as sealed and drop write permission; the file is never rewritten after this."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("INSERT OR REPLACE INTO partition_meta(key, value) VALUES('sealed', '1')")
+        conn.execute("INSERT OR REPLACE INTO partition_meta(key, value) VALUES('sealed_at', ?)",
+                     (datetime.now(timezone.utc).isoformat(),))
+        conn.commit()
+        conn.execute("PRAGMA optimize")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+
+def seal_closed_months(root: str = PARTITION_ROOT_DEFAULT, now: Optional[datetime] = None) -> List[str]:
+    now = now or datetime.now(timezone.utc)
+    sealed_now = []
+    for month, path, sealed in list_partitions(root):
+        if sealed:
+            continue
+        if _next_month(_month_start(month)) + timedelta(days=SEAL_GRACE_DAYS) <= now:
+            seal_partition(path)
+            sealed_now.append(month)
+    if sealed_now:
+        log.info("Sealed partitions: %s", ", ".join(sealed_now))
+    return sealed_now
+
+
+def _retention_months_from_env() -> int:
+    # Read per call so a bad value can't break importing this module
+    raw = os.getenv("PAYPAL_RETENTION_MONTHS", "")
+    try:
+        months = int(raw) if raw.strip() else RETENTION_MONTHS_DEFAULT
+    except ValueError:
+        months = -1
+    if months < 0:
+        log.warning("Ignoring invalid PAYPAL_RETENTION_MONTHS=%r; using %d", raw, RETENTION_MONTHS_DEFAULT)
+        return RETENTION_MONTHS_DEFAULT
+    return months
+
+
+def apply_retention(root: str = PARTITION_ROOT_DEFAULT, keep_months: Optional[int] = None,
+                    now: Optional[datetime] = None) -> List[str]:
+    """
+    Delete partitions older than `keep_months` full months before the current one
+    (default: PAYPAL_RETENTION_MONTHS).
+    """
+    if keep_months is None:
+        keep_months = _retention_months_from_env()
+    now = now or datetime.now(timezone.utc)
+    cutoff = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(keep_months):
+        cutoff = (cutoff - timedelta(days=1)).replace(day=1)
+    dropped = []
+    for month, path, _ in list_partitions(root):
+        if _month_start(month) < cutoff:
+            os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
+            os.remove(path)
+            dropped.append(month)
+    if dropped:
+        log.info("Retention dropped partitions: %s", ", ".join(dropped))
+    return dropped
+
+
+def maintain(root: str = PARTITION_ROOT_DEFAULT) -> Dict[str, List[str]]:
+    dropped = apply_retention(root)  # first, so expiring months aren't vacuumed just to be deleted
+    migrated = migrate(root)
+    return {"migrated": migrated, "sealed": seal_closed_months(root), "dropped": dropped}
+
+
+def iter_range(
+    start: datetime,
+    end: datetime,
+    columns: str = "*",
+    root: str = PARTITION_ROOT_DEFAULT,
+) -> Iterator[Dict]:
+    """
+    Yield rows with start <= initiation_time < end, newest first.
+    Only the partitions for months in the range are opened (read-only).
+    """
+    start_iso = start.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    end_iso = end.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    for month in reversed(_months_between(start, end)):
+        path = _partition_path(root, month)
+        if not os.path.exists(path):
+            continue
+        conn = _connect_ro(path)
+        conn.row_factory = sqlite3.Row
+        try:
+            _check_schema(conn, path)
+            cur = conn.execute(f"""
+                SELECT {columns} FROM transactions
+                WHERE initiation_time >= ? AND initiation_time < ?
+                ORDER BY initiation_time DESC
+            """, (start_iso, end_iso))
+            for r in cur:
+                yield dict(r)
+        finally:
+            conn.close()
+
+
+@traced("sqlite.fts_search_partitions", kind="client")
+def search_history(
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    root: str = PARTITION_ROOT_DEFAULT,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Tuple[int, List[Dict]]:
+    """
+    search_transactions over the month partitions (only those overlapping
+    since..until when given): each partition's FTS index returns its best
+    offset+limit matches, which are merged by bm25 score. Scores come from
+    per-month indexes, so ranking across months is close to, not exactly, what
+    one big index would give.
+    """
+    match = _fts_query(query)
+    if not match:
+        return 0, []
+    total = 0
+    candidates: List[Dict] = []
+    for month in reversed(_partition_months(root)):
+        first = _month_start(month)
+        if (since is not None and _next_month(first) <= since) or (until is not None and first >= until):
+            continue
+        path = _partition_path(root, month)
+        conn = _connect_ro(path)
+        try:
+            _check_schema(conn, path)
+            n, items = search_conn(conn, match, offset + limit, 0, since, until)
+        finally:
+            conn.close()
+        total += n
+        candidates.extend(items)
+    best = heapq.nsmallest(offset + limit, candidates, key=lambda it: it["score"])
+    return total, best[offset:]
+
+
+@traced("sqlite.rollups_partitions", kind="client")
+def query_rollups_range(
+    since: datetime,
+    until: datetime,
+    root: str = PARTITION_ROOT_DEFAULT,
+    **kwargs,
+) -> List[Dict]:
+    """
+    query_rollups over history: reads each touched month's rollup table and
+    concatenates (a period never spans two partitions, so no re-merge is needed).
+    since/until choose the months; unless start=/end= period strings are passed,
+    they also bound the periods, so pass the real upper bound (e.g. now), not its month.
+    """
+    width = 10 if kwargs.get("granularity") == "daily" else 7
+    if kwargs.get("start") is None:
+        kwargs["start"] = since.astimezone(timezone.utc).isoformat()[:width]
+    if kwargs.get("end") is None:
+        kwargs["end"] = until.astimezone(timezone.utc).isoformat()[:width]
+    out: List[Dict] = []
+    for month in reversed(_months_between(since, until)):
+        path = _partition_path(root, month)
+        if not os.path.exists(path):
+            continue
+        conn = _connect_ro(path)
+        try:
+            _check_schema(conn, path)
+            out.extend(query_rollups_conn(conn, **kwargs))
+        finally:
+            conn.close()
+    return out
@@ -14,6 +14,7 @@ class RecurringItem(BaseModel):
     description: Optional[str] = None
     payer: Optional[str] = None
     amount: Optional[str] = None
+    amount_minor: Optional[int] = None
     currency: Optional[str] = None
     dates: RecurringDates
 
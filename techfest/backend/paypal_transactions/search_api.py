@@ -0,0 +1,28 @@
+from __future__ import annotations
+from typing import Optional, List
+from pydantic import BaseModel
+
+
+class TransactionHit(BaseModel):
+    transaction_id: str
+    initiation_time: Optional[str] = None
+    status: Optional[str] = None
+    amount_value: Optional[str] = None
+    amount_minor: Optional[int] = None
+    amount_currency: Optional[str] = None
+    sender_name: Optional[str] = None
+    payer_email: Optional[str] = None
+    invoice_id: Optional[str] = None
+    item_names: Optional[str] = None
+    description: Optional[str] = None
+    snippet: Optional[str] = None
+    score: float
+
+
+class TransactionSearchResponse(BaseModel):
+    query: str
+    total: int
+    page: int
+    page_size: int
+    next_page: Optional[int] = None
+    items: List[TransactionHit]
@@ -0,0 +1,269 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Columnar snapshot format (little-endian):
+#   magic(8) | rows u64 | ncols u32 | nstrings u32
+#   per column: name_len u16 | name utf-8 | type u8 | offset u64 | nbytes u64
+#   string table: offsets u64[nstrings + 1] @ offset, utf-8 blob @ offset
+#   column blocks, each 8-byte aligned
+# Numeric columns are fixed-width; string columns hold u32 codes into one
+# dictionary shared by all string columns of the file.
+
+SNAPSHOT_SUFFIX = ".ppxcol"
+MAGIC = b"PPXCOL1\x00"
+
+INT64 = "int64"
+FLOAT64 = "float64"
+STR = "str"
+
+_TYPE_CODES = {INT64: 1, FLOAT64: 2, STR: 3}
+_TYPE_NAMES = {v: k for k, v in _TYPE_CODES.items()}
+_ARRAY_CODES = {INT64: "q", FLOAT64: "d", STR: "I"}
+
+INT64_NULL = -(2 ** 63)
+STR_NULL = 0xFFFFFFFF
+
+_HEAD = struct.Struct("<8sQII")
+_COL = struct.Struct("<BQQ")
+
+
+def is_snapshot_path(path: str) -> bool:
+    return str(path).endswith(SNAPSHOT_SUFFIX)
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _to_int(v) -> int:
+    if v is None or v == "":
+        return INT64_NULL
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return INT64_NULL
+
+
+def _to_float(v) -> float:
+    if v is None or v == "":
+        return float("nan")
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _le_bytes(arr: array) -> bytes:
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def write_snapshot(out_path: str, schema: Sequence[Tuple[str, str]], rows: Iterable[Dict]) -> int:
+    """
+    Write `rows` as a columnar snapshot. `schema` is a list of (column, type)
+    with type one of INT64 / FLOAT64 / STR. Returns the number of rows written.
+    The file is written next to `out_path` and swapped in atomically.
+    """
+    cols = {name: array(_ARRAY_CODES[typ]) for name, typ in schema}
+    strings: Dict[str, int] = {}
+    n = 0
+    for r in rows:
+        for name, typ in schema:
+            v = r.get(name)
+            if typ == INT64:
+                cols[name].append(_to_int(v))
+            elif typ == FLOAT64:
+                cols[name].append(_to_float(v))
+            else:
+                if v is None:
+                    cols[name].append(STR_NULL)
+                else:
+                    s = str(v)
+                    code = strings.get(s)
+                    if code is None:
+                        code = strings[s] = len(strings)
+                    cols[name].append(code)
+        n += 1
+
+    blob = bytearray()
+    offsets = array("Q", [0])
+    for s in strings:  # dict preserves insertion order == code order
+        blob += s.encode("utf-8")
+        offsets.append(len(blob))
+
+    # Directory size is known up front, so data offsets can be computed in one pass.
+    dir_size = _HEAD.size + sum(2 + len(name.encode("utf-8")) + _COL.size for name, _ in schema) + 2 * 16
+    pos = _align(dir_size)
+    str_offsets_at, pos = pos, _align(pos + len(offsets) * 8)
+    str_blob_at, pos = pos, _align(pos + len(blob))
+    layout = []
+    for name, typ in schema:
+        nbytes = len(cols[name]) * cols[name].itemsize
+        layout.append((name, typ, pos, nbytes))
+        pos = _align(pos + nbytes)
+
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEAD.pack(MAGIC, n, len(schema), len(strings)))
+        for name, typ, off, nbytes in layout:
+            raw = name.encode("utf-8")
+            f.write(struct.pack("<H", len(raw)) + raw)
+            f.write(_COL.pack(_TYPE_CODES[typ], off, nbytes))
+        f.write(struct.pack("<QQ", str_offsets_at, len(offsets) * 8))
+        f.write(struct.pack("<QQ", str_blob_at, len(blob)))
+
+        def _pad_to(at: int) -> None:
+            f.write(b"\x00" * (at - f.tell()))
+
+        _pad_to(str_offsets_at)
+        f.write(_le_bytes(offsets))
+        _pad_to(str_blob_at)
+        f.write(blob)
+        for name, _, off, _ in layout:
+            _pad_to(off)
+            f.write(_le_bytes(cols[name]))
+    os.replace(tmp_path, out_path)
+    return n
+
+
+class Snapshot:
+    """
+    Read-only, memory-mapped view over a snapshot file.
+    Columns are exposed as typed memoryviews over the mapping (no copy);
+    only the columns you touch are paged in.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._f.close()
+            raise ValueError(f"Not a snapshot file: {path}")
+        self._views: List[memoryview] = []
+        self._decoded: Dict[int, str] = {}
+        try:
+            self._read_directory()
+        except (struct.error, KeyError, UnicodeDecodeError, ValueError, TypeError) as e:
+            # Truncated or corrupt file: don't leak the mapping / descriptor
+            self.close()
+            raise ValueError(f"Not a snapshot file: {path} ({e})") from None
+
+    def _read_directory(self) -> None:
+        size = len(self._mm)
+        magic, self.rows_count, ncols, self._nstrings = _HEAD.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError("bad magic")
+        pos = _HEAD.size
+        self._columns: Dict[str, Tuple[str, int, int]] = {}
+        for _ in range(ncols):
+            (name_len,) = struct.unpack_from("<H", self._mm, pos)
+            pos += 2
+            name = bytes(self._mm[pos:pos + name_len]).decode("utf-8")
+            pos += name_len
+            type_code, off, nbytes = _COL.unpack_from(self._mm, pos)
+            pos += _COL.size
+            typ = _TYPE_NAMES[type_code]
+            if off + nbytes > size or nbytes != self.rows_count * array(_ARRAY_CODES[typ]).itemsize:
+                raise ValueError(f"column {name!r} out of bounds")
+            self._columns[name] = (typ, off, nbytes)
+        self._str_offsets_at, self._str_offsets_len = struct.unpack_from("<QQ", self._mm, pos)
+        self._str_blob_at, str_blob_len = struct.unpack_from("<QQ", self._mm, pos + 16)
+        if (self._str_offsets_at + self._str_offsets_len > size or self._str_blob_at + str_blob_len > size
+                or self._str_offsets_len != (self._nstrings + 1) * 8):
+            raise ValueError("string table out of bounds")
+        self._str_offsets = self._typed(self._str_offsets_at, self._str_offsets_len, "Q")
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def column_type(self, name: str) -> str:
+        return self._columns[name][0]
+
+    def _typed(self, off: int, nbytes: int, code: str):
+        if sys.byteorder != "little":
+            arr = array(code, self._mm[off:off + nbytes])
+            arr.byteswap()
+            return arr
+        raw = memoryview(self._mm)[off:off + nbytes]
+        view = raw.cast(code)
+        self._views.extend((raw, view))
+        return view
+
+    def column(self, name: str):
+        """
+        Raw typed column: int64/float64 values, or u32 string codes for STR columns
+        (decode with `string`). Nulls are INT64_NULL / NaN / STR_NULL.
+        """
+        typ, off, nbytes = self._columns[name]
+        return self._typed(off, nbytes, _ARRAY_CODES[typ])
+
+    def string(self, code: int) -> Optional[str]:
+        if code == STR_NULL:
+            return None
+        s = self._decoded.get(code)
+        if s is None:
+            start, end = self._str_offsets[code], self._str_offsets[code + 1]
+            base = self._str_blob_at
+            s = self._decoded[code] = self._mm[base + start:base + end].decode("utf-8")
+        return s
+
+    def values(self, name: str) -> List:
+        """Materialize one column as Python values (None for nulls)."""
+        typ = self.column_type(name)
+        col = self.column(name)
+        if typ == STR:
+            return [self.string(c) for c in col]
+        if typ == INT64:
+            return [None if v == INT64_NULL else v for v in col]
+        return [None if v != v else v for v in col]
+
+    def rows(self, names: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+        """
+        Yield dict rows holding only `names` (all columns if omitted), read
+        straight from the mapped columns one row at a time.
+        """
+        names = [n for n in (names or self.columns) if n in self._columns]
+        cols = [(n, self.column_type(n), self.column(n)) for n in names]
+        string = self.string
+        for i in range(self.rows_count):
+            row = {}
+            for n, typ, col in cols:
+                v = col[i]
+                if typ == STR:
+                    v = string(v)
+                elif typ == INT64:
+                    v = None if v == INT64_NULL else v
+                elif v != v:
+                    v = None
+                row[n] = v
+            yield row
+
+    def close(self) -> None:
+        self._decoded.clear()
+        for v in reversed(self._views):
+            v.release()
+        self._views.clear()
+        if not self._mm.closed:
+            self._mm.close()
+        self._f.close()
+
+
+def open_snapshot(path: str) -> Snapshot:
+    return Snapshot(path)
@@ -1,12 +1,28 @@
 import sqlite3
 import json
 import csv
+import logging
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .money import to_minor, from_minor
+from .snapshot import write_snapshot, INT64, STR
+from ..core.tracing import traced
 
 DB_PATH_DEFAULT = "out/paypal_txn_last90d.db"  # recreated each run by default
 
+log = logging.getLogger("paypalx.storage")
+
+# Parallel flatten stage (PAYPAL_FLATTEN_WORKERS): 0 -> os.cpu_count(); 1 -> always in-process
+FLATTEN_WORKERS_DEFAULT = 0
+FLATTEN_BATCH_SIZE = 500
+FLATTEN_MIN_PARALLEL = 2000  # below this many txns a pool costs more than it saves
+
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS transactions(
     transaction_id          TEXT PRIMARY KEY,
@@ -15,9 +31,10 @@ CREATE TABLE IF NOT EXISTS transactions(
     status                  TEXT,
     event_code              TEXT,
 
-    amount_value            REAL,
+    -- integer minor units (cents etc.), see money.CURRENCY_EXPONENTS
+    amount_minor            INTEGER,
     amount_currency         TEXT,
-    fee_value               REAL,
+    fee_minor               INTEGER,
     fee_currency            TEXT,
 
     -- Sender (payer) details
@@ -42,6 +59,87 @@ CREATE TABLE IF NOT EXISTS transactions(
 );
 """
 
+# Full-text index over the free-text columns. External-content table: the text
+# lives once in `transactions`; triggers keep the index in step with every
+# insert/upsert/delete (ON CONFLICT DO UPDATE fires the UPDATE trigger).
+FTS_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+    description, item_names, sender_name, payer_email,
+    content='transactions', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions BEGIN
+    INSERT INTO transactions_fts(rowid, description, item_names, sender_name, payer_email)
+    VALUES (new.rowid, new.description, new.item_names, new.sender_name, new.payer_email);
+END;
+CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions BEGIN
+    INSERT INTO transactions_fts(transactions_fts, rowid, description, item_names, sender_name, payer_email)
+    VALUES ('delete', old.rowid, old.description, old.item_names, old.sender_name, old.payer_email);
+END;
+CREATE TRIGGER IF NOT EXISTS transactions_fts_au AFTER UPDATE ON transactions BEGIN
+    INSERT INTO transactions_fts(transactions_fts, rowid, description, item_names, sender_name, payer_email)
+    VALUES ('delete', old.rowid, old.description, old.item_names, old.sender_name, old.payer_email);
+    INSERT INTO transactions_fts(rowid, description, item_names, sender_name, payer_email)
+    VALUES (new.rowid, new.description, new.item_names, new.sender_name, new.payer_email);
+END;
+"""
+
+# Rollups: daily and monthly totals per (payer, currency, status), maintained by
+# triggers as rows are inserted/upserted/deleted, so reads never touch `transactions`.
+# Positive amounts count as income, negative ones as spend; all totals are integer
+# minor units, so sums are exact.
+ROLLUP_GRANULARITIES = {"daily": ("rollup_daily", 10), "monthly": ("rollup_monthly", 7)}
+
+def _rollup_sql(table: str, width: int) -> str:
+    key = (f"substr({{r}}.initiation_time, 1, {width}), COALESCE({{r}}.payer_email, {{r}}.sender_name, ''), "
+           f"COALESCE({{r}}.amount_currency, ''), COALESCE({{r}}.status, '')")
+    add = f"""
+    INSERT INTO {table}(period, payer, currency, status, txn_count, income_minor, spend_minor, fee_minor)
+    VALUES ({key.format(r="new")}, 1,
+            MAX(COALESCE(new.amount_minor, 0), 0), MAX(-COALESCE(new.amount_minor, 0), 0),
+            COALESCE(new.fee_minor, 0))
+    ON CONFLICT(period, payer, currency, status) DO UPDATE SET
+        txn_count = txn_count + 1,
+        income_minor = income_minor + excluded.income_minor,
+        spend_minor = spend_minor + excluded.spend_minor,
+        fee_minor = fee_minor + excluded.fee_minor;"""
+    sub = f"""
+    UPDATE {table} SET
+        txn_count = txn_count - 1,
+        income_minor = income_minor - MAX(COALESCE(old.amount_minor, 0), 0),
+        spend_minor = spend_minor - MAX(-COALESCE(old.amount_minor, 0), 0),
+        fee_minor = fee_minor - COALESCE(old.fee_minor, 0)
+    WHERE (period, payer, currency, status) = ({key.format(r="old")});
+    DELETE FROM {table}
+    WHERE (period, payer, currency, status) = ({key.format(r="old")}) AND txn_count <= 0;"""
+    return f"""
+CREATE TABLE IF NOT EXISTS {table}(
+    period          TEXT NOT NULL,
+    payer           TEXT NOT NULL,
+    currency        TEXT NOT NULL,
+    status          TEXT NOT NULL,
+    txn_count       INTEGER NOT NULL,
+    income_minor    INTEGER NOT NULL,
+    spend_minor     INTEGER NOT NULL,
+    fee_minor       INTEGER NOT NULL,
+    PRIMARY KEY(period, payer, currency, status)
+);
+CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON transactions
+WHEN new.initiation_time IS NOT NULL BEGIN{add}
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON transactions
+WHEN old.initiation_time IS NOT NULL BEGIN{sub}
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_au_old AFTER UPDATE ON transactions
+WHEN old.initiation_time IS NOT NULL BEGIN{sub}
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_au_new AFTER UPDATE ON transactions
+WHEN new.initiation_time IS NOT NULL BEGIN{add}
+END;
+"""
+
+ROLLUP_SQL = "".join(_rollup_sql(t, w) for t, w in ROLLUP_GRANULARITIES.values())
+
 def init_db(db_path: str = DB_PATH_DEFAULT, wipe: bool = True) -> sqlite3.Connection:
     """
     Create (and optionally wipe) the DB so schema changes apply cleanly each run.
@@ -51,15 +149,11 @@ def init_db(db_path: str = DB_PATH_DEFAULT, wipe: bool = True) -> sqlite3.Connec
         os.remove(db_path)
     conn = sqlite3.connect(db_path)
     conn.execute(SCHEMA_SQL)
+    conn.executescript(FTS_SQL)
+    conn.executescript(ROLLUP_SQL)
     conn.commit()
     return conn
 
-def _safe_float(x):
-    try:
-        return float(x) if x is not None else None
-    except Exception:
-        return None
-
 def _name_from_payer(payer: Dict) -> Tuple[str, str, str]:
     """
     Build (full, given, surname) from payer_info.payer_name;
@@ -124,9 +218,9 @@ def _flatten_txn(txn: Dict) -> Dict:
         "status": info.get("transaction_status"),
         "event_code": info.get("transaction_event_code"),
 
-        "amount_value": _safe_float(amt.get("value")),
+        "amount_minor": to_minor(amt.get("value"), amt.get("currency_code")),
         "amount_currency": amt.get("currency_code"),
-        "fee_value": _safe_float(fee.get("value")),
+        "fee_minor": to_minor(fee.get("value"), fee.get("currency_code")),
         "fee_currency": fee.get("currency_code"),
 
         "sender_name": sender_full,
@@ -153,7 +247,7 @@ def upsert_txn(cur: sqlite3.Cursor, row: Dict) -> None:
     cur.execute("""
     INSERT INTO transactions(
         transaction_id, initiation_time, updated_time, status, event_code,
-        amount_value, amount_currency, fee_value, fee_currency,
+        amount_minor, amount_currency, fee_minor, fee_currency,
         sender_name, payer_given_name, payer_surname, payer_email, payer_id, payer_country_code, payer_phone,
         invoice_id, cart_invoice_id, item_count, item_names, item_skus, item_json, description,
         raw_json
@@ -166,9 +260,9 @@ def upsert_txn(cur: sqlite3.Cursor, row: Dict) -> None:
         updated_time=excluded.updated_time,
         status=excluded.status,
         event_code=excluded.event_code,
-        amount_value=excluded.amount_value,
+        amount_minor=excluded.amount_minor,
         amount_currency=excluded.amount_currency,
-        fee_value=excluded.fee_value,
+        fee_minor=excluded.fee_minor,
         fee_currency=excluded.fee_currency,
         sender_name=excluded.sender_name,
         payer_given_name=excluded.payer_given_name,
@@ -187,22 +281,77 @@ def upsert_txn(cur: sqlite3.Cursor, row: Dict) -> None:
         raw_json=excluded.raw_json;
     """, (
         row["transaction_id"], row["initiation_time"], row["updated_time"], row["status"], row["event_code"],
-        row["amount_value"], row["amount_currency"], row["fee_value"], row["fee_currency"],
+        row["amount_minor"], row["amount_currency"], row["fee_minor"], row["fee_currency"],
         row["sender_name"], row["payer_given_name"], row["payer_surname"], row["payer_email"], row["payer_id"], row["payer_country_code"], row["payer_phone"],
         row["invoice_id"], row["cart_invoice_id"], row["item_count"], row["item_names"], row["item_skus"], row["item_json"], row["description"],
         row["raw_json"]
     ))
 
-def ingest_to_sqlite(txns: Iterable[Dict], db_path: str = DB_PATH_DEFAULT) -> int:
+def _flatten_batch(batch: List[Dict]) -> List[Dict]:
+    return [_flatten_txn(txn) for txn in batch]
+
+def _batched(it: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+def _flatten_workers_from_env() -> int:
+    # Read per call so a bad value only affects ingest, not importing this module
+    raw = os.getenv("PAYPAL_FLATTEN_WORKERS", "")
+    try:
+        return int(raw) if raw.strip() else FLATTEN_WORKERS_DEFAULT
+    except ValueError:
+        log.warning("Ignoring invalid PAYPAL_FLATTEN_WORKERS=%r; using %d", raw, FLATTEN_WORKERS_DEFAULT)
+        return FLATTEN_WORKERS_DEFAULT
+
+def flatten_txns(
+    txns: Iterable[Dict],
+    workers: Optional[int] = None,
+    batch_size: int = FLATTEN_BATCH_SIZE,
+    min_parallel: int = FLATTEN_MIN_PARALLEL,
+) -> Iterator[List[Dict]]:
+    """
+    Flatten raw transactions into row batches, in input order.
+    Batches go to a process pool unless the input is small (< min_parallel)
+    or workers resolves to 1; at most 2 batches per worker are in flight.
+    """
+    workers = workers if workers is not None else _flatten_workers_from_env()
+    workers = workers or os.cpu_count() or 1
+    it = iter(txns)
+    head = list(islice(it, min_parallel))
+
+    if workers <= 1 or len(head) < min_parallel:
+        for batch in _batched(iter(head), batch_size):
+            yield _flatten_batch(batch)
+        for batch in _batched(it, batch_size):
+            yield _flatten_batch(batch)
+        return
+
+    def _all_batches():
+        yield from _batched(iter(head), batch_size)
+        yield from _batched(it, batch_size)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in _all_batches():
+            pending.append(pool.submit(_flatten_batch, batch))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def ingest_to_sqlite(txns: Iterable[Dict], db_path: str = DB_PATH_DEFAULT, workers: Optional[int] = None) -> int:
     conn = init_db(db_path, wipe=True)  # recreate to apply new schema each run
     cur = conn.cursor()
     count = 0
-    for txn in txns:
-        row = _flatten_txn(txn)
-        if not row["transaction_id"]:
-            continue
-        upsert_txn(cur, row)
-        count += 1
+    for batch in flatten_txns(txns, workers=workers):
+        for row in batch:
+            if not row["transaction_id"]:
+                continue
+            upsert_txn(cur, row)
+            count += 1
     conn.commit()
     conn.close()
     return count
@@ -213,7 +362,7 @@ def export_csv(db_path: str, out_csv: str) -> int:
     cur.execute("""
         SELECT
             transaction_id, initiation_time, updated_time, status, event_code,
-            amount_value, amount_currency, fee_value, fee_currency,
+            amount_minor, amount_currency, fee_minor, fee_currency,
             sender_name, payer_given_name, payer_surname, payer_email, payer_id, payer_country_code, payer_phone,
             invoice_id, cart_invoice_id, item_count, item_names, item_skus, description
         FROM transactions
@@ -222,9 +371,14 @@ def export_csv(db_path: str, out_csv: str) -> int:
     rows = cur.fetchall()
     conn.close()
 
+    # amount_value/fee_value are the exact decimal strings; *_minor the integers they came from
+    rows = [
+        (*r[:5], from_minor(r[5], r[6]), r[5], r[6], from_minor(r[7], r[8]), r[7], r[8], *r[9:])
+        for r in rows
+    ]
     headers = [
         "transaction_id","initiation_time","updated_time","status","event_code",
-        "amount_value","amount_currency","fee_value","fee_currency",
+        "amount_value","amount_minor","amount_currency","fee_value","fee_minor","fee_currency",
         "sender_name","payer_given_name","payer_surname","payer_email","payer_id","payer_country_code","payer_phone",
         "invoice_id","cart_invoice_id","item_count","item_names","item_skus","description"
     ]
@@ -234,3 +388,173 @@ def export_csv(db_path: str, out_csv: str) -> int:
         w.writerow(headers)
         w.writerows(rows)
     return len(rows)
+
+SNAPSHOT_COLUMNS = [
+    ("transaction_id", STR), ("initiation_time", STR), ("initiation_ts", INT64),
+    ("updated_time", STR), ("status", STR), ("event_code", STR),
+    ("amount_minor", INT64), ("amount_currency", STR), ("fee_minor", INT64), ("fee_currency", STR),
+    ("sender_name", STR), ("payer_email", STR), ("payer_id", STR), ("payer_country_code", STR),
+    ("invoice_id", STR), ("cart_invoice_id", STR), ("item_count", INT64), ("item_names", STR),
+    ("description", STR),
+]
+
+def _epoch_seconds(s: Optional[str]) -> Optional[int]:
+    """ISO-8601 (PayPal style, trailing Z) -> epoch seconds; parsed once at snapshot time."""
+    if not s:
+        return None
+    try:
+        d = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=timezone.utc)
+    return int(d.timestamp())
+
+def export_snapshot(db_path: str, out_path: str) -> int:
+    """
+    Columnar sibling of export_csv: typed fixed-width columns + a string dictionary,
+    readable via snapshot.open_snapshot() without text parsing.
+    """
+    names = [c for c, _ in SNAPSHOT_COLUMNS if c != "initiation_ts"]
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        cur = conn.execute(f"""
+            SELECT {", ".join(names)}
+            FROM transactions
+            ORDER BY initiation_time DESC
+        """)
+
+        def _rows():
+            for r in cur:
+                row = dict(r)
+                row["initiation_ts"] = _epoch_seconds(row["initiation_time"])
+                yield row
+
+        return write_snapshot(out_path, SNAPSHOT_COLUMNS, _rows())
+    finally:
+        conn.close()
+
+# bm25 column weights, in FTS column order: description, item_names, sender_name, payer_email
+_FTS_WEIGHTS = (10.0, 6.0, 4.0, 1.0)
+
+def _fts_query(text: str) -> Optional[str]:
+    """
+    Turn free text into a safe FTS5 query: every word becomes a quoted prefix
+    term, all terms must match. FTS operators in user input are not interpreted.
+    """
+    terms = [t.replace('"', '""') for t in (text or "").split()]
+    terms = [t for t in terms if t.strip('"')]
+    if not terms:
+        return None
+    return " ".join(f'"{t}"*' for t in terms)
+
+def _time_bounds(since: Optional[datetime], until: Optional[datetime]) -> Tuple[str, List[str]]:
+    """SQL for since <= t.initiation_time < until, either side optional."""
+    sql, params = "", []
+    for op, dt in ((">=", since), ("<", until)):
+        if dt is not None:
+            sql += f" AND t.initiation_time {op} ?"
+            params.append(dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S"))
+    return sql, params
+
+def search_conn(conn: sqlite3.Connection, match: str, limit: int, offset: int,
+                since: Optional[datetime] = None, until: Optional[datetime] = None) -> Tuple[int, List[Dict]]:
+    """search_transactions on an open connection; `match` comes from _fts_query."""
+    conn.row_factory = sqlite3.Row
+    bounds, bound_params = _time_bounds(since, until)
+    total = conn.execute(f"""
+        SELECT count(*) FROM transactions_fts
+        JOIN transactions t ON t.rowid = transactions_fts.rowid
+        WHERE transactions_fts MATCH ?{bounds}
+    """, (match, *bound_params)).fetchone()[0]
+    cur = conn.execute(f"""
+        SELECT
+            t.transaction_id, t.initiation_time, t.status,
+            t.amount_minor, t.amount_currency,
+            t.sender_name, t.payer_email, t.invoice_id, t.item_names, t.description,
+            snippet(transactions_fts, -1, '[', ']', '…', 10) AS snippet,
+            bm25(transactions_fts, {", ".join(map(str, _FTS_WEIGHTS))}) AS score
+        FROM transactions_fts
+        JOIN transactions t ON t.rowid = transactions_fts.rowid
+        WHERE transactions_fts MATCH ?{bounds}
+        ORDER BY score
+        LIMIT ? OFFSET ?
+    """, (match, *bound_params, limit, offset))
+    items = [dict(r) for r in cur]
+    for it in items:
+        it["amount_value"] = from_minor(it["amount_minor"], it["amount_currency"])
+    return total, items
+
+@traced("sqlite.fts_search", kind="client")
+def search_transactions(
+    query: str,
+    db_path: str = DB_PATH_DEFAULT,
+    limit: int = 20,
+    offset: int = 0,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Tuple[int, List[Dict]]:
+    """
+    Ranked full-text search over description / item names / sender / payer email
+    in one DB (by default the last-90-days one; see partitions.search_history
+    for older months), optionally limited to since <= initiation_time < until.
+    Returns (total_matches, rows for this page); best match first.
+    """
+    match = _fts_query(query)
+    if not match or not os.path.exists(db_path):
+        return 0, []
+    conn = sqlite3.connect(db_path)
+    try:
+        return search_conn(conn, match, limit, offset, since, until)
+    finally:
+        conn.close()
+
+ROLLUP_GROUP_COLUMNS = ("payer", "currency", "status")
+
+def query_rollups_conn(
+    conn: sqlite3.Connection,
+    granularity: str = "monthly",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    group_by: Iterable[str] = ROLLUP_GROUP_COLUMNS,
+    payer: Optional[str] = None,
+    currency: Optional[str] = None,
+    status: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Totals per period from the rollup table, re-grouped by any subset of
+    payer/status. Always grouped by currency too, since minor units of different
+    currencies can't be summed. start/end are inclusive period strings
+    ("2025-09" monthly, "2025-09-14" daily). Never scans `transactions`.
+    """
+    table, _ = ROLLUP_GRANULARITIES[granularity]
+    cols = [c for c in ROLLUP_GROUP_COLUMNS if c in set(group_by) or c == "currency"]
+    where, params = [], []
+    for col, op, val in (("period", ">=", start), ("period", "<=", end),
+                         ("payer", "=", payer), ("currency", "=", currency), ("status", "=", status)):
+        if val is not None:
+            where.append(f"{col} {op} ?")
+            params.append(val)
+    select_cols = ", ".join(["period", *cols])
+    cur = conn.execute(f"""
+        SELECT {select_cols},
+               SUM(txn_count) AS txn_count, SUM(income_minor) AS income_minor,
+               SUM(spend_minor) AS spend_minor, SUM(fee_minor) AS fee_minor
+        FROM {table}
+        {"WHERE " + " AND ".join(where) if where else ""}
+        GROUP BY {select_cols}
+        ORDER BY period DESC
+    """, params)
+    names = [d[0] for d in cur.description]
+    return [dict(zip(names, r)) for r in cur]
+
+@traced("sqlite.rollups", kind="client")
+def query_rollups(db_path: str = DB_PATH_DEFAULT, **kwargs) -> List[Dict]:
+    if not os.path.exists(db_path):
+        return []
+    conn = sqlite3.connect(db_path)
+    try:
+        return query_rollups_conn(conn, **kwargs)
+    finally:
+        conn.close()
@@ -4,7 +4,9 @@ from datetime import datetime, timedelta, timezone
 import requests
 from .config import paypal_base_url
 from .auth import fetch_paypal_token
-from .storage import ingest_to_sqlite, export_csv, DB_PATH_DEFAULT
+from .storage import ingest_to_sqlite, export_csv, export_snapshot, DB_PATH_DEFAULT
+from .partitions import archive_from_db, maintain, PARTITION_ROOT_DEFAULT
+from ..core.metrics import upstream
 
 log = logging.getLogger("paypalx.transactions")
 
@@ -46,8 +48,9 @@ def _request_transactions_page(
         "balance_affecting_records_only": "Y" if balance_affecting_only else "N",
     }
     base_url = paypal_base_url()
-    resp = requests.get(f"{base_url}/v1/reporting/transactions",
-                        headers=headers, params=params, timeout=40)
+    with upstream("paypal", "reporting_transactions"):
+        resp = requests.get(f"{base_url}/v1/reporting/transactions",
+                            headers=headers, params=params, timeout=40)
     if resp.status_code >= 400:
         try:
             log.error("Transactions API %s: %s", resp.status_code, resp.json())
@@ -106,6 +109,7 @@ def print_transaction_summary(txn: Dict) -> None:
 
 
 OUTPUT_CSV = "out/txns_last90d.csv"
+OUTPUT_SNAPSHOT = "out/txns_last90d.ppxcol"
 
 
 def save_transactions(token):
@@ -134,4 +138,14 @@ def save_transactions(token):
     exported = export_csv(DB_PATH_DEFAULT, OUTPUT_CSV)
     log.info("Exported %d rows to %s", exported, OUTPUT_CSV)
 
+    snap_rows = export_snapshot(DB_PATH_DEFAULT, OUTPUT_SNAPSHOT)
+    log.info("Wrote columnar snapshot (%d rows) to %s", snap_rows, OUTPUT_SNAPSHOT)
+
+    # Keep long-term history: fold this window into the monthly partitions,
+    # then seal closed months and apply retention
+    archived = archive_from_db(DB_PATH_DEFAULT, PARTITION_ROOT_DEFAULT)
+    log.info("Archived %d rows into %d partitions under %s",
+             sum(archived.values()), len(archived), PARTITION_ROOT_DEFAULT)
+    maintain(PARTITION_ROOT_DEFAULT)
+
     print(f"Done. CSV at: {OUTPUT_CSV}")
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Startup-time report for the FastAPI app, with a regression check.
+
+Each run imports techfest.backend.main in a fresh interpreter under
+`python -X importtime`, then runs the lifespan startup. It reports import and
+startup wall time, the slowest modules by cumulative import time, and which of
+the lazily loaded subsystems were imported eagerly anyway.
+
+    python -m techfest.backend.startup_report
+    python -m techfest.backend.startup_report --runs 5 --budget-ms 1200 --json report.json
+
+Exits 1 when the median total exceeds the budget or a lazy module shows up at
+import time, so it can run in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+# Must not be imported until first use (see speech_to_text, text_to_speech, main.get_paypal_service)
+LAZY_MODULES = ("openai", "gtts", "imageio_ffmpeg", "techfest.backend.core.paypal_service")
+
+_CHILD = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import techfest.backend.main as m
+t1 = time.perf_counter()
+
+async def _startup():
+    started = time.perf_counter()
+    async with m.lifespan(m.app):
+        return time.perf_counter() - started
+
+startup = asyncio.run(_startup())
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "startup_ms": startup * 1000,
+    "lazy_loaded": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def _parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    # "import time:       self [us] |  cumulative | imported package"
+    out = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            _, rest = line.split(":", 1)
+            self_us, cum_us, name = rest.split("|", 2)
+            out.append({
+                "module": name.strip(),
+                "top_level": not name[1:].startswith(" "),  # nested imports are indented
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cum_us) / 1000,
+            })
+        except ValueError:
+            continue
+    return out
+
+
+def measure_once(lazy_modules=LAZY_MODULES) -> Dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD % (tuple(lazy_modules),)],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"app startup failed:\n{proc.stderr[-4000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["modules"] = _parse_importtime(proc.stderr)
+    result["total_ms"] = result["import_ms"] + result["startup_ms"]
+    return result
+
+
+def build_report(runs: int, budget_ms: float, top: int) -> Dict[str, Any]:
+    samples = [measure_once() for _ in range(runs)]
+    median = {k: statistics.median(s[k] for s in samples) for k in ("import_ms", "startup_ms", "total_ms")}
+    # module timings of the median run; top-level entries only (nested ones are counted in their parent)
+    mid = sorted(samples, key=lambda s: s["total_ms"])[len(samples) // 2]
+    top_modules = sorted((m for m in mid["modules"] if m["top_level"]),
+                         key=lambda m: m["cumulative_ms"], reverse=True)[:top]
+    lazy_loaded = sorted({name for s in samples for name in s["lazy_loaded"]})
+    return {
+        "runs": runs,
+        "budget_ms": budget_ms,
+        **{k: round(v, 1) for k, v in median.items()},
+        "samples_total_ms": [round(s["total_ms"], 1) for s in samples],
+        "top_modules": top_modules,
+        "lazy_loaded_eagerly": lazy_loaded,
+        "ok": median["total_ms"] <= budget_ms and not lazy_loaded,
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Measure app import + lifespan startup time")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    ap.add_argument("--top", type=int, default=15, help="slowest top-level imports to list")
+    ap.add_argument("--json", dest="json_path", help="also write the report here")
+    args = ap.parse_args(argv)
+
+    report = build_report(args.runs, args.budget_ms, args.top)
+    print(f"import  {report['import_ms']:8.1f} ms")
+    print(f"startup {report['startup_ms']:8.1f} ms")
+    print(f"total   {report['total_ms']:8.1f} ms  (budget {report['budget_ms']:.0f} ms, median of {report['runs']})")
+    print("\nslowest imports (cumulative):")
+    for m in report["top_modules"]:
+        print(f"  {m['cumulative_ms']:8.1f} ms  {m['module']}")
+    if report["lazy_loaded_eagerly"]:
+        print("\nimported at startup but should be lazy:", ", ".join(report["lazy_loaded_eagerly"]))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    if report["ok"]:
+        print("\nOK")
+    elif report["total_ms"] > report["budget_ms"]:
+        print("\nFAIL: startup budget exceeded")
+    else:
+        print("\nFAIL: lazy subsystems imported at startup")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Everything under test runs against throwaway SQLite files; set before any
+# techfest module reads its environment at import.
+_tmp = tempfile.mkdtemp(prefix="techfest-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/techfest.db")
+os.environ.setdefault("DB_ENGINE_MODE", "wal")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+
+import pytest  # noqa: E402
+
+ROW_COLUMNS = (
+    "transaction_id", "initiation_time", "updated_time", "status", "event_code",
+    "amount_minor", "amount_currency", "fee_minor", "fee_currency",
+    "sender_name", "payer_given_name", "payer_surname", "payer_email", "payer_id", "payer_country_code", "payer_phone",
+    "invoice_id", "cart_invoice_id", "item_count", "item_names", "item_skus", "item_json", "description",
+    "raw_json",
+)
+
+
+@pytest.fixture
+def make_row():
+    """Flattened transaction row (the shape upsert_txn takes) with sensible defaults."""
+    def make(transaction_id, initiation_time, amount_minor=1000, currency="USD", **fields):
+        row = dict.fromkeys(ROW_COLUMNS)
+        row.update(transaction_id=transaction_id, initiation_time=initiation_time, status="S",
+                   amount_minor=amount_minor, amount_currency=currency, fee_minor=0, fee_currency=currency,
+                   payer_email="payer@example.com", raw_json="{}")
+        row.update(fields)
+        return row
+    return make
+
+
+@pytest.fixture
+def make_txn():
+    """Raw Transaction Search API record, as the ingest path receives it."""
+    def make(transaction_id, initiation_time, value="10.00", currency="USD", status="S",
+             email="payer@example.com", item=None, subject=None):
+        txn = {
+            "transaction_info": {
+                "transaction_id": transaction_id,
+                "transaction_initiation_date": initiation_time,
+                "transaction_status": status,
+                "transaction_amount": {"currency_code": currency, "value": value},
+                "fee_amount": {"currency_code": currency, "value": "0.00"},
+            },
+            "payer_info": {"email_address": email, "payer_name": {"given_name": "Pat", "surname": "Payer"}},
+        }
+        if subject:
+            txn["transaction_info"]["transaction_subject"] = subject
+        if item:
+            txn["cart_info"] = {"item_details": [{"item_name": item, "item_quantity": "1"}]}
+        return txn
+    return make
@@ -0,0 +1,51 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from techfest.backend.core import chat_sessions
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    chat_sessions._sessions.clear()
+    chat_sessions._by_owner.clear()
+    yield
+    chat_sessions._sessions.clear()
+    chat_sessions._by_owner.clear()
+
+
+def test_sessions_are_private_to_their_owner():
+    s = chat_sessions.create("alice")
+    assert chat_sessions.get(s.id, "alice") is s
+    assert chat_sessions.get(s.id, "bob") is None
+    assert not chat_sessions.delete(s.id, "bob")
+    assert chat_sessions.delete(s.id, "alice")
+    assert chat_sessions.get(s.id, "alice") is None
+
+
+def test_per_user_cap_only_evicts_that_users_sessions(monkeypatch):
+    monkeypatch.setattr(chat_sessions, "CHAT_MAX_SESSIONS_PER_USER", 2)
+    bob = chat_sessions.create("bob")
+    alice = [chat_sessions.create("alice") for _ in range(2)]
+    chat_sessions.get(alice[0].id, "alice")  # alice[1] is now her least recently used
+    chat_sessions.create("alice")
+    assert chat_sessions.get(alice[1].id, "alice") is None
+    assert chat_sessions.get(alice[0].id, "alice") is alice[0]
+    assert chat_sessions.get(bob.id, "bob") is bob
+    assert chat_sessions.stats()["sessions"] == 3
+
+
+def test_failed_opening_turn_leaves_no_session(monkeypatch):
+    from techfest.backend import main
+
+    class Failing:
+        async def achat_turn(self, *args):
+            raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(main, "get_paypal_service", lambda: Failing())
+    main.app.dependency_overrides[main.require_active_token] = lambda: {"sub": "alice"}
+    try:
+        r = TestClient(main.app).post("/chat/session", json={"message": "hi"})
+    finally:
+        main.app.dependency_overrides.clear()
+    assert r.status_code == 502
+    assert chat_sessions.stats()["sessions"] == 0
@@ -0,0 +1,44 @@
+import pytest
+
+from techfest.backend.paypal_transactions import storage
+from techfest.backend.paypal_transactions.money import from_minor, to_minor
+
+
+@pytest.mark.parametrize("value, currency, minor", [
+    ("12.34", "USD", 1234),
+    ("0.1", "USD", 10),
+    ("-5.00", "EUR", -500),
+    ("500", "JPY", 500),
+    ("1.234", "KWD", 1234),
+    ("0.005", "USD", 1),      # half up, not banker's rounding
+    ("19.99", None, 1999),    # unknown currency -> 2 decimals
+])
+def test_to_minor_and_back(value, currency, minor):
+    assert to_minor(value, currency) == minor
+    assert to_minor(from_minor(minor, currency), currency) == minor
+
+
+def test_no_float_drift():
+    assert sum(to_minor("0.10", "USD") for _ in range(10)) == to_minor("1.00", "USD")
+    assert from_minor(30, "USD") == "0.30"
+
+
+@pytest.mark.parametrize("value", [None, "", "abc", "NaN", "Infinity"])
+def test_unparseable_is_none(value):
+    assert to_minor(value, "USD") is None
+
+
+def test_flatten_stores_minor_units(make_txn):
+    (row,), = storage.flatten_txns([make_txn("a", "2025-09-01T10:00:00+0000", "1999.99", "USD")], workers=1)
+    assert (row["amount_minor"], row["fee_minor"]) == (199999, 0)
+
+
+def test_rollups_always_group_by_currency(tmp_path, make_row):
+    conn = storage.init_db(str(tmp_path / "txns.db"))
+    for row in (make_row("a", "2025-09-01T10:00:00+0000", 1000),
+                make_row("b", "2025-09-02T10:00:00+0000", 500, currency="JPY")):
+        storage.upsert_txn(conn.cursor(), row)
+    conn.commit()
+    items = storage.query_rollups_conn(conn, group_by=["status"])
+    conn.close()
+    assert sorted((i["currency"], i["income_minor"]) for i in items) == [("JPY", 500), ("USD", 1000)]
@@ -0,0 +1,70 @@
+import sqlite3
+import stat
+from datetime import datetime, timezone
+
+import pytest
+
+from techfest.backend.paypal_transactions import partitions
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "partitions")
+
+
+def _months(root):
+    return [m for m, _, _ in partitions.list_partitions(root)]
+
+
+def test_ingest_routes_rows_to_month_files(root, make_txn):
+    written = partitions.ingest_partitioned([
+        make_txn("a", "2025-01-31T23:59:59+0000"),
+        make_txn("b", "2025-02-01T00:00:00+0000"),
+        make_txn("c", "2025-02-14T10:00:00+0000"),
+        make_txn("d", None),
+    ], root, workers=1)
+    assert written == {"2025_01": 1, "2025_02": 2}
+    rows = list(partitions.iter_range(datetime(2025, 1, 1, tzinfo=timezone.utc),
+                                      datetime(2025, 3, 1, tzinfo=timezone.utc), "transaction_id", root))
+    assert [r["transaction_id"] for r in rows] == ["c", "b", "a"]
+
+
+def test_sealed_month_is_read_only_and_skipped(root, make_txn):
+    partitions.ingest_partitioned([make_txn("a", "2025-01-10T00:00:00+0000")], root, workers=1)
+    sealed = partitions.seal_closed_months(root, now=datetime(2025, 3, 1, tzinfo=timezone.utc))
+    assert sealed == ["2025_01"]
+    (_, path, is_sealed), = partitions.list_partitions(root)
+    assert is_sealed and not partitions.os.stat(path).st_mode & stat.S_IWUSR
+    assert partitions.ingest_partitioned([make_txn("b", "2025-01-11T00:00:00+0000")], root, workers=1) == {}
+
+
+def test_retention_reads_env_per_call(root, make_txn, monkeypatch):
+    partitions.ingest_partitioned([make_txn(f"t{m}", f"2025-{m:02d}-10T00:00:00+0000") for m in (1, 2, 3)],
+                                  root, workers=1)
+    now = datetime(2025, 4, 15, tzinfo=timezone.utc)
+    monkeypatch.setenv("PAYPAL_RETENTION_MONTHS", "not-a-number")
+    assert partitions.apply_retention(root, now=now) == []  # falls back to the default, 36
+    monkeypatch.setenv("PAYPAL_RETENTION_MONTHS", "2")
+    assert partitions.apply_retention(root, now=now) == ["2025_01"]
+    assert _months(root) == ["2025_02", "2025_03"]
+
+
+def test_outdated_partition_is_rejected_then_rebuilt(root, make_txn):
+    partitions.ingest_partitioned([make_txn("a", "2025-01-10T00:00:00+0000"),
+                                   make_txn("b", "2025-01-11T00:00:00+0000")], root, workers=1)
+    (_, path, _), = partitions.list_partitions(root)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version = 0")  # written before schema versioning
+    conn.commit()
+    conn.close()
+
+    span = (datetime(2025, 1, 1, tzinfo=timezone.utc), datetime(2025, 2, 1, tzinfo=timezone.utc))
+    with pytest.raises(partitions.PartitionSchemaError, match="migrate"):
+        list(partitions.iter_range(*span, root=root))
+
+    assert partitions.maintain(root)["migrated"] == ["2025_01"]
+    rows = list(partitions.iter_range(*span, "transaction_id", root))
+    assert [r["transaction_id"] for r in rows] == ["b", "a"]
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == partitions.PARTITION_SCHEMA_VERSION
+    conn.close()
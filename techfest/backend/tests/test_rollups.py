@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+from functools import partial
+
+import pytest
+from fastapi.testclient import TestClient
+
+from techfest.backend.paypal_transactions import partitions, storage
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = storage.init_db(str(tmp_path / "txns.db"))
+    yield conn
+    conn.close()
+
+
+def _upsert(conn, *rows):
+    for row in rows:
+        storage.upsert_txn(conn.cursor(), row)
+    conn.commit()
+
+
+def _rollup(conn, table="rollup_monthly"):
+    return {r[:4]: r[4:] for r in conn.execute(f"SELECT * FROM {table}")}
+
+
+def _recomputed(conn, width=7):
+    """What the rollup table must hold: the same totals straight from `transactions`."""
+    return {r[:4]: r[4:] for r in conn.execute(f"""
+        SELECT substr(initiation_time, 1, {width}), COALESCE(payer_email, sender_name, ''),
+               COALESCE(amount_currency, ''), COALESCE(status, ''), count(*),
+               SUM(MAX(amount_minor, 0)), SUM(MAX(-amount_minor, 0)), SUM(fee_minor)
+        FROM transactions GROUP BY 1, 2, 3, 4
+    """)}
+
+
+def test_triggers_track_insert_update_delete(conn, make_row):
+    _upsert(conn,
+            make_row("a", "2025-09-01T10:00:00+0000", 1000, fee_minor=30),
+            make_row("b", "2025-09-20T10:00:00+0000", -250),
+            make_row("c", "2025-10-02T10:00:00+0000", 500, currency="JPY"))
+    assert _rollup(conn) == _recomputed(conn)
+    assert _rollup(conn)[("2025-09", "payer@example.com", "USD", "S")] == (2, 1000, 250, 30)
+
+    # status change moves the row to another key; amount change is re-applied
+    _upsert(conn, make_row("a", "2025-09-01T10:00:00+0000", 1200, status="REFUNDED"))
+    assert _rollup(conn) == _recomputed(conn)
+    assert _rollup(conn, "rollup_daily") == _recomputed(conn, 10)
+
+    conn.execute("DELETE FROM transactions WHERE transaction_id = 'b'")
+    conn.commit()
+    rollup = _rollup(conn)
+    assert rollup == _recomputed(conn)
+    assert ("2025-09", "payer@example.com", "USD", "S") not in rollup  # emptied key is removed
+    assert ("2025-10", "payer@example.com", "JPY", "S") in rollup       # other keys untouched
+
+
+def test_history_daily_aggregates_cover_the_current_month(tmp_path, make_row, monkeypatch):
+    from techfest.backend import main
+
+    now = datetime.now(timezone.utc)
+    days = sorted({now.strftime("%Y-%m-01"), now.strftime("%Y-%m-%d")})
+    root = str(tmp_path / "partitions")
+    partitions.ingest_rows([make_row(f"t{i}", f"{d}T00:30:00+0000", 100) for i, d in enumerate(days)], root)
+
+    monkeypatch.setattr(main, "query_rollups_range", partial(partitions.query_rollups_range, root=root))
+    main.app.dependency_overrides[main.require_active_token] = lambda: {"sub": "a@example.com"}
+    try:
+        r = TestClient(main.app).get("/aggregates", params={"source": "history", "granularity": "daily"})
+    finally:
+        main.app.dependency_overrides.clear()
+    assert r.status_code == 200, r.text
+    # the first of the month and today are both there, not just day 1
+    assert sorted(i["period"] for i in r.json()["items"]) == days
+    assert {i["income"] for i in r.json()["items"]} == {"1.00"}
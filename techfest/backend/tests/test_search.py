@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+
+from techfest.backend.paypal_transactions import partitions, storage
+
+
+def _ingest(db_path, txns):
+    conn = storage.init_db(db_path)
+    for batch in storage.flatten_txns(txns, workers=1):
+        for row in batch:
+            storage.upsert_txn(conn.cursor(), row)
+    conn.commit()
+    return conn
+
+
+def test_fts_follows_inserts_updates_and_deletes(tmp_path, make_txn):
+    db = str(tmp_path / "txns.db")
+    conn = _ingest(db, [make_txn("a", "2025-09-01T10:00:00+0000", item="Espresso beans"),
+                        make_txn("b", "2025-09-02T10:00:00+0000", item="Green tea")])
+    total, items = storage.search_transactions("espres", db_path=db)
+    assert total == 1 and items[0]["transaction_id"] == "a" and items[0]["amount_value"] == "10.00"
+
+    conn.execute("UPDATE transactions SET item_names = 'Decaf espresso', description = NULL WHERE transaction_id = 'b'")
+    conn.execute("DELETE FROM transactions WHERE transaction_id = 'a'")
+    conn.commit()
+    conn.close()
+    assert [i["transaction_id"] for i in storage.search_transactions("espresso", db_path=db)[1]] == ["b"]
+    assert storage.search_transactions("tea", db_path=db) == (0, [])
+
+
+def test_search_history_only_opens_partitions_in_range(tmp_path, make_txn, monkeypatch):
+    root = str(tmp_path / "partitions")
+    partitions.ingest_partitioned([make_txn(f"t{m}", f"2025-{m:02d}-15T10:00:00+0000", item="Coffee")
+                                   for m in range(1, 7)], root, workers=1)
+    assert partitions.search_history("coffee", root=root)[0] == 6
+
+    opened = []
+    connect = partitions._connect_ro
+    monkeypatch.setattr(partitions, "_connect_ro", lambda path: opened.append(path) or connect(path))
+    total, items = partitions.search_history("coffee", root=root,
+                                             since=datetime(2025, 3, 1, tzinfo=timezone.utc),
+                                             until=datetime(2025, 4, 20, tzinfo=timezone.utc))
+    assert total == 2 and sorted(i["transaction_id"] for i in items) == ["t3", "t4"]
+    assert sorted(p[-10:] for p in opened) == ["2025_03.db", "2025_04.db"]
+
+    # bounds inside a month filter rows too, not just partitions
+    total, _ = partitions.search_history("coffee", root=root,
+                                         since=datetime(2025, 5, 16, tzinfo=timezone.utc))
+    assert total == 1
+
+
+def test_search_history_pages_across_partitions(tmp_path, make_txn):
+    root = str(tmp_path / "partitions")
+    partitions.ingest_partitioned([make_txn(f"t{m}", f"2025-{m:02d}-15T10:00:00+0000", item="Coffee")
+                                   for m in range(1, 6)], root, workers=1)
+    pages = [partitions.search_history("coffee", limit=2, offset=o, root=root)[1] for o in (0, 2, 4)]
+    ids = [i["transaction_id"] for page in pages for i in page]
+    assert sorted(ids) == ["t1", "t2", "t3", "t4", "t5"] and [len(p) for p in pages] == [2, 2, 1]
@@ -0,0 +1,64 @@
+import os
+import types
+
+import pytest
+
+from techfest.backend.paypal_transactions.snapshot import (
+    FLOAT64, INT64, STR, open_snapshot, write_snapshot,
+)
+
+SCHEMA = [("id", STR), ("amount", INT64), ("rate", FLOAT64), ("note", STR)]
+ROWS = [
+    {"id": "a", "amount": 1250, "rate": 0.5, "note": "café ☕"},
+    {"id": "b", "amount": None, "rate": None, "note": None},
+    {"id": "c", "amount": "-7", "rate": "1e3", "note": "a"},  # strings are coerced; "a" reuses a code
+]
+
+
+def _open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+@pytest.fixture
+def snap_path(tmp_path):
+    path = str(tmp_path / "txns.ppxcol")
+    assert write_snapshot(path, SCHEMA, ROWS) == 3
+    return path
+
+
+def test_round_trip(snap_path):
+    with open_snapshot(snap_path) as snap:
+        assert snap.columns == ["id", "amount", "rate", "note"]
+        assert snap.values("amount") == [1250, None, -7]
+        assert snap.values("rate") == [0.5, None, 1000.0]
+        assert list(snap.rows()) == [
+            {"id": "a", "amount": 1250, "rate": 0.5, "note": "café ☕"},
+            {"id": "b", "amount": None, "rate": None, "note": None},
+            {"id": "c", "amount": -7, "rate": 1000.0, "note": "a"},
+        ]
+
+
+def test_rows_are_lazy_and_projected(snap_path):
+    with open_snapshot(snap_path) as snap:
+        rows = snap.rows(["note", "missing", "id"])
+        assert isinstance(rows, types.GeneratorType)
+        assert next(rows) == {"note": "café ☕", "id": "a"}
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / "empty.ppxcol")
+    assert write_snapshot(path, SCHEMA, []) == 0
+    with open_snapshot(path) as snap:
+        assert snap.rows_count == 0 and list(snap.rows()) == []
+
+
+@pytest.mark.parametrize("damage", ["empty", "truncated", "bad_magic"])
+def test_corrupt_file_raises_and_releases_it(snap_path, damage):
+    data = open(snap_path, "rb").read()
+    data = {"empty": b"", "truncated": data[:40], "bad_magic": b"NOTASNAP" + data[8:]}[damage]
+    with open(snap_path, "wb") as f:
+        f.write(data)
+    before = _open_fds()
+    with pytest.raises(ValueError, match="Not a snapshot file"):
+        open_snapshot(snap_path)
+    assert _open_fds() == before
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwt
+
+from techfest.backend.auth import denylist, jwt_auth, keys
+from techfest.backend.db import database, models
+
+
+@pytest.fixture
+def issuer(tmp_path, monkeypatch):
+    pem = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    path = tmp_path / "jwt.pem"
+    path.write_bytes(pem)
+    monkeypatch.setattr(keys, "JWT_PRIVATE_KEY_PATH", str(path))
+    ks = keys.KeySet()
+    ks.signer()  # load the key now, before other fixtures change the environment
+    return ks
+
+
+@pytest.fixture
+def verifier(issuer, monkeypatch):
+    """A node that only knows the issuer's keys through JWKS_URL."""
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return issuer.public_jwks()
+
+    fetches = []
+    monkeypatch.setattr(keys, "JWKS_URL", "http://issuer/.well-known/jwks.json")
+    monkeypatch.setattr(keys.httpx, "get", lambda url, timeout: fetches.append(url) or Response())
+    monkeypatch.setattr(keys, "JWT_PRIVATE_KEY_PATH", None)
+    ks = keys.KeySet()
+    ks.fetches = fetches
+    return ks
+
+
+def _token(issuer: keys.KeySet, **claims) -> str:
+    private_key, kid = issuer.signer()
+    now = datetime.now(timezone.utc)
+    payload = {"sub": "a@example.com", "jti": "j1", "iat": now, "exp": now + timedelta(minutes=5), **claims}
+    return jwt.encode(payload, private_key, algorithm=keys.STATELESS_ALGORITHM, headers={"kid": kid})
+
+
+def test_verifier_accepts_issuer_token_after_refresh(issuer, verifier, monkeypatch):
+    monkeypatch.setattr(jwt_auth, "STATELESS", True)
+    monkeypatch.setattr(jwt_auth, "key_set", verifier)
+    assert verifier.refresh_due()
+    verifier.refresh_remote()
+    assert not verifier.refresh_due()
+    assert jwt_auth.decode_token(_token(issuer))["sub"] == "a@example.com"
+
+
+def test_unknown_kid_only_schedules_a_refresh(issuer, verifier, monkeypatch):
+    monkeypatch.setattr(jwt_auth, "STATELESS", True)
+    monkeypatch.setattr(jwt_auth, "key_set", verifier)
+    verifier.refresh_remote()
+    fetched = len(verifier.fetches)
+    forged = jwt.encode({"sub": "x", "jti": "j2"}, issuer.signer()[0], algorithm=keys.STATELESS_ALGORITHM,
+                        headers={"kid": "forged"})
+    with pytest.raises(HTTPException) as e:
+        jwt_auth.decode_token(forged)
+    assert e.value.status_code == 401
+    assert len(verifier.fetches) == fetched  # no HTTP on the request path
+    assert verifier.refresh_due()
+
+
+@pytest.fixture
+def tokens_db():
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    yield db
+    db.close()
+    with database.engine.begin() as conn:
+        conn.execute(models.Token.__table__.delete())
+
+
+def _revoke(db, jti, revoked_at, expires_in=timedelta(hours=1)):
+    now = datetime.now(timezone.utc)
+    db.add(models.Token(jti=jti, subject="a@example.com", issued_at=now, expires_at=now + expires_in,
+                        revoked=True, revoked_at=revoked_at))
+
+
+def test_revoked_since_pages_through_a_shared_timestamp(tokens_db):
+    burst = datetime.now(timezone.utc) - timedelta(minutes=1)
+    for i in range(5):
+        _revoke(tokens_db, f"j{i}", burst)
+    _revoke(tokens_db, "later", burst + timedelta(seconds=1))
+    _revoke(tokens_db, "expired", burst, expires_in=timedelta(seconds=-1))
+    tokens_db.commit()
+
+    cursor, seen = None, []
+    for _ in range(10):
+        page = denylist.revoked_since(tokens_db, cursor, limit=2)
+        seen += [e["jti"] for e in page["entries"]]
+        cursor = page["cursor"]
+        if page["complete"]:
+            break
+    assert seen == ["j0", "j1", "j2", "j3", "j4", "later"]
+    assert denylist.revoked_since(tokens_db, cursor)["entries"] == []
+    # a bare timestamp cursor still includes every jti at that timestamp
+    assert len(denylist.revoked_since(tokens_db, burst.isoformat())["entries"]) == 6
+
+
+def test_deny_list_apply_and_prune():
+    dl = denylist.DenyList()
+    past = int(datetime.now(timezone.utc).timestamp()) - 1
+    dl.apply({"entries": [{"jti": "a", "exp": past + 3600}, {"jti": "b", "exp": past}], "cursor": "c1"})
+    assert dl.is_denied("a") and dl.is_denied("b") and dl.cursor == "c1"
+    dl.prune()
+    assert dl.is_denied("a") and not dl.is_denied("b")
+
+
+def test_denylist_endpoint_needs_node_token(monkeypatch):
+    monkeypatch.setattr(denylist, "DENYLIST_TOKEN", "s3cret")
+    denylist.require_node_token("Bearer s3cret")
+    for header in (None, "Bearer wrong", "s3cret"):
+        with pytest.raises(HTTPException) as e:
+            denylist.require_node_token(header)
+        assert e.value.status_code == 403
+    monkeypatch.setattr(denylist, "DENYLIST_TOKEN", None)
+    with pytest.raises(HTTPException):
+        denylist.require_node_token("Bearer ")
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from techfest.backend.auth import jwt_auth
+from techfest.backend.db import database, models
+
+
+def _exp():
+    return datetime.now(timezone.utc) + timedelta(hours=1)
+
+
+def test_active_entries_expire_revoked_ones_stay():
+    cache = jwt_auth.TokenStatusCache(max_entries=10, ttl_seconds=0)
+    cache.put("active", _exp(), False)
+    cache.put("revoked", _exp(), True)
+    assert cache.get("active") is None
+    assert cache.get("revoked")[1] is True
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lru_bound():
+    cache = jwt_auth.TokenStatusCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", _exp(), False)
+    cache.put("b", _exp(), False)
+    cache.get("a")
+    cache.put("c", _exp(), False)
+    assert cache.get("b") is None and cache.get("a") and cache.get("c")
+
+
+def test_epoch_change_drops_everything():
+    cache = jwt_auth.TokenStatusCache(max_entries=10, ttl_seconds=60)
+    cache.observe_epoch(3)
+    cache.put("a", _exp(), False)
+    cache.observe_epoch(3)
+    assert cache.get("a") is not None
+    cache.observe_epoch(4)
+    assert cache.get("a") is None
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    models.Base.metadata.create_all(bind=database.engine)
+    cache = jwt_auth.TokenStatusCache(max_entries=100, ttl_seconds=60)
+    monkeypatch.setattr(jwt_auth, "token_status_cache", cache)
+    return cache
+
+
+def test_revocation_by_another_worker_lands_on_the_next_epoch_check(fresh_cache):
+    def revoke_elsewhere(jti):
+        # what revoke_current_token does on another worker, minus its local cache update
+        def fn(db):
+            token = db.get(models.Token, jti)
+            token.revoked, token.revoked_at = True, datetime.now(timezone.utc)
+            jwt_auth._bump_revocation_epoch(db)
+        return database.arun_write(fn)
+
+    async def check(token):
+        async with database.AsyncSessionLocal() as db:
+            return await jwt_auth.require_active_token(token, db)
+
+    async def scenario():
+        try:
+            token = await jwt_auth.login_user("cache@example.com")
+            payload = await check(token)
+            assert fresh_cache.get(payload["jti"])[1] is False
+
+            await revoke_elsewhere(payload["jti"])
+            await check(token)  # still served from cache until the epoch is re-read
+
+            fresh_cache.epoch_checked_at = 0.0
+            with pytest.raises(HTTPException) as e:
+                await check(token)
+            assert e.value.status_code == 401
+        finally:
+            await database.async_engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_own_revocation_is_seen_immediately(fresh_cache):
+    async def scenario():
+        try:
+            token = await jwt_auth.login_user("self@example.com")
+            async with database.AsyncSessionLocal() as db:
+                payload = await jwt_auth.require_active_token(token, db)
+                await jwt_auth.revoke_current_token(payload)
+                with pytest.raises(HTTPException):
+                    await jwt_auth.require_active_token(token, db)
+        finally:
+            await database.async_engine.dispose()
+
+    asyncio.run(scenario())
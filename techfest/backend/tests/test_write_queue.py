@@ -0,0 +1,98 @@
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from techfest.backend.db import database, models
+
+
+@pytest.fixture(autouse=True)
+def schema():
+    assert database.WAL_MODE
+    models.Base.metadata.create_all(bind=database.engine)
+    with database.engine.begin() as conn:
+        conn.execute(models.Token.__table__.delete())
+        conn.execute(models.User.__table__.delete())
+
+
+def _committed_users() -> int:
+    # a separate raw connection only sees what has really been committed
+    conn = sqlite3.connect(database.write_engine.url.database)
+    try:
+        return conn.execute("SELECT count(*) FROM users").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _queue_behind_blocker(q: database.WriteQueue, fns, while_blocked=lambda: None):
+    """Submit fns while the writer is busy, so they all land in one batch."""
+    started, release = threading.Event(), threading.Event()
+
+    def blocker(session):
+        started.set()
+        release.wait(5)
+
+    first = q.submit(blocker)
+    assert started.wait(5)
+    futures = [q.submit(fn) for fn in fns]
+    while_blocked()
+    release.set()
+    first.result(5)
+    return futures
+
+
+def _add_user(i):
+    def fn(session):
+        session.add(models.User(email=f"user{i}@example.com"))
+        session.flush()
+        return _committed_users()
+    return fn
+
+
+def test_batch_shares_one_commit():
+    q = database.WriteQueue()
+    futures = _queue_behind_blocker(q, [_add_user(i) for i in range(5)])
+    # no op saw an earlier op of its batch committed
+    assert [f.result(5) for f in futures] == [0] * 5
+    assert _committed_users() == 5
+    assert q.stats["batches"] == 2 and q.stats["max_batch"] == 5
+
+
+def test_failed_op_is_rolled_back_alone():
+    def boom(session):
+        session.add(models.User(email="bad@example.com"))
+        session.flush()
+        raise ValueError("boom")
+
+    q = database.WriteQueue()
+    futures = _queue_behind_blocker(q, [_add_user(1), boom, _add_user(2)])
+    assert futures[0].result(5) == 0 and futures[2].result(5) == 0
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+    with Session(database.read_engine) as s:
+        emails = set(s.scalars(select(models.User.email)))
+    assert emails == {"user1@example.com", "user2@example.com"}
+
+
+def test_commit_failure_persists_nothing(monkeypatch):
+    class FailingCommit(Session):
+        def commit(self):
+            raise sqlite3.OperationalError("disk I/O error")
+
+    failing = sessionmaker(bind=database.write_engine, class_=FailingCommit, expire_on_commit=False)
+    q = database.WriteQueue()
+    futures = _queue_behind_blocker(q, [_add_user(i) for i in range(3)],
+                                    lambda: monkeypatch.setattr(database, "WriteSessionLocal", failing))
+    for f in futures:
+        with pytest.raises(sqlite3.OperationalError):
+            f.result(5)
+    assert _committed_users() == 0
+    assert q.stats["commit_errors"] == 1
+
+
+def test_run_write_returns_after_commit():
+    assert database.run_write(_add_user(9)) == 0
+    with Session(database.read_engine) as s:
+        assert s.scalar(select(func.count()).select_from(models.User)) == 1
@@ -1,12 +1,17 @@
 import os
 import subprocess
 import tempfile
+from functools import lru_cache
 
 from fastapi import UploadFile, HTTPException
-from openai import OpenAI
-from imageio_ffmpeg import get_ffmpeg_exe
 
-client = OpenAI()
+from techfest.backend.core.metrics import upstream
+
+@lru_cache(maxsize=1)
+def openai_client():
+    # openai is heavy to import; only workers that transcribe pay for it
+    from openai import OpenAI
+    return OpenAI()
 
 WAV_TYPES = {"audio/wav", "audio/x-wav", "audio/wave"}
 MP4_TYPES = {"video/mp4", "audio/mp4"}  # some browsers send audio/mp4
@@ -23,7 +28,11 @@ CONTENT_SUFFIX = {
     "video/webm": ".webm",
 }
 
-FFMPEG_BIN = get_ffmpeg_exe()
+@lru_cache(maxsize=1)
+def ffmpeg_bin() -> str:
+    """Resolved on first conversion, not at import."""
+    from imageio_ffmpeg import get_ffmpeg_exe
+    return get_ffmpeg_exe()
 
 async def save_upload_to_tmp(upload: UploadFile, *, suffix: str) -> str:
     """
@@ -52,28 +61,29 @@ async def save_upload_to_tmp(upload: UploadFile, *, suffix: str) -> str:
 
 def ffmpeg_to_wav(src_path: str, dst_wav: str, *, sr: int = 16000, stream_logs: bool = True) -> None:
     cmd = [
-        FFMPEG_BIN, "-y", "-hide_banner", "-nostdin",
+        ffmpeg_bin(), "-y", "-hide_banner", "-nostdin",
         "-i", src_path, "-vn", "-ac", "1", "-ar", str(sr), "-f", "wav", dst_wav,
     ]
 
-    if stream_logs:
-        proc = subprocess.Popen(cmd, stderr=subprocess.PIPE, text=True)
-        assert proc.stderr is not None
-        for line in proc.stderr:
-            line = line.strip()
-        rc = proc.wait()
-        if rc != 0:
-            raise HTTPException(status_code=500, detail=f"ffmpeg exited with code {rc}")
-    else:
-        subprocess.run(cmd, check=True)
+    with upstream("ffmpeg", "to_wav"):
+        if stream_logs:
+            proc = subprocess.Popen(cmd, stderr=subprocess.PIPE, text=True)
+            assert proc.stderr is not None
+            for line in proc.stderr:
+                line = line.strip()
+            rc = proc.wait()
+            if rc != 0:
+                raise HTTPException(status_code=500, detail=f"ffmpeg exited with code {rc}")
+        else:
+            subprocess.run(cmd, check=True)
 
 def transcribe_wav_file(local_wav_path: str) -> str:
     """
     Takes the path to a local .wav file and returns the transcription string.
     """
     try:
-        with open(local_wav_path, "rb") as f:
-            result = client.audio.transcriptions.create(
+        with open(local_wav_path, "rb") as f, upstream("openai", "whisper"):
+            result = openai_client().audio.transcriptions.create(
                 model="whisper-1",
                 file=f
             )
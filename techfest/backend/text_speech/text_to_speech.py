@@ -1,7 +1,8 @@
 import os
 import uuid
 from pathlib import Path
-from gtts import gTTS
+
+from techfest.backend.core.metrics import upstream
 
 
 AUDIO_DIR = Path(__file__).resolve().parent / "audio"
@@ -14,7 +15,10 @@ def text_to_mp3(text: str, filename: str | None = None) -> tuple[str, str]:
     name = filename or f"tts_{uuid.uuid4().hex}.mp3"
     path = AUDIO_DIR / name
 
-    tts = gTTS(text=text, lang="en")
-    tts.save(str(path))  # gTTS needs a str path
+    from gtts import gTTS  # imported on first use; keeps app startup light
+
+    with upstream("gtts", "synthesize"):
+        tts = gTTS(text=text, lang="en")
+        tts.save(str(path))  # gTTS needs a str path
 
     return str(path), name
\ No newline at end of file